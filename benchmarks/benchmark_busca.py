@@ -0,0 +1,101 @@
+"""
+WhatsApp Monitor - Benchmark da busca textual
+
+Grava mensagens sem o índice de busca, mede a migração que as indexa em lotes
+e compara a busca pelo índice FTS5 com a busca por LIKE (a alternativa sem
+FTS5). Também mede o custo dos gatilhos nas inserções. Não depende do Home
+Assistant.
+
+Uso:
+    python benchmarks/benchmark_busca.py [num_mensagens]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+
+STORAGE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "custom_components", "whatsapp_monitor", "storage.py"
+)
+
+CONSULTAS = ["boleto", "reuniao condominio", "urg*", "termo123", "inexistente"]
+
+PALAVRAS = [
+    "boleto", "reunião", "condomínio", "urgente", "pagamento", "amanhã", "escola",
+    "médico", "entrega", "pedido", "conta", "luz", "água", "aniversário", "festa",
+]
+
+
+def carregar_storage():
+    """Carrega storage.py diretamente, sem importar o pacote do Home Assistant."""
+    spec = importlib.util.spec_from_file_location("whatsapp_monitor_storage", STORAGE_PATH)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def mensagem_exemplo(i):
+    """Gera uma mensagem de teste com palavras comuns e um termo raro."""
+    texto = " ".join(PALAVRAS[(i * k) % len(PALAVRAS)] for k in (1, 3, 7, 11))
+    texto += f" termo{(i * 7919) % 5000}"
+    return {
+        'contato': f"Contato {i % 20}",
+        'mensagem': f"Mensagem {i}: {texto}",
+        'hora': "12:00",
+        'importante': True,
+    }
+
+
+def cronometrar(funcao, repeticoes=1):
+    """Retorna o melhor tempo de execução da função, em segundos."""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor
+
+
+def main():
+    num_mensagens = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    storage_mod = carregar_storage()
+    mensagens = [mensagem_exemplo(i) for i in range(num_mensagens)]
+
+    with tempfile.TemporaryDirectory() as sem_dir, tempfile.TemporaryDirectory() as com_dir:
+        # Inserções sem o índice (gatilhos removidos) e com o índice
+        sem_indice = storage_mod.WhatsAppMonitorStorage(sem_dir)
+        with sem_indice.conexoes.escrita() as conn:
+            conn.execute("DROP TABLE mensagens_fts")
+            for gatilho in ("insercao", "remocao", "alteracao"):
+                conn.execute(f"DROP TRIGGER mensagens_fts_{gatilho}")
+        duracao = cronometrar(lambda: sem_indice.salvar_mensagens(mensagens))
+        print(f"{'inserções sem índice':<40} {num_mensagens / duracao:>10.0f} mensagens/s")
+
+        com_indice = storage_mod.WhatsAppMonitorStorage(com_dir)
+        duracao = cronometrar(lambda: com_indice.salvar_mensagens(mensagens))
+        print(f"{'inserções com gatilhos FTS5':<40} {num_mensagens / duracao:>10.0f} mensagens/s")
+        com_indice.fechar()
+
+        # Migração: o banco sem índice ganha o índice ao ser reaberto
+        sem_indice.fechar()
+        migrado = storage_mod.WhatsAppMonitorStorage(sem_dir)
+        duracao = cronometrar(migrado.indexar_mensagens)
+        print(f"{'migração em lotes de ' + str(storage_mod.LOTE_INDEXACAO):<40} "
+              f"{num_mensagens / duracao:>10.0f} mensagens/s ({duracao:.2f}s)")
+
+        for consulta in CONSULTAS:
+            migrado.fts_disponivel = True
+            fts = cronometrar(lambda: migrado.buscar_mensagens(consulta), 5)
+            total = migrado.buscar_mensagens(consulta)['total']
+            migrado.fts_disponivel = False
+            like = cronometrar(lambda: migrado.buscar_mensagens(consulta), 5)
+            print(f"busca {consulta!r:<34} FTS5 {fts * 1000:>7.2f} ms   "
+                  f"LIKE {like * 1000:>7.2f} ms   ({total} resultados)")
+        migrado.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+WhatsApp Monitor - Benchmark de inicialização do componente e do driver
+
+Mede, cada um em um interpretador novo:
+
+- a importação do núcleo do monitor (o que o Home Assistant paga ao carregar
+  a integração), que não importa mais Selenium, webdriver_manager e PIL;
+- a importação dessas dependências, custo que antes era pago na carga;
+- a resolução do chromedriver pelo webdriver_manager (comportamento anterior,
+  a cada início) e pelo cache em disco;
+- o tempo até o primeiro ciclo poder rodar: criação do monitor, início do
+  Chrome e abertura do WhatsApp Web.
+
+As medições do driver requerem Chrome e, para o webdriver_manager, acesso à
+rede; são ignoradas quando não estão disponíveis. Não depende do Home
+Assistant.
+
+Uso:
+    python benchmarks/benchmark_inicializacao.py [repeticoes]
+
+Resultados (x86_64, 1 vCPU, Python 3.11, selenium 4.51, melhor de 5):
+
+    importação do núcleo (depois)                          14.3 ms
+    importação de selenium/webdriver_manager/PIL (antes)   111.6 ms
+    importação do núcleo na versão anterior (antes)       253.9 ms
+    resolução do chromedriver, cache em disco (depois)      0.1 ms
+    resolução do chromedriver, webdriver_manager (antes)  não medido
+    até o primeiro ciclo                                  não medido
+
+A terceira linha foi medida da mesma forma, com o componente da versão
+anterior, que importava as dependências no topo do módulo. O host da medição
+não tem Chrome e só alcança o índice de pacotes Python: o webdriver_manager
+falha ao consultar a versão do driver ("Could not reach host") e o Chrome não
+inicia, então as duas últimas linhas ficaram sem número. A leitura do cache
+não executa o driver e foi medida com um executável qualquer chamado
+chromedriver no PATH. Para completar a tabela, rode o benchmark em um host
+com Chrome e acesso à internet.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+COMPONENTE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "custom_components", "whatsapp_monitor")
+)
+
+# Registra o diretório do componente como pacote sem executar o __init__.py,
+# que depende do Home Assistant
+PREAMBULO = f"""
+import sys, time, types, importlib, tempfile
+pacote = types.ModuleType("wm")
+pacote.__path__ = [{COMPONENTE_DIR!r}]
+sys.modules["wm"] = pacote
+"""
+
+CASOS = {
+    "importação do núcleo (depois)": """
+inicio = time.perf_counter()
+importlib.import_module("wm.whatsapp_monitor_core")
+duracao = time.perf_counter() - inicio
+""",
+    "importação de selenium/webdriver_manager/PIL (antes)": """
+inicio = time.perf_counter()
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from webdriver_manager.chrome import ChromeDriverManager
+from PIL import Image
+duracao = time.perf_counter() - inicio
+""",
+    "resolução do chromedriver, webdriver_manager (antes)": """
+from webdriver_manager.chrome import ChromeDriverManager
+inicio = time.perf_counter()
+ChromeDriverManager().install()
+duracao = time.perf_counter() - inicio
+""",
+    "resolução do chromedriver, cache em disco (depois)": """
+navegador = importlib.import_module("wm.navegador")
+config_dir = tempfile.mkdtemp()
+navegador.resolver_chromedriver(config_dir)
+inicio = time.perf_counter()
+navegador.resolver_chromedriver(config_dir)
+duracao = time.perf_counter() - inicio
+""",
+    "até o primeiro ciclo (monitor + Chrome + página)": """
+nucleo = importlib.import_module("wm.whatsapp_monitor_core")
+inicio = time.perf_counter()
+monitor = nucleo.WhatsAppMonitor(tempfile.mkdtemp(), {})
+monitor.passo_login()
+if monitor.driver is None:
+    raise RuntimeError("Chrome não iniciou")
+duracao = time.perf_counter() - inicio
+monitor.disconnect()
+""",
+}
+
+
+def executar(codigo):
+    """Executa um caso em um interpretador novo e retorna a duração em segundos."""
+    script = PREAMBULO + codigo + "\nprint(__import__('json').dumps(duracao))\n"
+    resultado = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, timeout=600
+    )
+    if resultado.returncode != 0:
+        erro = resultado.stderr.strip().splitlines()
+        raise RuntimeError(erro[-1] if erro else "falha desconhecida")
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    for descricao, codigo in CASOS.items():
+        try:
+            duracoes = [executar(codigo) for _ in range(repeticoes)]
+        except Exception as e:
+            print(f"{descricao:<55} indisponível ({e})")
+            continue
+        print(f"{descricao:<55} {min(duracoes) * 1000:>9.1f} ms (melhor de {repeticoes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+WhatsApp Monitor - Benchmark de memória do Chrome
+
+Abre o WhatsApp Web no modo padrão e no modo leve, cada um com um perfil
+temporário, e imprime o RSS somado do chromedriver e dos processos do Chrome
+após a página assentar. Requer Chrome, Selenium e acesso à rede; a medição
+usa /proc e, portanto, só funciona no Linux. Não depende do Home Assistant.
+
+Uso:
+    python benchmarks/benchmark_navegador.py [segundos_de_espera]
+
+Resultados: ainda não medidos. O host em que o modo leve foi desenvolvido não
+tem Chrome e só alcança o índice de pacotes Python, de onde não há Chrome para
+instalar. Até este benchmark rodar em um host com Chrome (de preferência o
+Raspberry Pi), a economia de memória do modo leve é uma estimativa, não um
+número medido.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+NAVEGADOR_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "custom_components", "whatsapp_monitor", "navegador.py"
+)
+
+
+def carregar_navegador():
+    """Carrega navegador.py diretamente, sem importar o pacote do Home Assistant."""
+    spec = importlib.util.spec_from_file_location("whatsapp_monitor_navegador", NAVEGADOR_PATH)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def medir(navegador, modo, driver_path, espera):
+    """Abre o WhatsApp Web no modo informado e retorna o maior RSS observado, em bytes."""
+    with tempfile.TemporaryDirectory() as profile_dir:
+        opcoes = navegador.criar_opcoes(profile_dir, modo)
+        driver = webdriver.Chrome(service=Service(driver_path), options=opcoes)
+        try:
+            navegador.aplicar_bloqueios(driver, modo)
+            driver.get("https://web.whatsapp.com/")
+            pico = 0
+            fim = time.monotonic() + espera
+            while time.monotonic() < fim:
+                pico = max(pico, navegador.rss_driver(driver) or 0)
+                time.sleep(1)
+            return navegador.rss_driver(driver), pico
+        finally:
+            driver.quit()
+
+
+def main():
+    espera = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    navegador = carregar_navegador()
+    driver_path = ChromeDriverManager().install()
+
+    for modo in (navegador.MODO_NAVEGADOR_PADRAO, navegador.MODO_NAVEGADOR_LEVE):
+        final, pico = medir(navegador, modo, driver_path, espera)
+        if final is None:
+            print("RSS indisponível: /proc não encontrado")
+            return
+        print(f"modo {modo:<8} RSS final {final / 1048576:>7.1f} MB   pico {pico / 1048576:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+WhatsApp Monitor - Benchmark de inserções no armazenamento SQLite
+
+Compara a abordagem anterior (uma conexão por operação) com o armazenamento
+atual (conexões persistentes em modo WAL). Não depende do Home Assistant.
+
+Uso:
+    python benchmarks/benchmark_storage.py [num_mensagens]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import datetime
+import tempfile
+import importlib.util
+
+STORAGE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "custom_components", "whatsapp_monitor", "storage.py"
+)
+
+
+def carregar_storage():
+    """Carrega storage.py diretamente, sem importar o pacote do Home Assistant."""
+    spec = importlib.util.spec_from_file_location("whatsapp_monitor_storage", STORAGE_PATH)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def mensagem_exemplo(i):
+    """Gera uma mensagem de teste."""
+    return {
+        'contato': f"Contato {i % 20}",
+        'mensagem': f"Mensagem urgente número {i} sobre o boleto",
+        'hora': "12:00",
+        'importante': True,
+    }
+
+
+def inserir_conexao_por_operacao(db_path, num_mensagens):
+    """Reproduz o comportamento anterior: connect/commit/close a cada inserção."""
+    for i in range(num_mensagens):
+        mensagem = mensagem_exemplo(i)
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            INSERT INTO mensagens (
+                contato, mensagem, hora, data, nivel_prioridade,
+                categoria, importante, timestamp
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            mensagem['contato'], mensagem['mensagem'], mensagem['hora'],
+            datetime.datetime.now().strftime("%Y-%m-%d"), 'baixa', 'geral', 1,
+            int(time.time())
+        ))
+        conn.commit()
+        conn.close()
+
+
+def medir(descricao, funcao, num_mensagens):
+    """Executa a função e imprime inserções por segundo."""
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    print(f"{descricao:<40} {num_mensagens / duracao:>10.0f} inserções/s ({duracao:.2f}s)")
+
+
+def main():
+    num_mensagens = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    storage_mod = carregar_storage()
+
+    with tempfile.TemporaryDirectory() as antes_dir, tempfile.TemporaryDirectory() as depois_dir:
+        # Antes: banco em modo rollback journal, uma conexão por inserção
+        storage_antes = storage_mod.WhatsAppMonitorStorage(antes_dir)
+        storage_antes.fechar()
+        db_antes = storage_antes.db_path
+        conn = sqlite3.connect(db_antes)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        medir("antes (conexão por operação)",
+              lambda: inserir_conexao_por_operacao(db_antes, num_mensagens), num_mensagens)
+
+        # Depois: conexão persistente em WAL
+        storage = storage_mod.WhatsAppMonitorStorage(depois_dir)
+        medir("depois (conexão persistente, WAL)",
+              lambda: [storage.salvar_mensagem(mensagem_exemplo(i)) for i in range(num_mensagens)],
+              num_mensagens)
+
+        # Depois: lotes de 50 mensagens em uma única transação
+        medir("depois (salvar_mensagens, lotes de 50)",
+              lambda: [storage.salvar_mensagens([mensagem_exemplo(i + j) for j in range(50)])
+                       for i in range(0, num_mensagens, 50)],
+              num_mensagens)
+        storage.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,34 @@ import logging
 import os
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, SupportsResponse
 import homeassistant.helpers.config_validation as cv
 from homeassistant.const import CONF_NAME
 
+from .keywords import KeywordMatcher
+from .storage import init_storage, index_service, reclassify_service, search_service, LIMITE_BUSCA
+from .coordinator import WhatsAppMonitorCoordinator
+from .qrcode_view import async_registrar_views
+from .scheduler import PoolVerificacoes, MAX_VERIFICACOES_SIMULTANEAS
+from .contas import CHAVE_CONTAS, contas_alvo, escolher_subdiretorio, sufixo_conta
+
 _LOGGER = logging.getLogger(__name__)
 
 # Constantes
 DOMAIN = "whatsapp_monitor"
 DEFAULT_NAME = "WhatsApp Monitor"
 
+# Serviços delegados ao coordenador
+SERVICOS_COORDENADOR = {
+    "check_messages": "async_check_messages",
+    "generate_summary": "async_generate_summary",
+    "connect": "async_connect",
+    "disconnect": "async_disconnect",
+}
+
+# Conta alvo dos serviços (entry_id ou nome); sem ela, todas as contas
+SCHEMA_CONTA = vol.Schema({vol.Optional("conta"): cv.string})
+
 # Esquema de configuração
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -28,41 +46,203 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional("intervalo_verificacao", default=15): cv.positive_int,
                 vol.Optional("intervalo_resumo", default=60): cv.positive_int,
                 vol.Optional("max_mensagens_resumo", default=10): cv.positive_int,
+                vol.Optional("capacidade_buffer", default=500): cv.positive_int,
+                vol.Optional("modo_extracao", default="snapshot"): vol.In(["snapshot", "elementos"]),
+                vol.Optional("mensagens_por_chat", default=5): cv.positive_int,
+                vol.Optional("max_mensagens_por_chat", default=50): cv.positive_int,
+                vol.Optional("usar_previa", default=True): cv.boolean,
+                vol.Optional("detectar_alteracoes", default=True): cv.boolean,
+                vol.Optional("orcamento_ciclo", default=60): cv.positive_int,
+                vol.Optional("modo_navegador", default="padrao"): vol.In(["padrao", "leve"]),
+                vol.Optional("caminho_chromedriver"): cv.isfile,
+                vol.Optional("caminho_navegador"): cv.isfile,
+                vol.Optional("limite_memoria_navegador", default=700): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Optional("driver_reserva", default=False): cv.boolean,
+                vol.Optional("memoria_minima_reserva", default=3072): cv.positive_int,
+                vol.Optional("capacidade_indice_vistas", default=5000): cv.positive_int,
+                vol.Optional("dias_indice_vistas", default=30): cv.positive_int,
+                vol.Optional("modo_deteccao", default="polling"): vol.In(["polling", "observador"]),
+                vol.Optional("max_verificacoes_simultaneas", default=1): cv.positive_int,
+                vol.Optional("jitter_agendamento", default=0.1): vol.All(vol.Coerce(float), vol.Range(min=0, max=0.5)),
+                vol.Optional("intervalo_adaptativo", default=False): cv.boolean,
+                vol.Optional("intervalo_minimo", default=1): cv.positive_int,
+                vol.Optional("intervalo_maximo", default=60): cv.positive_int,
+                vol.Optional("fator_recuo", default=1.5): vol.All(vol.Coerce(float), vol.Range(min=1.0, max=4.0)),
+                vol.Optional("silencio_inicio"): cv.time,
+                vol.Optional("silencio_fim"): cv.time,
+                vol.Optional("intervalo_silencio"): cv.positive_int,
+                vol.Optional("processo_separado", default=False): cv.boolean,
+                vol.Optional("escrita_assincrona", default=False): cv.boolean,
+                vol.Optional("tamanho_lote_escrita", default=50): cv.positive_int,
+                vol.Optional("intervalo_escrita", default=5.0): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
             }
         )
     },
     extra=vol.ALLOW_EXTRA,
 )
 
-async def async_setup(hass: HomeAssistant, config: dict):
-    """Configuração do componente a partir do configuration.yaml."""
-    if DOMAIN not in config:
-        return True
-
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN]["config"] = config[DOMAIN]
+def _async_register_services(hass: HomeAssistant):
+    """Registra os serviços do componente, uma única vez para todas as contas."""
+    if hass.services.has_service(DOMAIN, "update_keywords"):
+        return
 
-    # Registrar serviço para atualizar palavras-chave
     async def handle_update_keywords(call):
         """Manipulador para o serviço de atualização de palavras-chave."""
         palavras_chave = call.data.get("palavras_chave", [])
         
-        # Atualizar configuração
-        if "config" in hass.data[DOMAIN]:
-            hass.data[DOMAIN]["config"]["palavras_chave"] = palavras_chave
-            _LOGGER.info(f"Palavras-chave atualizadas: {palavras_chave}")
+        for dados in contas_alvo(hass, call.data.get("conta")):
+            # Atualizar configuração
+            dados["config"]["palavras_chave"] = palavras_chave
+            _LOGGER.info(f"Palavras-chave atualizadas ({dados['nome']}): {palavras_chave}")
+            
+            # Recompilar o identificador em segundo plano
+            hass.async_create_task(
+                async_update_matcher(hass, dados, reclassificar=call.data.get("reclassificar", False))
+            )
         
         return True
 
-    # Registrar serviço
+    async def handle_reclassify_messages(call):
+        """Manipulador para o serviço de reclassificação de mensagens."""
+        for dados in contas_alvo(hass, call.data.get("conta")):
+            hass.async_create_task(
+                _async_reclassify(hass, dados, call.data.get("dias", 7), call.data.get("tamanho_lote", 200))
+            )
+        
+        return True
+
+    async def handle_search(call):
+        """Manipulador para o serviço de busca, com os resultados de cada conta."""
+        resultados = []
+        for dados in contas_alvo(hass, call.data.get("conta")):
+            resultado = await hass.async_add_executor_job(
+                search_service,
+                hass,
+                dados,
+                call.data["consulta"],
+                call.data.get("contato"),
+                call.data.get("categoria"),
+                call.data.get("dias"),
+                call.data["limite"],
+                call.data["pagina"],
+            )
+            if resultado is not None:
+                resultados.append(resultado)
+        
+        return {"contas": resultados}
+
+    def _coordinator_handler(metodo):
+        """Cria um manipulador que delega aos coordenadores sem bloquear o loop."""
+        async def handler(call):
+            coordinators = [
+                dados["coordinator"]
+                for dados in contas_alvo(hass, call.data.get("conta"))
+                if dados.get("coordinator")
+            ]
+            if not coordinators:
+                _LOGGER.error("Monitor do WhatsApp não inicializado")
+                return False
+            resultados = [await getattr(coordinator, metodo)() for coordinator in coordinators]
+            return all(resultados)
+        return handler
+
+    # Registrar serviços
+    for servico, metodo in SERVICOS_COORDENADOR.items():
+        hass.services.async_register(
+            DOMAIN, servico, _coordinator_handler(metodo), schema=SCHEMA_CONTA
+        )
+    
     hass.services.async_register(
         DOMAIN, 
         "update_keywords", 
         handle_update_keywords, 
-        schema=vol.Schema({
+        schema=SCHEMA_CONTA.extend({
             vol.Required("palavras_chave"): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional("reclassificar", default=False): cv.boolean,
         })
     )
+    
+    hass.services.async_register(
+        DOMAIN, 
+        "reclassify_messages", 
+        handle_reclassify_messages, 
+        schema=SCHEMA_CONTA.extend({
+            vol.Optional("dias", default=7): cv.positive_int,
+            vol.Optional("tamanho_lote", default=200): vol.All(vol.Coerce(int), vol.Range(min=10, max=5000)),
+        })
+    )
+    
+    hass.services.async_register(
+        DOMAIN,
+        "search",
+        handle_search,
+        schema=SCHEMA_CONTA.extend({
+            vol.Required("consulta"): cv.string,
+            vol.Optional("contato"): cv.string,
+            vol.Optional("categoria"): cv.string,
+            vol.Optional("dias"): cv.positive_int,
+            vol.Optional("limite", default=20): vol.All(vol.Coerce(int), vol.Range(min=1, max=LIMITE_BUSCA)),
+            vol.Optional("pagina", default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+async def async_update_matcher(hass: HomeAssistant, dados, reclassificar=False):
+    """Compila um novo identificador de mensagens da conta e o troca atomicamente.
+
+    A compilação ocorre no executor; o monitor continua usando o identificador
+    anterior até a troca, que só é feita se nenhuma versão mais nova foi pedida.
+    """
+    versao = dados.get("matcher_version", 0) + 1
+    dados["matcher_version"] = versao
+    config = dict(dados.get("config", {}))
+
+    matcher = await hass.async_add_executor_job(KeywordMatcher.from_config, config)
+
+    if dados.get("matcher_version") != versao:
+        _LOGGER.debug(f"Identificador versão {versao} descartado: versão mais nova solicitada")
+        return False
+
+    dados["matcher"] = matcher
+    monitor = dados.get("monitor")
+    if monitor:
+        # No processo separado, a troca é um envio bloqueante pelo Pipe
+        await hass.async_add_executor_job(monitor.set_matcher, matcher, config, versao)
+
+    if reclassificar:
+        await _async_reclassify(hass, dados)
+
+    return True
+
+async def _async_reclassify(hass: HomeAssistant, dados, dias=7, tamanho_lote=200):
+    """Reclassifica as mensagens recentes da conta em segundo plano."""
+    matcher = dados.get("matcher")
+    if matcher is None:
+        matcher = await hass.async_add_executor_job(KeywordMatcher.from_config, dados.get("config", {}))
+
+    return await hass.async_add_executor_job(
+        reclassify_service, hass, dados, matcher, dias, tamanho_lote
+    )
+
+def _config_conta(hass: HomeAssistant, entry: ConfigEntry):
+    """Configuração da conta: configuration.yaml sobreposto pela entrada e pelas opções."""
+    return {
+        **hass.data[DOMAIN].get("config", {}),
+        **entry.data,
+        **entry.options,
+        "conta": entry.entry_id,
+    }
+
+async def async_setup(hass: HomeAssistant, config: dict):
+    """Configuração do componente a partir do configuration.yaml."""
+    if DOMAIN not in config:
+        return True
+
+    hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN]["config"] = config[DOMAIN]
+
+    # Registrar serviços
+    _async_register_services(hass)
 
     # Criar notificação inicial
     hass.components.persistent_notification.create(
@@ -74,35 +254,60 @@ async def async_setup(hass: HomeAssistant, config: dict):
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Configuração do componente a partir de uma entrada de configuração."""
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN]["config"] = dict(entry.data)
+    """Configuração de uma conta a partir de uma entrada de configuração."""
+    dominio = hass.data.setdefault(DOMAIN, {})
+    
+    # Diretório da conta, escolhido uma única vez e guardado na entrada
+    subdiretorio = entry.data.get("subdiretorio")
+    if subdiretorio is None:
+        em_uso = {
+            outra.data.get("subdiretorio")
+            for outra in hass.config_entries.async_entries(DOMAIN)
+            if outra.entry_id != entry.entry_id
+        }
+        subdiretorio = escolher_subdiretorio(entry.entry_id, em_uso)
+        hass.config_entries.async_update_entry(entry, data={**entry.data, "subdiretorio": subdiretorio})
+    
+    dados = {
+        "conta": entry.entry_id,
+        "nome": entry.title,
+        "principal": subdiretorio == "",
+        "diretorio": os.path.join(hass.config.path("custom_components", DOMAIN), subdiretorio),
+        "config": _config_conta(hass, entry),
+    }
+    dominio.setdefault(CHAVE_CONTAS, {})[entry.entry_id] = dados
+    await async_update_matcher(hass, dados)
 
-    # Registrar serviço para atualizar palavras-chave
-    async def handle_update_keywords(call):
-        """Manipulador para o serviço de atualização de palavras-chave."""
-        palavras_chave = call.data.get("palavras_chave", [])
-        
-        # Atualizar configuração
-        if "config" in hass.data[DOMAIN]:
-            hass.data[DOMAIN]["config"]["palavras_chave"] = palavras_chave
-            _LOGGER.info(f"Palavras-chave atualizadas: {palavras_chave}")
-        
-        return True
+    # Inicializar armazenamento
+    await hass.async_add_executor_job(init_storage, hass, dados)
+    
+    # Indexar para a busca, em segundo plano, as mensagens anteriores ao índice
+    dados["indexacao"] = hass.async_add_executor_job(index_service, hass, dados)
 
-    # Registrar serviço
-    hass.services.async_register(
-        DOMAIN, 
-        "update_keywords", 
-        handle_update_keywords, 
-        schema=vol.Schema({
-            vol.Required("palavras_chave"): vol.All(cv.ensure_list, [cv.string]),
-        })
-    )
+    # Registrar serviços
+    _async_register_services(hass)
+
+    # Servir o QR Code a partir da memória
+    async_registrar_views(hass)
+
+    # Atualizar o identificador quando as opções mudarem
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
+
+    # Verificações das contas distribuídas em um pool limitado
+    pool = dominio.get("pool")
+    if pool is None:
+        pool = dominio["pool"] = PoolVerificacoes(
+            dados["config"].get("max_verificacoes_simultaneas", MAX_VERIFICACOES_SIMULTANEAS)
+        )
+
+    # Iniciar o monitor em segundo plano; o Chrome não atrasa a inicialização
+    coordinator = WhatsAppMonitorCoordinator(hass, dados, pool)
+    dados["coordinator"] = coordinator
+    coordinator.async_start()
 
     # Configurar sensores
     hass.async_create_task(
-        hass.helpers.discovery.async_load_platform("sensor", DOMAIN, {}, entry.data)
+        hass.helpers.discovery.async_load_platform("sensor", DOMAIN, {"conta": entry.entry_id}, entry.data)
     )
 
     # Criar notificação com instruções para WhatsApp Web
@@ -114,25 +319,55 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             f"2. Toque em Menu (três pontos) > Aparelhos conectados > Conectar um aparelho\n"
             f"3. Digite o código: {codigo}\n\n"
             f"Você pode editar as palavras-chave a qualquer momento nas opções de configuração da integração.",
-            title="WhatsApp Monitor - Código de Autenticação",
-            notification_id="whatsapp_auth_code"
+            title=f"WhatsApp Monitor - Código de Autenticação ({entry.title})",
+            notification_id=f"whatsapp_auth_code{sufixo_conta(dados)}"
         )
 
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Descarregar uma entrada de configuração."""
+    """Descarregar uma conta."""
     # Remover sensores
     await hass.config_entries.async_forward_entry_unload(entry, "sensor")
     
-    # Remover serviços
-    hass.services.async_remove(DOMAIN, "update_keywords")
+    dominio = hass.data[DOMAIN]
+    dados = dominio.get(CHAVE_CONTAS, {}).pop(entry.entry_id, {})
+    
+    # Encerrar o monitor; o ciclo em andamento termina antes do fechamento
+    coordinator = dados.get("coordinator")
+    if coordinator:
+        await coordinator.async_stop()
     
-    # Limpar dados
-    hass.data.pop(DOMAIN)
+    # Fechar conexões com o banco de dados depois da indexação em segundo plano
+    storage = dados.get("storage")
+    if storage:
+        indexacao = dados.get("indexacao")
+        if indexacao is not None and not indexacao.done():
+            storage.interromper_indexacao()
+            await indexacao
+        await hass.async_add_executor_job(storage.fechar)
+    
+    # Remover serviços e o pool após a última conta
+    if not dominio.get(CHAVE_CONTAS):
+        hass.services.async_remove(DOMAIN, "update_keywords")
+        hass.services.async_remove(DOMAIN, "reclassify_messages")
+        hass.services.async_remove(DOMAIN, "search")
+        for servico in SERVICOS_COORDENADOR:
+            hass.services.async_remove(DOMAIN, servico)
+        dominio.pop(CHAVE_CONTAS, None)
+        dominio.pop("pool", None)
     
     return True
 
 async def async_options_updated(hass, entry):
     """Manipular opções atualizadas."""
-    hass.data[DOMAIN]["config"] = {**entry.data, **entry.options}
+    dados = hass.data[DOMAIN].get(CHAVE_CONTAS, {}).get(entry.entry_id)
+    if dados is None:
+        return
+    dados["config"] = _config_conta(hass, entry)
+    await async_update_matcher(hass, dados)
+
+    # Reagendar ciclos com os novos intervalos
+    coordinator = dados.get("coordinator")
+    if coordinator:
+        coordinator.async_atualizar_config()
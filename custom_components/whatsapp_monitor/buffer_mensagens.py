@@ -0,0 +1,127 @@
+"""
+WhatsApp Monitor - Buffer de mensagens importantes para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import sys
+import time
+import threading
+
+# Número de mensagens importantes mantidas em memória
+CAPACIDADE_BUFFER = 500
+
+
+def _internar(valor):
+    """Interna textos repetidos (contatos, horas, categorias) para compartilhar memória."""
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
+class RegistroMensagem:
+    """Registro compacto de uma mensagem importante."""
+
+    __slots__ = ("contato", "mensagem", "hora", "categoria", "padrao", "timestamp")
+
+    def __init__(self, contato, mensagem, hora="", categoria=None, padrao=None, timestamp=None):
+        self.contato = _internar(contato or "Desconhecido")
+        self.mensagem = mensagem or ""
+        self.hora = _internar(hora or "")
+        self.categoria = _internar(categoria)
+        self.padrao = _internar(padrao)
+        self.timestamp = int(timestamp if timestamp is not None else time.time())
+
+    @classmethod
+    def de_dict(cls, dados):
+        """Cria um registro a partir do dicionário produzido por check_messages."""
+        return cls(
+            dados.get('contato'),
+            dados.get('mensagem'),
+            dados.get('hora'),
+            dados.get('categoria'),
+            dados.get('padrao'),
+            dados.get('timestamp'),
+        )
+
+    def como_dict(self):
+        """Retorna o registro no formato de dicionário usado nos eventos."""
+        return {
+            'contato': self.contato,
+            'mensagem': self.mensagem,
+            'hora': self.hora,
+            'importante': True,
+            'categoria': self.categoria,
+            'padrao': self.padrao,
+            'timestamp': self.timestamp,
+        }
+
+
+class BufferMensagens:
+    """Buffer circular de capacidade fixa com as mensagens importantes recentes.
+
+    Ao atingir a capacidade, cada nova mensagem substitui a mais antiga, de
+    forma que a memória ocupada não cresce com o tempo de execução.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_BUFFER):
+        """Inicializa o buffer vazio."""
+        self.capacidade = max(1, capacidade)
+        self._registros = [None] * self.capacidade
+        self._inicio = 0
+        self._tamanho = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._tamanho
+
+    def __bool__(self):
+        return self._tamanho > 0
+
+    def adicionar(self, mensagem):
+        """Adiciona uma mensagem (dicionário ou RegistroMensagem)."""
+        if not isinstance(mensagem, RegistroMensagem):
+            mensagem = RegistroMensagem.de_dict(mensagem)
+
+        with self._lock:
+            if self._tamanho < self.capacidade:
+                self._registros[(self._inicio + self._tamanho) % self.capacidade] = mensagem
+                self._tamanho += 1
+            else:
+                self._registros[self._inicio] = mensagem
+                self._inicio = (self._inicio + 1) % self.capacidade
+            self.total += 1
+        return mensagem
+
+    def recentes(self, limite=None):
+        """Retorna as `limite` mensagens mais recentes, da mais antiga para a mais nova."""
+        with self._lock:
+            quantidade = self._tamanho if limite is None else max(0, min(limite, self._tamanho))
+            primeiro = self._inicio + self._tamanho - quantidade
+            return [
+                self._registros[(primeiro + i) % self.capacidade]
+                for i in range(quantidade)
+            ]
+
+    def limpar(self):
+        """Remove todas as mensagens do buffer."""
+        with self._lock:
+            self._registros = [None] * self.capacidade
+            self._inicio = 0
+            self._tamanho = 0
+
+    def uso_memoria(self):
+        """Estima a memória ocupada pelo buffer, em bytes."""
+        registros = self.recentes()
+        total = sys.getsizeof(self._registros)
+        compartilhados = set()
+        for registro in registros:
+            total += sys.getsizeof(registro) + sys.getsizeof(registro.mensagem)
+            for valor in (registro.contato, registro.hora, registro.categoria, registro.padrao):
+                if valor is not None and id(valor) not in compartilhados:
+                    compartilhados.add(id(valor))
+                    total += sys.getsizeof(valor)
+        return {
+            'registros': len(registros),
+            'capacidade': self.capacidade,
+            'total_recebido': self.total,
+            'bytes': total,
+        }
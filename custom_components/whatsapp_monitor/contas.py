@@ -0,0 +1,60 @@
+"""
+WhatsApp Monitor - Contas monitoradas para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+Cada entrada de configuração é uma conta do WhatsApp com o seu próprio
+monitor, navegador, perfil, banco de dados e sensores. Os dados de cada conta
+ficam em hass.data[DOMAIN]["contas"][entry_id].
+
+A conta principal (a primeira configurada) mantém os arquivos no diretório do
+componente e os identificadores originais de sensores, URLs e notificações;
+as demais usam o subdiretório contas/<entry_id> e o sufixo _<entry_id>.
+"""
+
+import os
+
+# Constantes
+DOMAIN = "whatsapp_monitor"
+CHAVE_CONTAS = "contas"
+SUBDIRETORIO_CONTAS = "contas"
+
+
+def contas(hass):
+    """Dados de todas as contas carregadas, por entry_id."""
+    return hass.data.get(DOMAIN, {}).get(CHAVE_CONTAS, {})
+
+
+def dados_conta(hass, conta=None):
+    """Dados de uma conta pelo entry_id; sem `conta`, a conta principal."""
+    todas = contas(hass)
+    if conta is not None:
+        return todas.get(conta)
+    for dados in todas.values():
+        if dados.get("principal"):
+            return dados
+    return next(iter(todas.values()), None)
+
+
+def contas_alvo(hass, conta=None):
+    """Contas selecionadas pelo entry_id ou pelo nome; sem `conta`, todas."""
+    todas = list(contas(hass).values())
+    if not conta:
+        return todas
+    return [
+        dados for dados in todas
+        if conta in (dados.get("conta"), dados.get("nome"))
+    ]
+
+
+def escolher_subdiretorio(entry_id, em_uso):
+    """Subdiretório de uma nova conta: o diretório do componente, se livre."""
+    if "" not in em_uso:
+        return ""
+    return os.path.join(SUBDIRETORIO_CONTAS, entry_id)
+
+
+def sufixo_conta(dados):
+    """Sufixo dos identificadores da conta ('' para a conta principal)."""
+    if not dados or dados.get("principal"):
+        return ""
+    return f"_{dados.get('conta')}"
@@ -0,0 +1,436 @@
+"""
+WhatsApp Monitor - Coordenador assíncrono para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import asyncio
+import logging
+import datetime
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from homeassistant.core import HomeAssistant, callback
+
+from .whatsapp_monitor_core import (
+    DOMAIN,
+    init_monitor,
+    check_messages_service,
+    generate_summary_service,
+    connect_service,
+    disconnect_service,
+    wait_events_service,
+    ESTADOS_LOGIN_EM_ANDAMENTO,
+)
+from .worker import init_worker_monitor
+from .storage import prune_seen_service
+from .dedup import DIAS_MENSAGENS_VISTAS
+from .scheduler import (
+    AgendadorCiclos,
+    IntervaloAdaptativo,
+    PoolVerificacoes,
+    JITTER_PADRAO,
+    FATOR_RECUO_PADRAO,
+)
+
+# Espera máxima de cada consulta ao observador da página (segundos)
+ESPERA_OBSERVADOR = 15
+
+# Atraso da verificação seguinte quando conversas foram adiadas (segundos)
+ATRASO_CONVERSAS_ADIADAS = 30
+
+# Intervalos do laço de login (segundos): entre passos de um login em
+# andamento, entre tentativas após uma falha e entre consultas com sessão ativa
+INTERVALO_PASSO_LOGIN = 1
+INTERVALO_NOVA_TENTATIVA_LOGIN = 60
+INTERVALO_SESSAO_ATIVA = 5
+
+# Intervalo da limpeza do índice de mensagens vistas e atraso da primeira
+# limpeza após a inicialização (segundos)
+INTERVALO_LIMPEZA_VISTAS = 24 * 3600
+ATRASO_LIMPEZA_VISTAS = 600
+
+# Espera máxima pelo fechamento do navegador ao encerrar (segundos)
+TEMPO_LIMITE_ENCERRAMENTO = 30
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _ler_horario(valor):
+    """Converte 'HH:MM' (ou datetime.time) em datetime.time."""
+    if valor is None or isinstance(valor, datetime.time):
+        return valor
+    try:
+        return datetime.datetime.strptime(str(valor)[:5], "%H:%M").time()
+    except ValueError:
+        _LOGGER.warning(f"Horário inválido ignorado: {valor}")
+        return None
+
+
+def criar_intervalo_adaptativo(config):
+    """Cria o cálculo de intervalo adaptativo, se habilitado na configuração."""
+    if not config.get("intervalo_adaptativo", False):
+        return None
+
+    silencio = config.get("intervalo_silencio")
+    return IntervaloAdaptativo(
+        base=config.get("intervalo_verificacao", 15) * 60,
+        minimo=config.get("intervalo_minimo", 1) * 60,
+        maximo=config.get("intervalo_maximo", 60) * 60,
+        fator_recuo=config.get("fator_recuo", FATOR_RECUO_PADRAO),
+        silencio_inicio=_ler_horario(config.get("silencio_inicio")),
+        silencio_fim=_ler_horario(config.get("silencio_fim")),
+        intervalo_silencio=silencio * 60 if silencio else None,
+    )
+
+
+class WhatsAppMonitorCoordinator:
+    """Executa o monitor de uma conta do WhatsApp fora do loop de eventos.
+
+    Todo acesso ao Selenium passa por um executor de uma única thread, de forma
+    que o driver é sempre usado pela mesma thread e nunca bloqueia o loop. Um
+    lock garante que dois ciclos não se sobreponham: se um ciclo já está em
+    andamento, o pedido seguinte é descartado em vez de enfileirado. As
+    verificações de todas as contas dividem as vagas de um PoolVerificacoes.
+    """
+
+    def __init__(self, hass: HomeAssistant, dados, pool=None):
+        """Inicializa o coordenador da conta sem iniciar o navegador."""
+        self.hass = hass
+        self._dados = dados
+        self.conta = dados.get("conta")
+        self.pool = pool or PoolVerificacoes()
+        self.pool.registrar(self.conta)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{DOMAIN}_selenium_{dados.get('nome', '')}"
+        )
+        self._lock = asyncio.Lock()
+        self._listeners = []
+        self._tarefa_inicio = None
+        self._tarefa_observador = None
+        self._tarefa_login = None
+        self._login_automatico = True
+        self._aguardando_eventos = False
+        self._verificacao_pendente = False
+        self._lock_resumo = asyncio.Lock()
+        self._encerrando = False
+        self.agendadores = {}
+        self.intervalo_adaptativo = criar_intervalo_adaptativo(self.config)
+        self.pronto = False
+        self.last_update_success = True
+
+    @property
+    def monitor(self):
+        """Retorna o monitor, se já inicializado."""
+        return self._dados.get("monitor")
+
+    @property
+    def dados(self):
+        """Dados da conta monitorada."""
+        return self._dados
+
+    @property
+    def config(self):
+        """Configuração atual da conta."""
+        return self._dados.get("config", {})
+
+    @property
+    def intervalo_efetivo(self):
+        """Intervalo atual entre verificações, em segundos."""
+        if self.intervalo_adaptativo:
+            return self.intervalo_adaptativo.efetivo()
+        return self.config.get("intervalo_verificacao", 15) * 60
+
+    @property
+    def em_execucao(self):
+        """Indica se há um ciclo em andamento."""
+        return self._lock.locked()
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Registra um callback chamado após cada ciclo; retorna a função de remoção."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remover():
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remover
+
+    @callback
+    def async_update_listeners(self):
+        """Notifica os ouvintes registrados."""
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    async def _async_executar(self, funcao, *args):
+        """Executa uma função bloqueante no executor do Selenium."""
+        return await self.hass.loop.run_in_executor(self._executor, funcao, *args)
+
+    @callback
+    def async_start(self):
+        """Inicia o monitor em segundo plano, sem atrasar a inicialização do HA."""
+        self._tarefa_inicio = self.hass.async_create_background_task(
+            self._async_iniciar(), f"{DOMAIN}_inicio_{self.conta}"
+        )
+
+    async def _async_iniciar(self):
+        """Cria o monitor (e o navegador) no executor."""
+        iniciar = init_monitor
+        if self.config.get("processo_separado", False):
+            iniciar = init_worker_monitor
+
+        async with self._lock:
+            self.pronto = await self._async_executar(iniciar, self.hass, self._dados)
+
+        if self.pronto and not self._encerrando:
+            self._async_iniciar_agendamento()
+        self.async_update_listeners()
+
+    @callback
+    def _async_iniciar_agendamento(self):
+        """Inicia os ciclos periódicos de verificação e resumo."""
+        config = self.config
+        jitter = config.get("jitter_agendamento", JITTER_PADRAO)
+
+        self.agendadores["verificacao"] = AgendadorCiclos(
+            self.hass, "verificacao", self.async_check_messages,
+            self.intervalo_efetivo, jitter,
+            ocupado=self._verificacao_bloqueada, ao_concluir=self.async_update_listeners,
+            conta=self.conta
+        )
+        self.agendadores["resumo"] = AgendadorCiclos(
+            self.hass, "resumo", self.async_generate_summary,
+            config.get("intervalo_resumo", 60) * 60, jitter,
+            ao_concluir=self.async_update_listeners, conta=self.conta
+        )
+        self.agendadores["limpeza"] = AgendadorCiclos(
+            self.hass, "limpeza", self.async_limpar_mensagens_vistas,
+            INTERVALO_LIMPEZA_VISTAS, jitter, conta=self.conta
+        )
+
+        # Login em passos curtos, intercalados com os demais ciclos
+        self._tarefa_login = self.hass.async_create_background_task(
+            self._async_laco_login(), f"{DOMAIN}_login_{self.conta}"
+        )
+
+        # Primeira verificação logo após a inicialização, defasada entre as contas
+        defasagem = self.pool.defasagem(self.conta, self.intervalo_efetivo)
+        self.agendadores["verificacao"].async_iniciar(atraso=1 + defasagem)
+        self.agendadores["resumo"].async_iniciar()
+        self.agendadores["limpeza"].async_iniciar(atraso=ATRASO_LIMPEZA_VISTAS)
+
+        if config.get("modo_deteccao") == "observador":
+            self._tarefa_observador = self.hass.async_create_background_task(
+                self._async_laco_observador(), f"{DOMAIN}_observador_{self.conta}"
+            )
+
+    @callback
+    def async_atualizar_config(self):
+        """Reagenda os ciclos conforme a configuração atual."""
+        config = self.config
+        self.intervalo_adaptativo = criar_intervalo_adaptativo(config)
+        if "verificacao" in self.agendadores:
+            self.agendadores["verificacao"].async_reagendar(self.intervalo_efetivo)
+        if "resumo" in self.agendadores:
+            self.agendadores["resumo"].async_reagendar(config.get("intervalo_resumo", 60) * 60)
+
+    async def _async_laco_login(self):
+        """Avança o login enquanto o monitor não está conectado."""
+        while not self._encerrando:
+            monitor = self.monitor
+            espera = INTERVALO_SESSAO_ATIVA
+            if self._login_automatico and monitor and not monitor.connected:
+                conectado = await self._async_ciclo(connect_service)
+                estado = getattr(self.monitor, "estado_login", None)
+                if not conectado and estado not in ESTADOS_LOGIN_EM_ANDAMENTO:
+                    espera = INTERVALO_NOVA_TENTATIVA_LOGIN
+                elif not conectado:
+                    espera = INTERVALO_PASSO_LOGIN
+            await asyncio.sleep(espera)
+
+    def _verificacao_bloqueada(self):
+        """Indica se a verificação periódica deve ser ignorada agora.
+
+        A espera do observador não bloqueia: a verificação fica pendente e
+        roda assim que a espera termina.
+        """
+        return self.em_execucao and not self._aguardando_eventos
+
+    async def _async_laco_observador(self):
+        """Aguarda mudanças na página e verifica as mensagens assim que ocorrem."""
+        while not self._encerrando:
+            inicio = self.hass.loop.time()
+            self._aguardando_eventos = True
+            try:
+                houve_eventos = await self._async_ciclo(
+                    wait_events_service, ESPERA_OBSERVADOR, usar_pool=True, registrar_sucesso=False
+                )
+            finally:
+                self._aguardando_eventos = False
+
+            # Verificar pelo mesmo caminho do agendador, que alimenta o
+            # intervalo adaptativo; inclui a verificação periódica que venceu
+            # durante a espera
+            if (houve_eventos or self._verificacao_pendente) and not self._encerrando:
+                await self.async_check_messages()
+
+            # Ceder espaço a outros ciclos e evitar laço apertado em caso de falha
+            decorrido = self.hass.loop.time() - inicio
+            await asyncio.sleep(1 if decorrido >= 1 else 5)
+
+    async def _async_ciclo(self, funcao, *args, usar_pool=False, registrar_sucesso=True):
+        """Executa um ciclo, descartando-o se outro já estiver em andamento.
+
+        Com `usar_pool`, o ciclo aguarda uma vaga no pool compartilhado entre
+        as contas antes de usar o navegador. Sem `registrar_sucesso`, o
+        resultado não altera last_update_success (ex.: espera sem eventos).
+        """
+        if self._encerrando or not self.pronto:
+            _LOGGER.debug("Monitor do WhatsApp indisponível; ciclo ignorado")
+            return False
+
+        if self._lock.locked():
+            _LOGGER.debug(f"Ciclo {funcao.__name__} ignorado: outro ciclo em andamento")
+            return False
+
+        async with self.pool.vaga() if usar_pool else nullcontext():
+            # Outro ciclo da conta pode ter começado enquanto a vaga era aguardada
+            if self._encerrando or self._lock.locked():
+                return False
+
+            async with self._lock:
+                try:
+                    resultado = await self._async_executar(funcao, self.hass, self._dados, *args)
+                    if registrar_sucesso:
+                        self.last_update_success = bool(resultado)
+                except Exception as e:
+                    _LOGGER.error(f"Erro no ciclo {funcao.__name__}: {e}")
+                    self.last_update_success = False
+                    resultado = False
+
+        self.async_update_listeners()
+        return resultado
+
+    async def async_check_messages(self):
+        """Verifica mensagens sem bloquear o loop de eventos."""
+        if self._aguardando_eventos and self._lock.locked():
+            # O observador está aguardando eventos: verificar ao fim da espera
+            self._verificacao_pendente = True
+            return True
+
+        self._verificacao_pendente = False
+        resultado = await self._async_ciclo(check_messages_service, usar_pool=True)
+        if resultado and self.intervalo_adaptativo:
+            self._async_adaptar_intervalo()
+
+        # Conversas adiadas pelo orçamento do ciclo são visitadas logo em seguida
+        estatisticas = getattr(self.monitor, "estatisticas_ciclo", None) or {}
+        agendador = self.agendadores.get("verificacao")
+        if resultado and agendador and estatisticas.get("chats_adiados"):
+            agendador.async_antecipar(ATRASO_CONVERSAS_ADIADAS)
+        return resultado
+
+    @callback
+    def _async_adaptar_intervalo(self):
+        """Ajusta o intervalo de verificação conforme a atividade do último ciclo."""
+        estatisticas = getattr(self.monitor, "estatisticas_ciclo", None) or {}
+
+        # Um ciclo ignorado ou com falha não observou o WhatsApp: o intervalo fica como está
+        if not estatisticas.get("verificado"):
+            return
+
+        houve_atividade = bool(
+            estatisticas.get("chats_nao_lidos") or estatisticas.get("mensagens_importantes")
+        )
+        intervalo = self.intervalo_adaptativo.registrar(houve_atividade)
+
+        agendador = self.agendadores.get("verificacao")
+        if agendador:
+            agendador.async_reagendar(intervalo)
+        self.async_update_listeners()
+
+    async def async_generate_summary(self):
+        """Gera um resumo sem bloquear o loop de eventos.
+
+        O resumo não usa o navegador, então roda no executor padrão do HA e
+        não disputa o executor do Selenium com as verificações.
+        """
+        if self._encerrando or not self.pronto or self._lock_resumo.locked():
+            return False
+
+        async with self._lock_resumo:
+            resultado = await self.hass.async_add_executor_job(
+                generate_summary_service, self.hass, self._dados
+            )
+
+        self.async_update_listeners()
+        return resultado
+
+    async def async_limpar_mensagens_vistas(self):
+        """Descarta as impressões antigas do índice de mensagens vistas.
+
+        Só usa o banco de dados, então roda no executor padrão do HA.
+        """
+        if self._encerrando:
+            return False
+        return await self.hass.async_add_executor_job(
+            prune_seen_service, self.hass, self._dados,
+            self.config.get("dias_indice_vistas", DIAS_MENSAGENS_VISTAS)
+        )
+
+    async def async_connect(self):
+        """Inicia (ou avança) o login no WhatsApp Web sem bloquear o loop de eventos."""
+        self._login_automatico = True
+        return await self._async_ciclo(connect_service)
+
+    async def async_disconnect(self):
+        """Desconecta do WhatsApp Web sem bloquear o loop de eventos."""
+        # Não reconectar automaticamente até um novo pedido de conexão
+        self._login_automatico = False
+        return await self._async_ciclo(disconnect_service)
+
+    async def async_stop(self):
+        """Encerra o monitor e fecha o navegador no executor do Selenium.
+
+        O fechamento entra na fila depois do ciclo em andamento, que é
+        interrompido nas esperas longas; após TEMPO_LIMITE_ENCERRAMENTO, o
+        encerramento segue e o navegador é fechado quando o ciclo terminar.
+        """
+        self._encerrando = True
+        self.pool.remover(self.conta)
+
+        for agendador in self.agendadores.values():
+            agendador.async_parar()
+        for tarefa in (self._tarefa_observador, self._tarefa_login):
+            if tarefa and not tarefa.done():
+                tarefa.cancel()
+
+        # Interromper esperas longas e fechar o Chrome na mesma thread que é
+        # dona do driver, depois do ciclo em andamento
+        monitor = self.monitor
+        if monitor:
+            monitor.encerrar()
+            fechamento = self._executor.submit(monitor.disconnect)
+        else:
+            # O monitor ainda está sendo criado: fechá-lo assim que ficar pronto
+            fechamento = self._executor.submit(self._encerrar_apos_inicio)
+
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(fechamento), TEMPO_LIMITE_ENCERRAMENTO)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                f"Ciclo em andamento não terminou em {TEMPO_LIMITE_ENCERRAMENTO} s; "
+                "o navegador será fechado ao fim do ciclo"
+            )
+        except Exception as e:
+            _LOGGER.error(f"Erro ao fechar o navegador: {e}")
+
+        self._executor.shutdown(wait=False)
+        self._listeners.clear()
+
+    def _encerrar_apos_inicio(self):
+        """Fecha o navegador criado por uma inicialização interrompida."""
+        monitor = self.monitor
+        if monitor:
+            monitor.disconnect()
@@ -0,0 +1,147 @@
+"""
+WhatsApp Monitor - Índice de mensagens já vistas para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import re
+import hashlib
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+
+_LOGGER = logging.getLogger(__name__)
+
+# Número de impressões digitais mantidas em memória
+CAPACIDADE_INDICE = 5000
+
+# Dias em que uma impressão fica no armazenamento antes de ser descartada
+DIAS_MENSAGENS_VISTAS = 30
+
+# Separador das chaves montadas quando a mensagem não tem data-id
+# (hora + separador + texto, como em chaveMensagem)
+SEPARADOR_CHAVE = "\x1f"
+
+# Tolerância para o relógio do celular adiantado em relação ao do host (minutos)
+TOLERANCIA_HORA = 5
+
+_PADRAO_HORA = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+def data_mensagem(hora, agora=None):
+    """Data provável de uma mensagem a partir da hora exibida ('HH:MM').
+
+    A lista e a conversa mostram só a hora das mensagens recentes: uma hora
+    mais adiantada que o relógio atual é de ontem (mensagem lida logo após a
+    meia-noite). Sem hora reconhecível, vale a data atual.
+    """
+    agora = agora or datetime.datetime.now()
+    data = agora.date()
+    encontrada = _PADRAO_HORA.search(hora or "")
+    if encontrada:
+        horas, minutos = int(encontrada.group(1)), int(encontrada.group(2))
+        if horas * 60 + minutos > agora.hour * 60 + agora.minute + TOLERANCIA_HORA:
+            data -= datetime.timedelta(days=1)
+    return data.isoformat()
+
+
+def id_mensagem(chave):
+    """Retorna o data-id da mensagem, ou None se a chave foi montada de hora e texto."""
+    if not chave or SEPARADOR_CHAVE in chave:
+        return None
+    return chave
+
+
+def impressao_digital(contato, hora, texto, ocorrencia=1, data=None, id_dom=None):
+    """Calcula a impressão digital de uma mensagem.
+
+    Com o data-id da página (`id_dom`), a chave é o próprio identificador da
+    mensagem. Sem ele, a chave combina contato, data, hora exibida e um hash
+    do texto; `ocorrencia` distingue mensagens idênticas enviadas no mesmo
+    minuto e lidas na mesma janela.
+    """
+    if id_dom:
+        chave = f"{contato}\x1fid\x1f{id_dom}"
+    else:
+        resumo_texto = hashlib.blake2b((texto or "").encode("utf-8"), digest_size=8).hexdigest()
+        chave = f"{contato}\x1f{data}\x1f{hora}\x1f{resumo_texto}\x1f{ocorrencia}"
+    return hashlib.blake2b(chave.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def impressoes_mensagens(contato, mensagens, agora=None):
+    """Retorna a impressão digital de cada mensagem lida de uma conversa."""
+    agora = agora or datetime.datetime.now()
+    ocorrencias = {}
+    impressoes = []
+    for msg in mensagens:
+        id_dom = id_mensagem(msg.get('chave'))
+        if id_dom:
+            impressoes.append(impressao_digital(contato, None, None, id_dom=id_dom))
+            continue
+        chave = (msg.get('hora'), msg.get('texto'))
+        ocorrencias[chave] = ocorrencias.get(chave, 0) + 1
+        impressoes.append(impressao_digital(
+            contato, chave[0], chave[1], ocorrencias[chave], data=data_mensagem(chave[0], agora)
+        ))
+    return impressoes
+
+
+class IndiceMensagensVistas:
+    """Conjunto LRU limitado de mensagens já processadas.
+
+    As consultas são respondidas pela memória sempre que possível; as
+    impressões que não estão em memória são buscadas no armazenamento, que
+    mantém o índice entre reinicializações. Sem armazenamento, o índice
+    funciona apenas em memória.
+    """
+
+    def __init__(self, storage=None, capacidade=CAPACIDADE_INDICE):
+        """Inicializa o índice vazio."""
+        self.storage = storage
+        self.capacidade = max(1, capacidade)
+        self._vistas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._vistas)
+
+    def _lembrar(self, impressoes):
+        """Adiciona impressões à memória, descartando as menos usadas."""
+        vistas = self._vistas
+        for impressao in impressoes:
+            vistas[impressao] = None
+            vistas.move_to_end(impressao)
+        while len(vistas) > self.capacidade:
+            vistas.popitem(last=False)
+
+    def filtrar_novas(self, impressoes):
+        """Retorna o conjunto das impressões ainda não vistas."""
+        with self._lock:
+            desconhecidas = []
+            for impressao in impressoes:
+                if impressao in self._vistas:
+                    self._vistas.move_to_end(impressao)
+                else:
+                    desconhecidas.append(impressao)
+
+        if not desconhecidas or self.storage is None:
+            return set(desconhecidas)
+
+        persistidas = self.storage.obter_mensagens_vistas(desconhecidas)
+        if persistidas:
+            with self._lock:
+                self._lembrar(persistidas)
+        return set(desconhecidas) - persistidas
+
+    def marcar(self, impressoes):
+        """Registra impressões como vistas, em memória e no armazenamento."""
+        impressoes = list(impressoes)
+        if not impressoes:
+            return 0
+
+        with self._lock:
+            self._lembrar(impressoes)
+
+        if self.storage is not None:
+            self.storage.registrar_mensagens_vistas(impressoes)
+        return len(impressoes)
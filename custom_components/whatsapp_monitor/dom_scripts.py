@@ -0,0 +1,239 @@
+"""
+WhatsApp Monitor - Scripts executados no WhatsApp Web para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+Cada script retorna uma estrutura JSON compacta, de forma que uma leitura
+completa custe uma única chamada ao WebDriver em vez de uma chamada por
+elemento.
+"""
+
+# Seletores usados pelos scripts
+SELETOR_LINHAS_CHAT = 'div[data-testid="chat-list"] div[role="row"]'
+SELETOR_NAO_LIDAS = 'span[data-testid="icon-unread"]'
+SELETOR_CONTATO = 'span[data-testid="default-user"]'
+SELETOR_PREVIA = 'div[data-testid="cell-frame-secondary"] span[title]'
+SELETOR_HORA_PREVIA = 'div[data-testid="cell-frame-primary-detail"]'
+SELETOR_MENSAGEM = 'div[data-testid="msg-container"]'
+SELETOR_TEXTO = 'span[data-testid="msg-text"]'
+SELETOR_META = 'div[data-testid="msg-meta"]'
+SELETOR_VOLTAR = 'button[data-testid="back"]'
+
+# Funções auxiliares compartilhadas pelos scripts
+_FUNCOES = """
+var SEL = {
+    linhas: '%(linhas)s',
+    naoLidas: '%(nao_lidas)s',
+    contato: '%(contato)s',
+    previa: '%(previa)s',
+    horaPrevia: '%(hora_previa)s',
+    mensagem: '%(mensagem)s',
+    texto: '%(texto)s',
+    meta: '%(meta)s',
+    voltar: '%(voltar)s'
+};
+function textoDe(raiz, seletor) {
+    var el = raiz.querySelector(seletor);
+    return el ? el.textContent : null;
+}
+function lerLinha(linha, indice) {
+    var badge = linha.querySelector(SEL.naoLidas);
+    var previa = linha.querySelector(SEL.previa);
+    return {
+        i: indice,
+        c: textoDe(linha, SEL.contato),
+        n: badge ? (parseInt(badge.textContent, 10) || 1) : 0,
+        p: previa ? (previa.getAttribute('title') || previa.textContent) : null,
+        h: textoDe(linha, SEL.horaPrevia) || ''
+    };
+}
+function chaveMensagem(conteiner, texto, hora) {
+    var comId = conteiner.closest('[data-id]') || conteiner.querySelector('[data-id]');
+    var id = comId ? comId.getAttribute('data-id') : null;
+    return id || (hora + '\\u001f' + texto);
+}
+function hashTexto(texto) {
+    var h = 2166136261;
+    for (var i = 0; i < texto.length; i++) {
+        h ^= texto.charCodeAt(i);
+        h = Math.imul(h, 16777619) >>> 0;
+    }
+    return h.toString(16);
+}
+function digestoLinha(chat) {
+    return hashTexto([chat.c, chat.n, chat.p, chat.h].join('\\u001f'));
+}
+function lerMensagens(limite, marca) {
+    var conteineres = document.querySelectorAll(SEL.mensagem);
+    var mensagens = [], encontrou = false;
+    for (var i = conteineres.length - 1; i >= 0 && mensagens.length < limite; i--) {
+        var texto = textoDe(conteineres[i], SEL.texto);
+        if (texto === null) continue;
+        var hora = textoDe(conteineres[i], SEL.meta) || '';
+        var chave = chaveMensagem(conteineres[i], texto, hora);
+        if (marca && chave === marca) { encontrou = true; break; }
+        mensagens.push({t: texto, h: hora, k: chave});
+    }
+    mensagens.reverse();
+    return {m: mensagens, a: encontrou || !marca, total: conteineres.length};
+}
+""" % {
+    "linhas": SELETOR_LINHAS_CHAT,
+    "nao_lidas": SELETOR_NAO_LIDAS,
+    "contato": SELETOR_CONTATO,
+    "previa": SELETOR_PREVIA,
+    "hora_previa": SELETOR_HORA_PREVIA,
+    "mensagem": SELETOR_MENSAGEM,
+    "texto": SELETOR_TEXTO,
+    "meta": SELETOR_META,
+    "voltar": SELETOR_VOLTAR,
+}
+
+# Lista de conversas: {d: digesto da lista, s: [{i: índice, c: contato,
+# n: não lidas, p: prévia, h: hora da prévia, d: digesto da linha}]}.
+# Se o digesto for igual a arguments[0], as linhas não são transferidas (s: null).
+SCRIPT_LISTA_CHATS = _FUNCOES + """
+var anterior = arguments.length ? arguments[0] : null;
+var linhas = document.querySelectorAll(SEL.linhas);
+var chats = [], digestos = [];
+for (var i = 0; i < linhas.length; i++) {
+    var chat = lerLinha(linhas[i], i);
+    chat.d = digestoLinha(chat);
+    chats.push(chat);
+    digestos.push(chat.d);
+}
+var digesto = hashTexto(digestos.join(','));
+if (anterior && anterior === digesto) return {d: digesto, s: null};
+return {d: digesto, s: chats};
+"""
+
+# Abre uma conversa e lê as mensagens posteriores à marca (script assíncrono).
+# Argumentos: contato, índice de referência, limite de mensagens, espera máxima
+# (ms), marca da última mensagem processada (ou null) e número máximo de
+# rolagens para carregar mensagens anteriores até encontrar a marca.
+# Retorna [{t: texto, h: hora, k: chave}] em ordem cronológica.
+SCRIPT_ABRIR_CHAT = _FUNCOES + """
+var contato = arguments[0], indice = arguments[1], limite = arguments[2];
+var esperaMaxima = arguments[3], marca = arguments[4], maxRolagens = arguments[5];
+var concluir = arguments[arguments.length - 1];
+var rolagens = 0;
+var linhas = document.querySelectorAll(SEL.linhas);
+var alvo = null;
+if (indice < linhas.length && textoDe(linhas[indice], SEL.contato) === contato) {
+    alvo = linhas[indice];
+} else {
+    for (var i = 0; i < linhas.length; i++) {
+        if (textoDe(linhas[i], SEL.contato) === contato) { alvo = linhas[i]; break; }
+    }
+}
+if (!alvo) { concluir(null); return; }
+var anteriores = document.querySelectorAll(SEL.mensagem);
+var ultimaAnterior = anteriores.length ? anteriores[anteriores.length - 1] : null;
+alvo.click();
+function coletar() {
+    var leitura = lerMensagens(limite, marca);
+    var primeira = document.querySelector(SEL.mensagem);
+    if (leitura.a || leitura.m.length >= limite || rolagens >= maxRolagens || !primeira) {
+        concluir(leitura.m);
+        return;
+    }
+    // A marca ainda não apareceu: rolar para cima e aguardar mensagens anteriores
+    rolagens++;
+    primeira.scrollIntoView();
+    var inicioRolagem = Date.now();
+    (function aguardarRolagem() {
+        if (document.querySelectorAll(SEL.mensagem).length > leitura.total ||
+                Date.now() - inicioRolagem > esperaMaxima) {
+            coletar();
+        } else {
+            setTimeout(aguardarRolagem, 100);
+        }
+    })();
+}
+var inicio = Date.now();
+(function aguardar() {
+    var atuais = document.querySelectorAll(SEL.mensagem);
+    var ultima = atuais.length ? atuais[atuais.length - 1] : null;
+    if ((ultima && ultima !== ultimaAnterior) || Date.now() - inicio > esperaMaxima) {
+        coletar();
+    } else {
+        setTimeout(aguardar, 50);
+    }
+})();
+"""
+
+# Volta para a lista de conversas, se o botão existir
+SCRIPT_VOLTAR = _FUNCOES + """
+var botao = document.querySelector(SEL.voltar);
+if (botao) { botao.click(); return true; }
+return false;
+"""
+
+# Observador de mudanças na lista de conversas. Os eventos ficam em memória
+# na página até serem drenados: {c: contato, n: não lidas, ts: horário (ms)}
+SCRIPT_INSTALAR_OBSERVADOR = _FUNCOES + """
+var limiteEventos = arguments[0];
+var lista = document.querySelector('div[data-testid="chat-list"]');
+if (!lista) return false;
+var estado = window.__whatsappMonitor;
+if (estado && estado.alvo === lista) return true;
+if (estado && estado.observador) estado.observador.disconnect();
+estado = window.__whatsappMonitor = {alvo: lista, eventos: [], aguardando: null, timer: null};
+function notificar() {
+    if (estado.aguardando && estado.eventos.length) {
+        var concluir = estado.aguardando;
+        estado.aguardando = null;
+        clearTimeout(estado.timer);
+        var eventos = estado.eventos;
+        estado.eventos = [];
+        concluir(eventos);
+    }
+}
+estado.observador = new MutationObserver(function (mutacoes) {
+    var vistas = [];
+    for (var i = 0; i < mutacoes.length; i++) {
+        var no = mutacoes[i].target;
+        if (no.nodeType !== 1) no = no.parentElement;
+        var linha = no && no.closest ? no.closest('div[role="row"]') : null;
+        if (!linha || vistas.indexOf(linha) >= 0) continue;
+        vistas.push(linha);
+        var chat = lerLinha(linha, -1);
+        if (chat.c === null || !chat.n) continue;
+        estado.eventos.push({c: chat.c, n: chat.n, ts: Date.now()});
+    }
+    if (estado.eventos.length > limiteEventos) {
+        estado.eventos.splice(0, estado.eventos.length - limiteEventos);
+    }
+    notificar();
+});
+estado.observador.observe(lista, {childList: true, subtree: true, characterData: true});
+return true;
+"""
+
+# Drena os eventos acumulados; retorna null se o observador não está ativo
+SCRIPT_DRENAR_EVENTOS = """
+var estado = window.__whatsappMonitor;
+if (!estado || !document.contains(estado.alvo)) return null;
+var eventos = estado.eventos;
+estado.eventos = [];
+return eventos;
+"""
+
+# Aguarda eventos por até arguments[0] ms (script assíncrono)
+SCRIPT_AGUARDAR_EVENTOS = """
+var espera = arguments[0], concluir = arguments[arguments.length - 1];
+var estado = window.__whatsappMonitor;
+if (!estado || !document.contains(estado.alvo)) { concluir(null); return; }
+if (estado.eventos.length) {
+    var eventos = estado.eventos;
+    estado.eventos = [];
+    concluir(eventos);
+    return;
+}
+estado.aguardando = concluir;
+estado.timer = setTimeout(function () {
+    if (estado.aguardando === concluir) {
+        estado.aguardando = null;
+        concluir([]);
+    }
+}, espera);
+"""
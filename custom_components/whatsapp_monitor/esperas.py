@@ -0,0 +1,126 @@
+"""
+WhatsApp Monitor - Esperas por condições da página para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import time
+import logging
+
+from .dom_scripts import SELETOR_LINHAS_CHAT, SELETOR_MENSAGEM
+from .navegador import By
+
+_LOGGER = logging.getLogger(__name__)
+
+# Intervalo padrão entre verificações de uma condição (segundos)
+INTERVALO_VERIFICACAO = 0.2
+
+# Elementos da página
+XPATH_LISTA_CHATS = '//div[@data-testid="chat-list"]'
+XPATH_QR_CODE = '//canvas[contains(@aria-label, "Scan me!") or contains(@aria-label, "Escanear")]'
+
+# Estados da página de entrada
+PAGINA_LISTA = "lista"
+PAGINA_QR = "qr"
+
+
+def pagina_pronta(driver):
+    """Página inicial carregada: retorna PAGINA_LISTA (sessão ativa) ou PAGINA_QR."""
+    if driver.find_elements(By.XPATH, XPATH_LISTA_CHATS):
+        return PAGINA_LISTA
+    if driver.find_elements(By.XPATH, XPATH_QR_CODE):
+        return PAGINA_QR
+    return False
+
+
+def lista_renderizada(driver):
+    """Lista de conversas exibida com pelo menos uma linha."""
+    return bool(driver.find_elements(By.CSS_SELECTOR, SELETOR_LINHAS_CHAT))
+
+
+def qr_alterado(anterior):
+    """Condição: QR Code diferente de `anterior` ou sessão autenticada.
+
+    Retorna (PAGINA_LISTA, None) após a autenticação ou (PAGINA_QR, imagem em
+    base64) quando o WhatsApp Web gera um novo QR Code.
+    """
+    def condicao(driver):
+        if driver.find_elements(By.XPATH, XPATH_LISTA_CHATS):
+            return (PAGINA_LISTA, None)
+        canvas = driver.find_elements(By.XPATH, XPATH_QR_CODE)
+        if not canvas:
+            return False
+        imagem = driver.execute_script(
+            "return arguments[0].toDataURL('image/png').substring(22);", canvas[0]
+        )
+        if imagem and imagem != anterior:
+            return (PAGINA_QR, imagem)
+        return False
+    return condicao
+
+
+def conversa_carregada(ultima_anterior):
+    """Condição: painel da conversa exibe uma última mensagem diferente da anterior."""
+    def condicao(driver):
+        mensagens = driver.find_elements(By.CSS_SELECTOR, SELETOR_MENSAGEM)
+        return bool(mensagens) and mensagens[-1] != ultima_anterior
+    return condicao
+
+
+class MotorEspera:
+    """Aguarda condições da página com tempo limite e registra a duração de cada espera.
+
+    `obter_driver` e `encerrando` são funções, de forma que o motor acompanha a
+    recriação do driver e interrompe a espera quando o monitor é encerrado.
+    """
+
+    def __init__(self, obter_driver, encerrando=None):
+        """Inicializa o motor sem métricas."""
+        self._obter_driver = obter_driver
+        self._encerrando = encerrando or (lambda: False)
+        self.metricas = {}
+
+    def registrar(self, nome, duracao, esgotada=False):
+        """Registra a duração de uma espera (também usada por esperas feitas na página)."""
+        metrica = self.metricas.get(nome)
+        if metrica is None:
+            metrica = self.metricas[nome] = {
+                "total": 0, "esgotadas": 0, "ultima": None, "media": None, "maxima": None,
+            }
+        metrica["total"] += 1
+        if esgotada:
+            metrica["esgotadas"] += 1
+        metrica["ultima"] = round(duracao, 3)
+        metrica["maxima"] = round(max(duracao, metrica["maxima"] or 0), 3)
+        media = metrica["media"]
+        metrica["media"] = round(duracao if media is None else media * 0.8 + duracao * 0.2, 3)
+
+    def aguardar(self, nome, condicao, tempo_limite, intervalo=INTERVALO_VERIFICACAO):
+        """Aguarda até `condicao(driver)` ser verdadeira e retorna o seu valor.
+
+        Retorna None se o tempo limite se esgotar ou se o monitor for encerrado.
+        """
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self._obter_driver()
+        if driver is None:
+            return None
+
+        encerrando = self._encerrando
+        inicio = time.monotonic()
+        try:
+            resultado = WebDriverWait(driver, tempo_limite, poll_frequency=intervalo).until(
+                lambda d: encerrando() or condicao(d)
+            )
+        except TimeoutException:
+            self.registrar(nome, time.monotonic() - inicio, esgotada=True)
+            _LOGGER.debug(f"Espera '{nome}' esgotada após {tempo_limite}s")
+            return None
+        except WebDriverException as e:
+            _LOGGER.debug(f"Espera '{nome}' interrompida: {e}")
+            return None
+
+        if encerrando():
+            return None
+        self.registrar(nome, time.monotonic() - inicio)
+        return resultado
@@ -0,0 +1,136 @@
+"""
+WhatsApp Monitor - Identificação de mensagens importantes para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import re
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Palavras-chave usadas quando a configuração não define nenhuma
+PALAVRAS_CHAVE_PADRAO = [
+    'urgente', 'importante', 'atenção', 'prioridade', 'crítico',
+    'emergência', 'ajuda', 'socorro', 'imediato', 'prazo'
+]
+
+# Padrões de urgência sempre verificados
+PADROES_URGENCIA = [
+    'preciso agora', 'preciso hoje', 'preciso urgente',
+    'me ajuda', 'socorro', 'emergência', 'urgente',
+    'não pode esperar', 'imediatamente'
+]
+
+# Tipos de correspondência
+TIPO_CONTATO = "contato"
+TIPO_PALAVRA_CHAVE = "palavra_chave"
+TIPO_URGENCIA = "urgencia"
+
+
+def _trie_para_regex(no):
+    """Converte um nó da trie de padrões em uma expressão regular."""
+    fim = "" in no
+    ramos = []
+    caracteres = []
+    for char, filho in sorted(no.items()):
+        if char == "":
+            continue
+        sufixo = _trie_para_regex(filho)
+        if sufixo:
+            ramos.append(re.escape(char) + sufixo)
+        else:
+            caracteres.append(char)
+
+    if len(caracteres) == 1:
+        ramos.append(re.escape(caracteres[0]))
+    elif caracteres:
+        ramos.append("[" + "".join(re.escape(c) for c in caracteres) + "]")
+
+    if not ramos:
+        return ""
+
+    corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+    if fim:
+        # Continuação opcional e gulosa: prefere o padrão mais longo
+        if len(ramos) == 1 and not corpo.startswith("(?:"):
+            corpo = "(?:" + corpo + ")"
+        corpo += "?"
+    return corpo
+
+
+class KeywordMatcher:
+    """Identifica mensagens importantes com uma única varredura do texto.
+
+    Palavras-chave e padrões de urgência são compilados uma única vez em uma
+    expressão regular organizada como trie (prefixos comuns compartilhados),
+    de forma que o custo por mensagem não cresce com o número de palavras.
+    """
+
+    def __init__(self, palavras_chave=None, contatos_importantes=None, padroes_urgencia=None):
+        """Compila o identificador a partir das listas informadas."""
+        if palavras_chave is None:
+            palavras_chave = PALAVRAS_CHAVE_PADRAO
+        if padroes_urgencia is None:
+            padroes_urgencia = PADROES_URGENCIA
+
+        self.contatos_importantes = frozenset(contatos_importantes or [])
+
+        # Mapear cada padrão normalizado para (tipo, texto original);
+        # palavras-chave têm precedência sobre padrões de urgência
+        self._padroes = {}
+        for padrao in padroes_urgencia:
+            chave = padrao.lower()
+            if chave:
+                self._padroes[chave] = (TIPO_URGENCIA, padrao)
+        for palavra in palavras_chave:
+            chave = palavra.lower()
+            if chave:
+                self._padroes[chave] = (TIPO_PALAVRA_CHAVE, palavra)
+
+        self._regex = self._compilar(self._padroes)
+
+    @classmethod
+    def from_config(cls, config):
+        """Cria o identificador a partir da configuração do componente."""
+        return cls(
+            palavras_chave=config.get('palavras_chave', PALAVRAS_CHAVE_PADRAO),
+            contatos_importantes=config.get('contatos_importantes', []),
+        )
+
+    @staticmethod
+    def _compilar(padroes):
+        """Compila os padrões em uma expressão regular única."""
+        if not padroes:
+            return None
+
+        trie = {}
+        for padrao in padroes:
+            no = trie
+            for char in padrao:
+                no = no.setdefault(char, {})
+            no[""] = {}
+
+        return re.compile(_trie_para_regex(trie))
+
+    @property
+    def num_padroes(self):
+        """Número de padrões de texto compilados."""
+        return len(self._padroes)
+
+    def match(self, contato, mensagem):
+        """Retorna (tipo, padrão) da primeira correspondência ou None."""
+        if contato in self.contatos_importantes:
+            return (TIPO_CONTATO, contato)
+
+        if self._regex is None or not mensagem:
+            return None
+
+        resultado = self._regex.search(mensagem.lower())
+        if resultado:
+            return self._padroes[resultado.group(0)]
+
+        return None
+
+    def is_important(self, contato, mensagem):
+        """Verifica se uma mensagem é importante."""
+        return self.match(contato, mensagem) is not None
@@ -0,0 +1,337 @@
+"""
+WhatsApp Monitor - Configuração e medição do navegador para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import os
+import json
+import shutil
+import signal
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Arquivo com o caminho do chromedriver já resolvido, relativo ao config_dir
+ARQUIVO_CACHE_DRIVER = "chromedriver.json"
+
+# Modos do navegador
+MODO_NAVEGADOR_PADRAO = "padrao"
+MODO_NAVEGADOR_LEVE = "leve"
+
+# Argumentos usados em todos os modos
+ARGUMENTOS_BASE = (
+    "--headless",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--window-size=1280,720",
+    "--disable-extensions",
+    "--disable-plugins-discovery",
+    "--disable-blink-features=AutomationControlled",
+)
+RECURSOS_DESATIVADOS_BASE = ("TranslateUI",)
+
+# Modo leve: um único processo de renderização, heap de JS limitado e sem
+# tráfego em segundo plano, animações ou carregamento de imagens
+ARGUMENTOS_LEVES = (
+    "--renderer-process-limit=1",
+    "--js-flags=--max-old-space-size=256",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-smooth-scrolling",
+    "--force-prefers-reduced-motion",
+    "--blink-settings=imagesEnabled=false",
+    "--disk-cache-size=1048576",
+    "--aggressive-cache-discard",
+)
+RECURSOS_DESATIVADOS_LEVES = (
+    "MediaRouter",
+    "OptimizationHints",
+    "AutofillServerCommunication",
+    "InterestFeedContentSuggestions",
+    "BackForwardCache",
+)
+
+# Configurações de conteúdo do perfil no modo leve (2 = bloquear)
+PREFERENCIAS_LEVES = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+    "profile.managed_default_content_settings.geolocation": 2,
+    "profile.managed_default_content_settings.sound": 2,
+}
+
+
+class By:
+    """Estratégias de localização usadas pelo monitor.
+
+    Mesmos valores de selenium.webdriver.common.by.By, repetidos aqui para
+    que o Selenium só seja importado quando o navegador é iniciado.
+    """
+
+    XPATH = "xpath"
+    CSS_SELECTOR = "css selector"
+
+
+# Recursos bloqueados pela interceptação de rede (DevTools) no modo leve:
+# fotos de perfil, mídias, figurinhas e fontes
+URLS_BLOQUEADAS = (
+    "*pps.whatsapp.net*",
+    "*mmg.whatsapp.net*",
+    "*media*.whatsapp.net*",
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg",
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.opus",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+)
+
+
+def criar_opcoes(profile_dir, modo=MODO_NAVEGADOR_PADRAO, caminho_navegador=None):
+    """Cria as opções do Chrome para o modo informado."""
+    from selenium.webdriver.chrome.options import Options
+
+    opcoes = Options()
+    if caminho_navegador:
+        opcoes.binary_location = caminho_navegador
+    for argumento in ARGUMENTOS_BASE:
+        opcoes.add_argument(argumento)
+    opcoes.add_argument(f"--user-data-dir={profile_dir}")
+
+    recursos_desativados = list(RECURSOS_DESATIVADOS_BASE)
+    if modo == MODO_NAVEGADOR_LEVE:
+        for argumento in ARGUMENTOS_LEVES:
+            opcoes.add_argument(argumento)
+        recursos_desativados.extend(RECURSOS_DESATIVADOS_LEVES)
+        opcoes.add_experimental_option("prefs", PREFERENCIAS_LEVES)
+
+    # O Chrome considera apenas o último --disable-features
+    opcoes.add_argument(f"--disable-features={','.join(recursos_desativados)}")
+    return opcoes
+
+
+def _ler_cache_driver(config_dir):
+    """Caminho do chromedriver em cache, se ainda existir e for executável."""
+    try:
+        with open(os.path.join(config_dir, ARQUIVO_CACHE_DRIVER)) as arquivo:
+            caminho = json.load(arquivo).get("caminho")
+    except (OSError, ValueError, AttributeError):
+        return None
+    if caminho and os.access(caminho, os.X_OK):
+        return caminho
+    return None
+
+
+def _gravar_cache_driver(config_dir, caminho):
+    """Grava o caminho do chromedriver resolvido."""
+    try:
+        with open(os.path.join(config_dir, ARQUIVO_CACHE_DRIVER), "w") as arquivo:
+            json.dump({"caminho": caminho}, arquivo)
+    except OSError as e:
+        _LOGGER.warning(f"Não foi possível gravar o cache do chromedriver: {e}")
+
+
+def invalidar_cache_driver(config_dir):
+    """Descarta o caminho do chromedriver em cache."""
+    try:
+        os.remove(os.path.join(config_dir, ARQUIVO_CACHE_DRIVER))
+    except OSError:
+        pass
+
+
+def resolver_chromedriver(config_dir, caminho_configurado=None):
+    """Retorna o caminho do chromedriver.
+
+    Usa, nesta ordem: o caminho configurado, o caminho em cache, o
+    webdriver_manager (que precisa de rede; o resultado vai para o cache) e,
+    sem rede, o chromedriver encontrado no PATH.
+    """
+    if caminho_configurado:
+        return caminho_configurado
+
+    caminho = _ler_cache_driver(config_dir)
+    if caminho:
+        return caminho
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        caminho = ChromeDriverManager().install()
+    except Exception as e:
+        caminho = shutil.which("chromedriver")
+        if caminho is None:
+            raise
+        _LOGGER.warning(f"webdriver_manager indisponível ({e}); usando {caminho}")
+
+    _gravar_cache_driver(config_dir, caminho)
+    return caminho
+
+
+def iniciar_driver(config_dir, profile_dir, modo=MODO_NAVEGADOR_PADRAO,
+                   caminho_chromedriver=None, caminho_navegador=None):
+    """Inicia o Chrome com o chromedriver resolvido uma única vez.
+
+    Se o driver em cache não iniciar (por exemplo, após uma atualização do
+    Chrome), o cache é descartado e o caminho é resolvido novamente.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    opcoes = criar_opcoes(profile_dir, modo, caminho_navegador)
+    em_cache = not caminho_chromedriver and _ler_cache_driver(config_dir) is not None
+    caminho = resolver_chromedriver(config_dir, caminho_chromedriver)
+    try:
+        return webdriver.Chrome(service=Service(caminho), options=opcoes)
+    except Exception as e:
+        if not em_cache:
+            raise
+        _LOGGER.warning(f"Chromedriver em cache não iniciou ({e}); resolvendo novamente")
+        invalidar_cache_driver(config_dir)
+        caminho = resolver_chromedriver(config_dir)
+        return webdriver.Chrome(service=Service(caminho), options=opcoes)
+
+
+def aplicar_bloqueios(driver, modo=MODO_NAVEGADOR_PADRAO):
+    """Bloqueia recursos pesados via DevTools; deve ser chamada antes de abrir a página."""
+    if modo != MODO_NAVEGADOR_LEVE:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(URLS_BLOQUEADAS)})
+        return True
+    except Exception as e:
+        _LOGGER.warning(f"Não foi possível bloquear recursos via DevTools: {e}")
+        return False
+
+
+def _processos_filhos():
+    """Mapeia cada pid para a lista de pids filhos, a partir de /proc."""
+    filhos = {}
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as arquivo:
+                # O nome do processo pode conter espaços: o ppid vem após o ')'
+                campos = arquivo.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        filhos.setdefault(int(campos[1]), []).append(int(nome))
+    return filhos
+
+
+def _rss_processo(pid):
+    """RSS de um processo em bytes, lido de /proc/<pid>/status."""
+    try:
+        with open(f"/proc/{pid}/status") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def processos_descendentes(pid):
+    """Retorna o pid informado e os de todos os seus descendentes.
+
+    Retorna None onde /proc não está disponível.
+    """
+    if not pid or not os.path.isdir("/proc"):
+        return None
+
+    filhos = _processos_filhos()
+    encontrados = []
+    pendentes = [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        encontrados.append(atual)
+        pendentes.extend(filhos.get(atual, ()))
+    return encontrados
+
+
+def rss_processos(pid):
+    """Soma o RSS de um processo e de todos os seus descendentes, em bytes.
+
+    Retorna None onde /proc não está disponível.
+    """
+    pids = processos_descendentes(pid)
+    if pids is None:
+        return None
+    return sum(_rss_processo(atual) for atual in pids)
+
+
+def _inicio_processo(pid):
+    """Instante de início do processo (campo starttime de /proc/<pid>/stat), ou None."""
+    try:
+        with open(f"/proc/{pid}/stat") as arquivo:
+            # starttime é o 22º campo; os campos após o ')' começam no 3º
+            return int(arquivo.read().rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def identificar_processos(pids):
+    """Mapeia cada pid ao seu instante de início, para reconhecê-lo depois.
+
+    Processos que já terminaram ficam de fora.
+    """
+    processos = {}
+    for pid in pids or ():
+        inicio = _inicio_processo(pid)
+        if inicio is not None:
+            processos[pid] = inicio
+    return processos
+
+
+def encerrar_processos(processos):
+    """Encerra à força os processos que ainda estiverem vivos; retorna quantos.
+
+    `processos` vem de identificar_processos: um pid só recebe o sinal se o
+    instante de início ainda for o mesmo, de forma que um pid reutilizado
+    por outro processo depois do quit não é atingido.
+    """
+    encerrados = 0
+    for pid, inicio in (processos or {}).items():
+        if _inicio_processo(pid) != inicio:
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            encerrados += 1
+        except OSError:
+            pass
+    return encerrados
+
+
+def memoria_sistema():
+    """RAM total e disponível do host em bytes, lidas de /proc/meminfo.
+
+    Retorna None onde /proc não está disponível.
+    """
+    valores = {}
+    try:
+        with open("/proc/meminfo") as arquivo:
+            for linha in arquivo:
+                chave, _, resto = linha.partition(":")
+                if chave in ("MemTotal", "MemAvailable"):
+                    valores[chave] = int(resto.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    if "MemTotal" not in valores:
+        return None
+    return {"total": valores["MemTotal"], "disponivel": valores.get("MemAvailable", valores["MemTotal"])}
+
+
+def pid_driver(driver):
+    """Pid do chromedriver, ou None se não estiver disponível."""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def rss_driver(driver):
+    """RSS do chromedriver e dos processos do Chrome iniciados por ele, em bytes."""
+    return rss_processos(pid_driver(driver))
@@ -0,0 +1,204 @@
+"""
+WhatsApp Monitor - Exibição do QR Code pela API HTTP do Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+O QR Code fica apenas em memória e é servido com ETag, de forma que o
+navegador revalida a imagem a cada atualização da página sem baixá-la de
+novo enquanto ela não muda, e nada é gravado no cartão SD.
+"""
+
+import time
+import base64
+import logging
+from datetime import timedelta
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.components.http.auth import async_sign_path
+from homeassistant.core import HomeAssistant, callback
+
+from .contas import dados_conta, sufixo_conta
+
+_LOGGER = logging.getLogger(__name__)
+
+# Constantes
+DOMAIN = "whatsapp_monitor"
+URL_QRCODE_IMAGEM = f"/api/{DOMAIN}/qrcode.png"
+URL_QRCODE_PAGINA = f"/api/{DOMAIN}/qrcode"
+# URLs das demais contas (a conta principal usa as URLs acima)
+URL_QRCODE_IMAGEM_CONTA = f"/api/{DOMAIN}/{{conta}}/qrcode.png"
+URL_QRCODE_PAGINA_CONTA = f"/api/{DOMAIN}/{{conta}}/qrcode"
+DATA_VIEWS = f"{DOMAIN}_views"
+
+# Validade dos links assinados enviados na notificação
+VALIDADE_LINK = timedelta(minutes=15)
+
+PAGINA_QRCODE = """<!DOCTYPE html>
+<html>
+<head>
+    <title>WhatsApp QR Code</title>
+    <meta http-equiv="refresh" content="10">
+    <style>
+        body {
+            font-family: sans-serif;
+            text-align: center;
+            margin: 20px;
+            background-color: #f0f0f0;
+        }
+        .container {
+            max-width: 600px;
+            margin: 0 auto;
+            background-color: white;
+            padding: 20px;
+            border-radius: 10px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1) ;
+        }
+        img {
+            max-width: 100%;
+            height: auto;
+            border: 1px solid #ddd;
+        }
+        h1 {
+            color: #128C7E;
+        }
+        .instructions {
+            margin: 20px 0;
+            text-align: left;
+            padding: 15px;
+            background-color: #f8f8f8;
+            border-left: 4px solid #128C7E;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>WhatsApp QR Code</h1>
+        <div class="qrcode">
+            <img src="data:image/png;base64,%(imagem)s" alt="WhatsApp QR Code">
+        </div>
+        <div class="instructions">
+            <h3>Instruções:</h3>
+            <ol>
+                <li>Abra o WhatsApp no seu smartphone</li>
+                <li>Toque em Menu (três pontos) > WhatsApp Web</li>
+                <li>Escaneie o QR Code acima</li>
+                <li>Esta página será atualizada automaticamente a cada 10 segundos</li>
+            </ol>
+        </div>
+        <p>Após escanear o QR Code com sucesso, você pode fechar esta página.</p>
+    </div>
+</body>
+</html>"""
+
+
+def urls_qrcode(dados):
+    """Retorna (página, imagem) do QR Code da conta."""
+    if not sufixo_conta(dados):
+        return URL_QRCODE_PAGINA, URL_QRCODE_IMAGEM
+    conta = dados.get("conta")
+    return URL_QRCODE_PAGINA_CONTA.format(conta=conta), URL_QRCODE_IMAGEM_CONTA.format(conta=conta)
+
+
+def _obter_qr(hass, conta=None):
+    """Retorna (png, hash) do QR Code atual da conta ou (None, None)."""
+    dados = dados_conta(hass, conta)
+    monitor = dados.get("monitor") if dados else None
+    if monitor is None:
+        return None, None
+    return getattr(monitor, "qr_png", None), getattr(monitor, "qr_hash", None)
+
+
+def _resposta_condicional(request, corpo, content_type, etag):
+    """Responde 304 se o cliente já tem a versão atual; caso contrário, o conteúdo."""
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return web.Response(status=304, headers=cabecalhos)
+    return web.Response(body=corpo, content_type=content_type, headers=cabecalhos)
+
+
+class WhatsAppQRCodeImageView(HomeAssistantView):
+    """Imagem PNG do QR Code atual."""
+
+    url = URL_QRCODE_IMAGEM
+    extra_urls = [URL_QRCODE_IMAGEM_CONTA]
+    name = f"api:{DOMAIN}:qrcode_imagem"
+    requires_auth = True
+
+    async def get(self, request, conta=None):
+        """Retorna o QR Code, ou 404 se não houver login em andamento."""
+        png, qr_hash = _obter_qr(request.app["hass"], conta)
+        if png is None:
+            return web.Response(status=404)
+        return _resposta_condicional(request, png, "image/png", f'"{qr_hash}"')
+
+
+class WhatsAppQRCodePageView(HomeAssistantView):
+    """Página com o QR Code e as instruções de conexão."""
+
+    url = URL_QRCODE_PAGINA
+    extra_urls = [URL_QRCODE_PAGINA_CONTA]
+    name = f"api:{DOMAIN}:qrcode_pagina"
+    requires_auth = True
+
+    async def get(self, request, conta=None):
+        """Retorna a página com o QR Code embutido."""
+        png, qr_hash = _obter_qr(request.app["hass"], conta)
+        if png is None:
+            return web.Response(
+                text="Nenhum QR Code disponível. O WhatsApp Web pode já estar conectado.",
+                content_type="text/plain"
+            )
+        pagina = PAGINA_QRCODE % {"imagem": base64.b64encode(png).decode("ascii")}
+        return _resposta_condicional(request, pagina.encode("utf-8"), "text/html", f'"p-{qr_hash}"')
+
+
+@callback
+def async_registrar_views(hass: HomeAssistant):
+    """Registra as views do QR Code uma única vez por execução do Home Assistant."""
+    if hass.data.get(DATA_VIEWS):
+        return
+    hass.http.register_view(WhatsAppQRCodeImageView())
+    hass.http.register_view(WhatsAppQRCodePageView())
+    hass.data[DATA_VIEWS] = True
+
+
+@callback
+def async_publicar_qr(hass: HomeAssistant, qr_hash, conta=None):
+    """Anuncia um novo QR Code da conta com evento e notificação contendo links assinados.
+
+    Com `qr_hash` None (login concluído), apenas remove a notificação.
+    """
+    dados = dados_conta(hass, conta) or {}
+    notification_id = f"whatsapp_qrcode{sufixo_conta(dados)}"
+    if qr_hash is None:
+        hass.async_create_task(
+            hass.services.async_call(
+                "persistent_notification", "dismiss", {"notification_id": notification_id}
+            )
+        )
+        return
+
+    url_pagina, url_imagem = urls_qrcode(dados)
+    pagina = async_sign_path(hass, url_pagina, VALIDADE_LINK, use_content_user=True)
+    imagem = async_sign_path(hass, url_imagem, VALIDADE_LINK, use_content_user=True)
+
+    hass.bus.async_fire(f"{DOMAIN}_qrcode_generated", {
+        "conta": conta,
+        "qrcode_url": imagem,
+        "html_page": pagina,
+        "hash": qr_hash,
+        "timestamp": time.time()
+    })
+
+    hass.async_create_task(
+        hass.services.async_call(
+            "persistent_notification",
+            "create",
+            {
+                "title": f"WhatsApp QR Code ({dados.get('nome', 'WhatsApp Monitor')})",
+                "message": f"Escaneie o QR Code para conectar ao WhatsApp Web. [Abrir QR Code]({pagina})",
+                "notification_id": notification_id
+            }
+        )
+    )
@@ -0,0 +1,204 @@
+"""
+WhatsApp Monitor - Driver reserva para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+Um segundo Chrome fica iniciado e ocioso (about:blank) com uma cópia do
+perfil logado. Quando o vigia recicla o navegador, a reserva assume na hora,
+sem esperar o Chrome iniciar, e uma nova reserva é aquecida em segundo plano
+depois que a sessão volta. A reserva não abre o WhatsApp Web enquanto ociosa,
+já que duas abas com a mesma sessão disputam a conexão.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+
+from .navegador import memoria_sistema, rss_driver
+
+_LOGGER = logging.getLogger(__name__)
+
+# RAM total mínima do host para manter um segundo Chrome (MB)
+MEMORIA_MINIMA_RESERVA = 3072
+
+# RAM disponível mínima no momento de aquecer a reserva (MB)
+MEMORIA_LIVRE_RESERVA = 512
+
+# Idade máxima da cópia do perfil na reserva antes de refazê-la (segundos)
+INTERVALO_RENOVACAO_RESERVA = 6 * 3600
+
+# Arquivos de trava e caches que não precisam ir para a cópia do perfil
+IGNORAR_NA_COPIA = shutil.ignore_patterns(
+    "Singleton*", "lockfile", "*.lock", "LOCK",
+    "Cache", "Code Cache", "GPUCache", "ShaderCache", "GrShaderCache", "CacheStorage",
+)
+
+
+def copiar_perfil(origem, destino):
+    """Substitui `destino` por uma cópia do perfil do Chrome em `origem`."""
+    shutil.rmtree(destino, ignore_errors=True)
+    shutil.copytree(
+        origem, destino, symlinks=True, ignore=IGNORAR_NA_COPIA, ignore_dangling_symlinks=True
+    )
+
+
+class ReservaNavegador:
+    """Mantém um driver reserva pronto para substituir o ativo.
+
+    `criar_driver(profile_dir)` cria um driver já configurado. O aquecimento
+    roda em uma thread própria, de forma que o ciclo que o pediu não espera o
+    Chrome iniciar.
+    """
+
+    def __init__(self, criar_driver, memoria_minima_mb=MEMORIA_MINIMA_RESERVA,
+                 memoria_livre_mb=MEMORIA_LIVRE_RESERVA):
+        """Inicializa a reserva vazia."""
+        self._criar_driver = criar_driver
+        self.memoria_minima = memoria_minima_mb * 1024 * 1024
+        self.memoria_livre = memoria_livre_mb * 1024 * 1024
+        self._driver = None
+        self._perfil = None
+        self._preparada_em = None
+        self._thread = None
+        self._cancelada = False
+        self._lock = threading.Lock()
+        self.motivo_desativada = None
+        self.promocoes = 0
+
+    @property
+    def pronta(self):
+        """Indica se há um driver reserva pronto para assumir."""
+        return self._driver is not None
+
+    @property
+    def aquecendo(self):
+        """Indica se uma reserva está sendo preparada."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _memoria_suficiente(self):
+        """Confere a RAM do host; sem /proc/meminfo, a reserva é permitida."""
+        memoria = memoria_sistema()
+        if memoria is None:
+            self.motivo_desativada = None
+            return True
+        if memoria['total'] < self.memoria_minima:
+            self.motivo_desativada = (
+                f"RAM total de {memoria['total'] / 1048576:.0f} MB abaixo de "
+                f"{self.memoria_minima / 1048576:.0f} MB"
+            )
+        elif memoria['disponivel'] < self.memoria_livre:
+            self.motivo_desativada = (
+                f"apenas {memoria['disponivel'] / 1048576:.0f} MB de RAM disponíveis"
+            )
+        else:
+            self.motivo_desativada = None
+        return self.motivo_desativada is None
+
+    def aquecer(self, perfil_origem, perfil_destino):
+        """Inicia em segundo plano uma reserva com uma cópia de `perfil_origem`.
+
+        Retorna False se já há reserva, se outra está sendo preparada ou se a
+        memória do host não comporta um segundo Chrome.
+        """
+        with self._lock:
+            if self._driver is not None or self.aquecendo:
+                return False
+            if not self._memoria_suficiente():
+                _LOGGER.info(f"Driver reserva desativado: {self.motivo_desativada}")
+                return False
+            self._cancelada = False
+            self._thread = threading.Thread(
+                target=self._preparar,
+                args=(perfil_origem, perfil_destino),
+                name="whatsapp_monitor_reserva",
+                daemon=True,
+            )
+            self._thread.start()
+        return True
+
+    def _preparar(self, perfil_origem, perfil_destino):
+        """Copia o perfil e inicia o Chrome ocioso."""
+        try:
+            copiar_perfil(perfil_origem, perfil_destino)
+            driver = self._criar_driver(perfil_destino)
+        except Exception as e:
+            _LOGGER.warning(f"Não foi possível preparar o driver reserva: {e}")
+            return
+
+        with self._lock:
+            cancelada = self._cancelada
+            if not cancelada:
+                self._driver = driver
+                self._perfil = perfil_destino
+                self._preparada_em = time.monotonic()
+        if cancelada:
+            self._fechar(driver)
+            return
+        _LOGGER.info("Driver reserva pronto")
+
+    def vencida(self, intervalo=INTERVALO_RENOVACAO_RESERVA):
+        """Indica se a reserva pronta usa uma cópia do perfil mais velha que `intervalo`."""
+        preparada_em = self._preparada_em
+        return self.pronta and preparada_em is not None and time.monotonic() - preparada_em > intervalo
+
+    def promover(self):
+        """Entrega a reserva pronta como (driver, perfil), ou None.
+
+        Não espera uma reserva em preparação: nesse caso, o driver ativo é
+        iniciado do modo normal.
+        """
+        with self._lock:
+            driver, perfil = self._driver, self._perfil
+            self._driver = None
+            self._perfil = None
+        if driver is None:
+            return None
+
+        try:
+            driver.execute_script("return 1;")
+        except Exception as e:
+            _LOGGER.warning(f"Driver reserva não respondeu e foi descartado: {e}")
+            self._fechar(driver)
+            return None
+
+        self.promocoes += 1
+        return driver, perfil
+
+    def descartar(self):
+        """Fecha a reserva, se houver, e cancela uma reserva em preparação."""
+        with self._lock:
+            self._cancelada = True
+            driver = self._driver
+            self._driver = None
+            self._perfil = None
+        self._fechar(driver)
+
+    @staticmethod
+    def _fechar(driver):
+        """Fecha um driver ignorando erros."""
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            _LOGGER.debug(f"Erro ao fechar o driver reserva: {e}")
+
+    def rss(self):
+        """RSS do Chrome reserva em bytes, ou None se não há reserva."""
+        driver = self._driver
+        return rss_driver(driver) if driver is not None else None
+
+    def estado(self):
+        """Resumo da reserva exibido nos sensores."""
+        return {
+            'pronta': self.pronta,
+            'aquecendo': self.aquecendo,
+            'promocoes': self.promocoes,
+            'motivo_desativada': self.motivo_desativada,
+        }
+
+
+def outro_perfil(perfil_ativo, perfis):
+    """Retorna o diretório de perfil que não está em uso pelo driver ativo."""
+    return perfis[1] if os.path.normpath(perfil_ativo) == os.path.normpath(perfis[0]) else perfis[0]
@@ -0,0 +1,260 @@
+"""
+WhatsApp Monitor - Agendamento de ciclos para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+"""
+
+import time
+import random
+import asyncio
+import logging
+import datetime
+from contextlib import asynccontextmanager
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# Constantes
+DOMAIN = "whatsapp_monitor"
+JITTER_PADRAO = 0.1
+FATOR_RECUO_PADRAO = 1.5
+
+# Número de contas que podem varrer o WhatsApp Web ao mesmo tempo
+MAX_VERIFICACOES_SIMULTANEAS = 1
+
+
+class AgendadorCiclos:
+    """Executa um ciclo periódico com jitter e sem sobreposição.
+
+    O próximo disparo é agendado a partir do início do ciclo atual (taxa fixa).
+    Se o ciclo anterior, ou outro ciclo que use o navegador, ainda estiver em
+    andamento no momento do disparo, o ciclo é ignorado em vez de enfileirado.
+    """
+
+    def __init__(self, hass: HomeAssistant, nome, executar, intervalo, jitter=JITTER_PADRAO,
+                 ocupado=None, ao_concluir=None, conta=None):
+        """Inicializa o agendador.
+
+        `executar` é uma corrotina sem argumentos; `intervalo` é dado em
+        segundos; `ocupado` é uma função opcional que indica se o recurso
+        compartilhado está em uso; `ao_concluir` é chamado após cada ciclo;
+        `conta` identifica a conta nos eventos.
+        """
+        self.hass = hass
+        self.nome = nome
+        self.conta = conta
+        self._executar = executar
+        self.intervalo = intervalo
+        self.jitter = jitter
+        self._ocupado = ocupado
+        self._ao_concluir = ao_concluir
+        self._cancelar = None
+        self._tarefa = None
+        self._ativo = False
+        self.metricas = {
+            "execucoes": 0,
+            "ignorados": 0,
+            "falhas": 0,
+            "ultimo_inicio": None,
+            "ultima_duracao": None,
+            "duracao_media": None,
+            "duracao_maxima": None,
+            "proximo_em": None,
+        }
+
+    @property
+    def em_execucao(self):
+        """Indica se o ciclo está em andamento."""
+        return self._tarefa is not None and not self._tarefa.done()
+
+    def _proximo_atraso(self):
+        """Calcula o atraso até o próximo disparo, com jitter."""
+        variacao = self.intervalo * self.jitter
+        return max(1.0, self.intervalo + random.uniform(-variacao, variacao))
+
+    @callback
+    def _agendar(self, atraso=None):
+        """Agenda o próximo disparo."""
+        if not self._ativo:
+            return
+        if self._cancelar:
+            self._cancelar()
+        atraso = self._proximo_atraso() if atraso is None else atraso
+        self.metricas["proximo_em"] = time.time() + atraso
+        self._cancelar = async_call_later(self.hass, atraso, self._disparar)
+
+    @callback
+    def _disparar(self, _agora=None):
+        """Dispara o ciclo, ignorando-o se houver sobreposição."""
+        self._cancelar = None
+        self._agendar()
+
+        if self.em_execucao or (self._ocupado and self._ocupado()):
+            self.metricas["ignorados"] += 1
+            _LOGGER.debug(f"Ciclo '{self.nome}' ignorado: execução anterior em andamento")
+            return
+
+        self._tarefa = self.hass.async_create_background_task(
+            self._async_executar_ciclo(), f"{DOMAIN}_{self.nome}_{self.conta}"
+        )
+
+    async def _async_executar_ciclo(self):
+        """Executa o ciclo e registra as métricas de tempo."""
+        inicio = time.monotonic()
+        self.metricas["ultimo_inicio"] = time.time()
+        try:
+            resultado = await self._executar()
+        except Exception as e:
+            _LOGGER.error(f"Erro no ciclo '{self.nome}': {e}")
+            resultado = False
+
+        duracao = time.monotonic() - inicio
+        metricas = self.metricas
+        metricas["execucoes"] += 1
+        if not resultado:
+            metricas["falhas"] += 1
+        metricas["ultima_duracao"] = round(duracao, 3)
+        metricas["duracao_maxima"] = round(max(duracao, metricas["duracao_maxima"] or 0), 3)
+        media = metricas["duracao_media"]
+        metricas["duracao_media"] = round(duracao if media is None else media * 0.8 + duracao * 0.2, 3)
+
+        self.hass.bus.async_fire(f"{DOMAIN}_cycle_completed", {
+            "ciclo": self.nome,
+            "conta": self.conta,
+            "duracao": metricas["ultima_duracao"],
+            "sucesso": bool(resultado),
+            "intervalo": self.intervalo,
+            "ignorados": metricas["ignorados"],
+        })
+
+        if self._ao_concluir:
+            self._ao_concluir()
+
+    @callback
+    def async_iniciar(self, atraso=None):
+        """Inicia o agendamento."""
+        self._ativo = True
+        self._agendar(atraso)
+
+    @callback
+    def async_reagendar(self, intervalo):
+        """Altera o intervalo e reagenda o próximo disparo."""
+        if intervalo == self.intervalo:
+            return
+        _LOGGER.info(f"Intervalo do ciclo '{self.nome}' alterado de {self.intervalo}s para {intervalo}s")
+        self.intervalo = intervalo
+        self._agendar()
+
+    @callback
+    def async_antecipar(self, atraso):
+        """Antecipa o próximo disparo para daqui a `atraso` segundos, se for depois disso."""
+        proximo = self.metricas["proximo_em"]
+        if proximo is not None and proximo - time.time() > atraso:
+            self._agendar(atraso)
+
+    @callback
+    def async_parar(self):
+        """Interrompe o agendamento; um ciclo em andamento não é cancelado."""
+        self._ativo = False
+        if self._cancelar:
+            self._cancelar()
+            self._cancelar = None
+        self.metricas["proximo_em"] = None
+
+
+class PoolVerificacoes:
+    """Distribui as verificações das contas em um número limitado de vagas.
+
+    No máximo `maximo` contas varrem o WhatsApp Web ao mesmo tempo; as demais
+    aguardam uma vaga. Os primeiros disparos de cada conta são defasados ao
+    longo do intervalo, de forma que os navegadores não varrem em conjunto.
+    """
+
+    def __init__(self, maximo=MAX_VERIFICACOES_SIMULTANEAS):
+        """Inicializa o pool sem contas."""
+        self.maximo = max(1, maximo)
+        self._semaforo = asyncio.Semaphore(self.maximo)
+        self._contas = []
+        self.em_andamento = 0
+        self.aguardando = 0
+
+    def registrar(self, conta):
+        """Inclui uma conta na distribuição dos disparos."""
+        if conta not in self._contas:
+            self._contas.append(conta)
+
+    def remover(self, conta):
+        """Retira uma conta da distribuição dos disparos."""
+        if conta in self._contas:
+            self._contas.remove(conta)
+
+    def defasagem(self, conta, intervalo):
+        """Atraso do primeiro disparo da conta, em segundos."""
+        if conta not in self._contas:
+            return 0
+        return intervalo * self._contas.index(conta) / len(self._contas)
+
+    @asynccontextmanager
+    async def vaga(self):
+        """Aguarda uma vaga para varrer o WhatsApp Web."""
+        self.aguardando += 1
+        try:
+            await self._semaforo.acquire()
+        finally:
+            self.aguardando -= 1
+        self.em_andamento += 1
+        try:
+            yield
+        finally:
+            self.em_andamento -= 1
+            self._semaforo.release()
+
+
+class IntervaloAdaptativo:
+    """Calcula o intervalo de verificação a partir da atividade observada.
+
+    Ciclos com conversas não lidas ou mensagens importantes reduzem o intervalo
+    pela metade, até o mínimo; ciclos sem atividade o aumentam pelo fator de
+    recuo, até o máximo. No horário de silêncio, o intervalo de silêncio
+    prevalece.
+    """
+
+    def __init__(self, base, minimo, maximo, fator_recuo=FATOR_RECUO_PADRAO,
+                 silencio_inicio=None, silencio_fim=None, intervalo_silencio=None):
+        """Inicializa com intervalos em segundos e horários como datetime.time."""
+        self.minimo = min(minimo, maximo)
+        self.maximo = max(minimo, maximo)
+        self.fator_recuo = max(1.0, fator_recuo)
+        self.silencio_inicio = silencio_inicio
+        self.silencio_fim = silencio_fim
+        self.intervalo_silencio = intervalo_silencio
+        self.atual = self._limitar(base)
+
+    def _limitar(self, intervalo):
+        """Mantém o intervalo entre o mínimo e o máximo."""
+        return max(self.minimo, min(self.maximo, intervalo))
+
+    def em_silencio(self, agora=None):
+        """Indica se o horário atual está no período de silêncio."""
+        if self.silencio_inicio is None or self.silencio_fim is None or not self.intervalo_silencio:
+            return False
+        hora = (agora or datetime.datetime.now()).time()
+        if self.silencio_inicio <= self.silencio_fim:
+            return self.silencio_inicio <= hora < self.silencio_fim
+        # Período que atravessa a meia-noite (ex.: 23:00-07:00)
+        return hora >= self.silencio_inicio or hora < self.silencio_fim
+
+    def registrar(self, houve_atividade):
+        """Ajusta o intervalo conforme o resultado do último ciclo."""
+        if houve_atividade:
+            self.atual = self._limitar(self.atual / 2)
+        else:
+            self.atual = self._limitar(self.atual * self.fator_recuo)
+        return self.efetivo()
+
+    def efetivo(self, agora=None):
+        """Retorna o intervalo a ser usado agora, em segundos."""
+        if self.em_silencio(agora):
+            return self.intervalo_silencio
+        return self.atual
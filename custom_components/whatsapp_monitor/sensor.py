@@ -11,6 +11,8 @@ from homeassistant.const import CONF_NAME
 from homeassistant.helpers.entity import Entity
 
 from . import DOMAIN
+from .qrcode_view import urls_qrcode
+from .contas import dados_conta, sufixo_conta
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,29 +21,50 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     if discovery_info is None:
         return
     
+    # Sensores da conta descoberta
+    dados = dados_conta(hass, discovery_info.get("conta"))
+    if dados is None:
+        return
+    
     # Criar sensores
     sensors = [
-        WhatsAppMonitorStatusSensor(hass)
+        WhatsAppMonitorStatusSensor(hass, dados)
     ]
     
+    coordinator = dados.get("coordinator")
+    if coordinator:
+        sensors.append(WhatsAppMonitorCycleSensor(hass, coordinator))
+        sensors.append(WhatsAppMonitorIntervalSensor(hass, coordinator))
+        sensors.append(WhatsAppMonitorBufferSensor(hass, coordinator))
+        sensors.append(WhatsAppMonitorBrowserMemorySensor(hass, coordinator))
+        sensors.append(WhatsAppMonitorLoginSensor(hass, coordinator))
+    
     async_add_entities(sensors, True)
 
 class WhatsAppMonitorSensor(SensorEntity):
     """Classe base para sensores do WhatsApp Monitor."""
     
-    def __init__(self, hass):
-        """Inicializar o sensor base."""
+    def __init__(self, hass, dados=None):
+        """Inicializar o sensor base da conta."""
         self.hass = hass
+        self._conta = dados or {}
+        self._sufixo = sufixo_conta(dados)
         self._attr_should_poll = True
         self._attr_has_entity_name = True
         self._attr_available = True
     
     @property
     def device_info(self):
-        """Retorna informações do dispositivo."""
+        """Retorna informações do dispositivo (um por conta)."""
+        if self._sufixo:
+            identificador = self._conta.get("conta")
+            nome = f"WhatsApp Monitor ({self._conta.get('nome')})"
+        else:
+            identificador = "whatsapp_monitor"
+            nome = "WhatsApp Monitor"
         return {
-            "identifiers": {(DOMAIN, "whatsapp_monitor")},
-            "name": "WhatsApp Monitor",
+            "identifiers": {(DOMAIN, identificador)},
+            "name": nome,
             "manufacturer": "Manus AI",
             "model": "WhatsApp Monitor para Home Assistant",
             "sw_version": "1.0.4",
@@ -50,11 +73,11 @@ class WhatsAppMonitorSensor(SensorEntity):
 class WhatsAppMonitorStatusSensor(WhatsAppMonitorSensor):
     """Sensor para o status do WhatsApp Monitor."""
     
-    def __init__(self, hass):
+    def __init__(self, hass, dados=None):
         """Inicializar o sensor de status."""
-        super().__init__(hass)
+        super().__init__(hass, dados)
         self._attr_name = "Status"
-        self._attr_unique_id = f"{DOMAIN}_status"
+        self._attr_unique_id = f"{DOMAIN}_status{self._sufixo}"
         self._attr_icon = "mdi:whatsapp"
         self._state = "configurado"
     
@@ -67,3 +90,191 @@ class WhatsAppMonitorStatusSensor(WhatsAppMonitorSensor):
         """Atualiza o estado do sensor."""
         self._attr_available = True
         self._state = "configurado"
+
+class WhatsAppMonitorCoordinatorSensor(WhatsAppMonitorSensor):
+    """Classe base para sensores atualizados pelo coordenador."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor vinculado ao coordenador da conta."""
+        super().__init__(hass, coordinator.dados)
+        self.coordinator = coordinator
+        self._attr_should_poll = False
+    
+    async def async_added_to_hass(self):
+        """Registrar o sensor como ouvinte do coordenador."""
+        self.async_on_remove(
+            self.coordinator.async_add_listener(self.async_write_ha_state)
+        )
+
+class WhatsAppMonitorCycleSensor(WhatsAppMonitorCoordinatorSensor):
+    """Sensor com a duração e as métricas do ciclo de verificação."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor de ciclo."""
+        super().__init__(hass, coordinator)
+        self._attr_name = "Duração da verificação"
+        self._attr_unique_id = f"{DOMAIN}_duracao_verificacao{self._sufixo}"
+        self._attr_icon = "mdi:timer-outline"
+        self._attr_native_unit_of_measurement = "s"
+    
+    @property
+    def native_value(self):
+        """Retorna a duração do último ciclo de verificação."""
+        agendador = self.coordinator.agendadores.get("verificacao")
+        return agendador.metricas["ultima_duracao"] if agendador else None
+    
+    @property
+    def extra_state_attributes(self):
+        """Retorna as métricas de todos os ciclos agendados."""
+        atributos = {}
+        for nome, agendador in self.coordinator.agendadores.items():
+            for chave, valor in agendador.metricas.items():
+                atributos[f"{nome}_{chave}"] = valor
+            atributos[f"{nome}_intervalo"] = agendador.intervalo
+        
+        # Contadores da última verificação (ex.: cliques evitados pela prévia)
+        estatisticas = getattr(self.coordinator.monitor, "estatisticas_ciclo", None) or {}
+        for chave, valor in estatisticas.items():
+            atributos[f"ultima_verificacao_{chave}"] = valor
+        
+        # Duração média das esperas pela página
+        tempos_espera = getattr(self.coordinator.monitor, "tempos_espera", None) or {}
+        for nome, metrica in tempos_espera.items():
+            atributos[f"espera_{nome}_media"] = metrica["media"]
+            atributos[f"espera_{nome}_esgotadas"] = metrica["esgotadas"]
+        return atributos
+
+class WhatsAppMonitorIntervalSensor(WhatsAppMonitorCoordinatorSensor):
+    """Sensor com o intervalo efetivo entre verificações."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor de intervalo."""
+        super().__init__(hass, coordinator)
+        self._attr_name = "Intervalo de verificação efetivo"
+        self._attr_unique_id = f"{DOMAIN}_intervalo_efetivo{self._sufixo}"
+        self._attr_icon = "mdi:timer-sync-outline"
+        self._attr_native_unit_of_measurement = "min"
+    
+    @property
+    def native_value(self):
+        """Retorna o intervalo efetivo em minutos."""
+        return round(self.coordinator.intervalo_efetivo / 60, 1)
+    
+    @property
+    def extra_state_attributes(self):
+        """Retorna os parâmetros do intervalo adaptativo."""
+        adaptativo = self.coordinator.intervalo_adaptativo
+        if not adaptativo:
+            return {"adaptativo": False}
+        return {
+            "adaptativo": True,
+            "minimo": round(adaptativo.minimo / 60, 1),
+            "maximo": round(adaptativo.maximo / 60, 1),
+            "fator_recuo": adaptativo.fator_recuo,
+            "em_silencio": adaptativo.em_silencio(),
+        }
+
+class WhatsAppMonitorBufferSensor(WhatsAppMonitorCoordinatorSensor):
+    """Sensor com a memória ocupada pelo buffer de mensagens importantes."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor de memória do buffer."""
+        super().__init__(hass, coordinator)
+        self._attr_name = "Memória do buffer de mensagens"
+        self._attr_unique_id = f"{DOMAIN}_memoria_buffer{self._sufixo}"
+        self._attr_icon = "mdi:memory"
+        self._attr_native_unit_of_measurement = "kB"
+    
+    def _uso(self):
+        """Retorna o uso de memória informado pelo monitor."""
+        return getattr(self.coordinator.monitor, "uso_buffer", None) or {}
+    
+    @property
+    def native_value(self):
+        """Retorna a memória estimada em kB."""
+        uso = self._uso()
+        if "bytes" not in uso:
+            return None
+        return round(uso["bytes"] / 1024, 1)
+    
+    @property
+    def extra_state_attributes(self):
+        """Retorna a ocupação do buffer."""
+        uso = self._uso()
+        return {chave: valor for chave, valor in uso.items() if chave != "bytes"}
+
+class WhatsAppMonitorBrowserMemorySensor(WhatsAppMonitorCoordinatorSensor):
+    """Sensor com o RSS do Chrome usado pelo monitor."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor de memória do navegador."""
+        super().__init__(hass, coordinator)
+        self._attr_name = "Memória do navegador"
+        self._attr_unique_id = f"{DOMAIN}_memoria_navegador{self._sufixo}"
+        self._attr_icon = "mdi:google-chrome"
+        self._attr_native_unit_of_measurement = "MB"
+    
+    def _memoria(self):
+        """Retorna a última medição informada pelo monitor."""
+        return getattr(self.coordinator.monitor, "memoria_navegador", None) or {}
+    
+    @property
+    def native_value(self):
+        """Retorna o RSS medido no último ciclo, em MB."""
+        rss = self._memoria().get("rss_bytes")
+        if rss is None:
+            return None
+        return round(rss / (1024 * 1024), 1)
+    
+    @property
+    def extra_state_attributes(self):
+        """Retorna o modo do navegador e os reinícios feitos pelo vigia."""
+        atributos = {"modo": self._memoria().get("modo")}
+        vigia = getattr(self.coordinator.monitor, "estado_vigia", None) or {}
+        ultimo = vigia.get("ultimo_reinicio")
+        atributos.update({
+            "reinicios": vigia.get("reinicios", 0),
+            "ultimo_motivo": vigia.get("ultimo_motivo"),
+            "ultimo_reinicio": datetime.fromtimestamp(ultimo).isoformat() if ultimo else None,
+            "disjuntor": vigia.get("disjuntor"),
+            "espera_reinicio": vigia.get("espera_reinicio"),
+        })
+        
+        # Driver reserva, quando habilitado
+        reserva = getattr(self.coordinator.monitor, "estado_reserva", None)
+        if reserva is not None:
+            rss_reserva = self._memoria().get("rss_reserva_bytes")
+            atributos.update({
+                "reserva_pronta": reserva.get("pronta"),
+                "reserva_promocoes": reserva.get("promocoes"),
+                "reserva_desativada": reserva.get("motivo_desativada"),
+                "reserva_mb": round(rss_reserva / (1024 * 1024), 1) if rss_reserva else None,
+            })
+        return atributos
+
+class WhatsAppMonitorLoginSensor(WhatsAppMonitorCoordinatorSensor):
+    """Sensor com o estado do login no WhatsApp Web."""
+    
+    def __init__(self, hass, coordinator):
+        """Inicializar o sensor de login."""
+        super().__init__(hass, coordinator)
+        self._attr_name = "Login"
+        self._attr_unique_id = f"{DOMAIN}_login{self._sufixo}"
+        self._attr_icon = "mdi:qrcode-scan"
+    
+    @property
+    def native_value(self):
+        """Retorna o estado atual do login."""
+        monitor = self.coordinator.monitor
+        if not monitor:
+            return "iniciando"
+        return getattr(monitor, "estado_login", None)
+    
+    @property
+    def extra_state_attributes(self):
+        """Retorna desde quando o login está no estado atual."""
+        desde = getattr(self.coordinator.monitor, "estado_login_desde", None)
+        return {
+            "desde": datetime.fromtimestamp(desde).isoformat() if desde else None,
+            "qrcode_url": urls_qrcode(self._conta)[0],
+        }
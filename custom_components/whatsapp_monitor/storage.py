@@ -7,7 +7,11 @@ import os
 import json
 import logging
 import sqlite3
+import time
+import queue
 import datetime
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 _LOGGER = logging.getLogger(__name__)
@@ -17,14 +21,235 @@ DOMAIN = "whatsapp_monitor"
 DATABASE_FILE = "whatsapp_monitor.db"
 BACKUP_DIR = "backups"
 
+# Ajustes aplicados a cada conexão (WAL evita um fsync por transação no cartão SD)
+PRAGMAS_CONEXAO = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-2000",
+    "PRAGMA mmap_size=33554432",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Tentativas de obter o lock de escrita quando outro processo o detém além
+# do busy_timeout, e a espera base entre elas (em segundos)
+TENTATIVAS_BLOQUEIO = 3
+ESPERA_BLOQUEIO = 1.0
+
+# Número de instruções preparadas mantidas em cache por conexão
+CACHE_INSTRUCOES = 64
+
+# Fila de escrita: gravar ao atingir o lote ou após o intervalo (segundos)
+TAMANHO_LOTE_ESCRITA = 50
+INTERVALO_ESCRITA = 5.0
+
+# Máximo de parâmetros por consulta ao índice de mensagens vistas
+LOTE_CONSULTA_VISTAS = 500
+
+# Busca textual: mensagens indexadas por transação na migração do índice
+LOTE_INDEXACAO = 500
+
+# Máximo de resultados por página da busca
+LIMITE_BUSCA = 100
+
+# Tokenizador da busca: sem diferenciar maiúsculas nem acentos ("acao" encontra "ação")
+TOKENIZADOR_BUSCA = "unicode61 remove_diacritics 2"
+
+# Chaves de configuração da migração do índice: mensagens anteriores ao índice
+# vão até CHAVE_FTS_PENDENTE e já foram indexadas até CHAVE_FTS_INDEXADO
+CHAVE_FTS_PENDENTE = "fts_pendente_ate"
+CHAVE_FTS_INDEXADO = "fts_indexado_ate"
+
+# Gatilhos só tocam o índice em mensagens já indexadas ou posteriores a ele;
+# um 'delete' de uma linha ausente corromperia o índice de conteúdo externo
+CONDICAO_INDEXADA = f'''
+    old.id > COALESCE((SELECT CAST(valor AS INTEGER) FROM configuracao WHERE chave = '{CHAVE_FTS_PENDENTE}'), 0)
+    OR old.id <= COALESCE((SELECT CAST(valor AS INTEGER) FROM configuracao WHERE chave = '{CHAVE_FTS_INDEXADO}'), 0)
+'''
+
+# Sinal de parada da fila de escrita
+_PARAR = object()
+
+def banco_bloqueado(erro):
+    """Indica se o erro do SQLite é um SQLITE_BUSY/SQLITE_LOCKED."""
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+class GerenciadorConexoes:
+    """Mantém conexões SQLite de longa duração.
+
+    Uma única conexão de escrita é compartilhada entre threads e protegida por
+    um lock; cada thread recebe a sua própria conexão de leitura, que no modo
+    WAL não bloqueia nem é bloqueada pela escrita.
+
+    O processo filho do navegador isolado abre o mesmo banco com o seu próprio
+    gerenciador, então o lock da thread não basta: cada transação de escrita
+    começa com BEGIN IMMEDIATE, que obtém o lock do arquivo antes de qualquer
+    alteração. Assim um SQLITE_BUSY só pode ocorrer nesse ponto, onde é
+    repetido, e nunca no meio do lote ou no commit.
+    """
+    
+    def __init__(self, db_path):
+        """Inicializa o gerenciador sem abrir conexões."""
+        self.db_path = db_path
+        self._lock_escrita = threading.Lock()
+        self._lock_leitores = threading.Lock()
+        self._conn_escrita = None
+        self._local = threading.local()
+        self._leitores = []
+        self._fechado = False
+    
+    def _abrir(self):
+        """Abre uma conexão já configurada."""
+        if self._fechado:
+            raise sqlite3.ProgrammingError("Armazenamento de dados já foi fechado")
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=CACHE_INSTRUCOES
+        )
+        for pragma in PRAGMAS_CONEXAO:
+            conn.execute(pragma)
+        return conn
+    
+    def _iniciar_transacao(self, conn):
+        """Obtém o lock de escrita do banco, repetindo se outro processo o detém."""
+        for tentativa in range(1, TENTATIVAS_BLOQUEIO + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not banco_bloqueado(e) or tentativa == TENTATIVAS_BLOQUEIO:
+                    raise
+                _LOGGER.debug(f"Banco bloqueado por outro processo (tentativa {tentativa}): {e}")
+                time.sleep(ESPERA_BLOQUEIO * tentativa)
+    
+    @contextmanager
+    def escrita(self, imediata=True):
+        """Fornece a conexão de escrita dentro de uma transação exclusiva.
+
+        Com imediata=False a transação não é aberta antecipadamente, para
+        operações que exigem a conexão livre (como a restauração de backup).
+        """
+        with self._lock_escrita:
+            if self._conn_escrita is None:
+                self._conn_escrita = self._abrir()
+            conn = self._conn_escrita
+            if imediata:
+                self._iniciar_transacao(conn)
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    def leitura(self):
+        """Retorna a conexão de leitura da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._abrir()
+            self._local.conn = conn
+            with self._lock_leitores:
+                self._leitores.append(conn)
+        return conn
+    
+    def fechar(self):
+        """Fecha todas as conexões abertas."""
+        with self._lock_escrita:
+            self._fechado = True
+            if self._conn_escrita is not None:
+                try:
+                    # Incorporar o WAL ao banco antes de fechar
+                    self._conn_escrita.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error as e:
+                    _LOGGER.warning(f"Erro ao consolidar WAL: {e}")
+                self._conn_escrita.close()
+                self._conn_escrita = None
+        
+        with self._lock_leitores:
+            for conn in self._leitores:
+                conn.close()
+            self._leitores = []
+
+class FilaEscrita:
+    """Acumula mensagens e as grava em lote em uma thread de segundo plano.
+
+    O lote é gravado quando atinge o tamanho configurado ou quando a mensagem
+    mais antiga espera mais que o intervalo; ao fechar, o restante é gravado.
+    """
+    
+    def __init__(self, gravar, tamanho_lote=TAMANHO_LOTE_ESCRITA, intervalo=INTERVALO_ESCRITA):
+        """Inicia a thread de escrita."""
+        self._gravar = gravar
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._executar, name=f"{DOMAIN}_escrita", daemon=True
+        )
+        self._thread.start()
+    
+    def enfileirar(self, mensagem):
+        """Adiciona uma mensagem à fila, registrando o momento do recebimento."""
+        if not self._thread.is_alive():
+            _LOGGER.error("Fila de escrita encerrada; mensagem descartada")
+            return False
+        
+        if not mensagem.get('timestamp'):
+            mensagem = {**mensagem, 'timestamp': int(time.time())}
+        self._fila.put(mensagem)
+        return True
+    
+    def _descarregar(self, pendentes):
+        """Grava o lote pendente."""
+        if pendentes and self._gravar(pendentes) != len(pendentes):
+            _LOGGER.error(f"Falha ao gravar lote de {len(pendentes)} mensagens")
+    
+    def _executar(self):
+        """Laço da thread de escrita."""
+        pendentes = []
+        prazo = None
+        while True:
+            espera = None if prazo is None else max(0.0, prazo - time.monotonic())
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            
+            if item is _PARAR:
+                self._descarregar(pendentes)
+                return
+            
+            if item is not None:
+                pendentes.append(item)
+                if prazo is None:
+                    prazo = time.monotonic() + self.intervalo
+            
+            if len(pendentes) >= self.tamanho_lote or (prazo is not None and time.monotonic() >= prazo):
+                self._descarregar(pendentes)
+                pendentes = []
+                prazo = None
+    
+    def fechar(self, timeout=10):
+        """Grava as mensagens pendentes e encerra a thread."""
+        self._fila.put(_PARAR)
+        self._thread.join(timeout)
+
 class WhatsAppMonitorStorage:
     """Classe para gerenciar a persistência de dados do WhatsApp Monitor."""
     
-    def __init__(self, config_dir):
+    def __init__(self, config_dir, escrita_assincrona=False,
+                 tamanho_lote=TAMANHO_LOTE_ESCRITA, intervalo_escrita=INTERVALO_ESCRITA):
         """Inicializa o armazenamento de dados."""
         self.config_dir = config_dir
         self.db_path = os.path.join(config_dir, DATABASE_FILE)
         self.backup_dir = os.path.join(config_dir, BACKUP_DIR)
+        self.conexoes = GerenciadorConexoes(self.db_path)
+        self.fila_escrita = None
+        self.fts_disponivel = False
+        self._parar_indexacao = threading.Event()
         
         # Criar diretório de backup se não existir
         os.makedirs(self.backup_dir, exist_ok=True)
@@ -32,119 +257,352 @@ class WhatsAppMonitorStorage:
         # Inicializar banco de dados
         self._init_database()
         
+        # Iniciar fila de escrita em segundo plano
+        if escrita_assincrona:
+            self.fila_escrita = FilaEscrita(self.salvar_mensagens, tamanho_lote, intervalo_escrita)
+        
         _LOGGER.info(f"Armazenamento de dados inicializado em {self.db_path}")
     
     def _init_database(self):
         """Inicializa o banco de dados SQLite."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.conexoes.escrita() as conn:
+                cursor = conn.cursor()
+                
+                # Criar tabela de mensagens
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS mensagens (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        contato TEXT NOT NULL,
+                        mensagem TEXT NOT NULL,
+                        hora TEXT NOT NULL,
+                        data TEXT NOT NULL,
+                        nivel_prioridade TEXT,
+                        categoria TEXT,
+                        importante INTEGER NOT NULL,
+                        timestamp INTEGER NOT NULL
+                    )
+                ''')
+                
+                # Criar tabela de resumos
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS resumos (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        arquivo TEXT NOT NULL,
+                        timestamp INTEGER NOT NULL,
+                        num_mensagens INTEGER NOT NULL
+                    )
+                ''')
+                
+                # Criar tabela de configuração
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS configuracao (
+                        chave TEXT PRIMARY KEY,
+                        valor TEXT NOT NULL
+                    )
+                ''')
+                
+                # Criar tabela de mensagens já vistas (deduplicação entre ciclos)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS mensagens_vistas (
+                        impressao TEXT PRIMARY KEY,
+                        timestamp INTEGER NOT NULL
+                    ) WITHOUT ROWID
+                ''')
+                
+                # Criar índices para melhorar performance
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_contato ON mensagens(contato)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_importante ON mensagens(importante)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_timestamp ON mensagens(timestamp)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_resumos_timestamp ON resumos(timestamp)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_vistas_timestamp ON mensagens_vistas(timestamp)')
+                
+                # Índice de busca textual sincronizado com a tabela de mensagens
+                self.fts_disponivel = self._init_busca(cursor)
             
-            # Criar tabela de mensagens
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mensagens (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    contato TEXT NOT NULL,
-                    mensagem TEXT NOT NULL,
-                    hora TEXT NOT NULL,
-                    data TEXT NOT NULL,
-                    nivel_prioridade TEXT,
-                    categoria TEXT,
-                    importante INTEGER NOT NULL,
-                    timestamp INTEGER NOT NULL
-                )
-            ''')
-            
-            # Criar tabela de resumos
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS resumos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    arquivo TEXT NOT NULL,
-                    timestamp INTEGER NOT NULL,
-                    num_mensagens INTEGER NOT NULL
-                )
-            ''')
+            _LOGGER.info("Banco de dados inicializado com sucesso")
             
-            # Criar tabela de configuração
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS configuracao (
-                    chave TEXT PRIMARY KEY,
-                    valor TEXT NOT NULL
+        except Exception as e:
+            _LOGGER.error(f"Erro ao inicializar banco de dados: {e}")
+    
+    def _init_busca(self, cursor):
+        """Cria o índice FTS5 das mensagens e os gatilhos que o mantêm atualizado.
+        
+        O índice usa a tabela de mensagens como conteúdo externo, sem duplicar
+        o texto. Mensagens gravadas antes do índice existir ficam pendentes e
+        são indexadas em lotes por indexar_mensagens. Retorna False se o SQLite
+        não tiver FTS5; nesse caso, a busca usa LIKE.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mensagens_fts'")
+        novo = cursor.fetchone() is None
+        
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS mensagens_fts USING fts5(
+                    contato,
+                    mensagem,
+                    content='mensagens',
+                    content_rowid='id',
+                    tokenize='{TOKENIZADOR_BUSCA}'
                 )
             ''')
+        except sqlite3.OperationalError as e:
+            _LOGGER.warning(f"Busca textual (FTS5) indisponível, usando LIKE: {e}")
+            return False
+        
+        # Mensagens existentes aguardam a migração em lotes
+        if novo:
+            cursor.execute('SELECT MAX(id) FROM mensagens')
+            ultimo_id = cursor.fetchone()[0]
+            if ultimo_id:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, ?)
+                ''', [(CHAVE_FTS_PENDENTE, str(ultimo_id)), (CHAVE_FTS_INDEXADO, '0')])
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS mensagens_fts_insercao AFTER INSERT ON mensagens
+            BEGIN
+                INSERT INTO mensagens_fts (rowid, contato, mensagem)
+                VALUES (new.id, new.contato, new.mensagem);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS mensagens_fts_remocao AFTER DELETE ON mensagens
+            WHEN {CONDICAO_INDEXADA}
+            BEGIN
+                INSERT INTO mensagens_fts (mensagens_fts, rowid, contato, mensagem)
+                VALUES ('delete', old.id, old.contato, old.mensagem);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS mensagens_fts_alteracao AFTER UPDATE OF contato, mensagem ON mensagens
+            WHEN {CONDICAO_INDEXADA}
+            BEGIN
+                INSERT INTO mensagens_fts (mensagens_fts, rowid, contato, mensagem)
+                VALUES ('delete', old.id, old.contato, old.mensagem);
+                INSERT INTO mensagens_fts (rowid, contato, mensagem)
+                VALUES (new.id, new.contato, new.mensagem);
+            END
+        ''')
+        return True
+    
+    def _marcas_indexacao(self, conn):
+        """Marcas da migração do índice: {chave: id}, vazio se não há pendência."""
+        cursor = conn.execute(
+            'SELECT chave, CAST(valor AS INTEGER) FROM configuracao WHERE chave IN (?, ?)',
+            (CHAVE_FTS_PENDENTE, CHAVE_FTS_INDEXADO)
+        )
+        return dict(cursor.fetchall())
+    
+    def indexacao_pendente(self):
+        """Número de mensagens anteriores ao índice que ainda não foram indexadas."""
+        try:
+            leitura = self.conexoes.leitura()
+            marcas = self._marcas_indexacao(leitura)
+            if CHAVE_FTS_PENDENTE not in marcas:
+                return 0
             
-            # Criar índices para melhorar performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_contato ON mensagens(contato)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_importante ON mensagens(importante)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_mensagens_timestamp ON mensagens(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_resumos_timestamp ON resumos(timestamp)')
-            
-            conn.commit()
-            conn.close()
-            
-            _LOGGER.info("Banco de dados inicializado com sucesso")
+            cursor = leitura.execute(
+                'SELECT COUNT(*) FROM mensagens WHERE id > ? AND id <= ?',
+                (marcas.get(CHAVE_FTS_INDEXADO, 0), marcas[CHAVE_FTS_PENDENTE])
+            )
+            return cursor.fetchone()[0]
+        
+        except Exception as e:
+            _LOGGER.error(f"Erro ao consultar a indexação pendente: {e}")
+            return 0
+    
+    def indexar_mensagens(self, tamanho_lote=LOTE_INDEXACAO, progresso=None):
+        """Indexa em lotes as mensagens gravadas antes do índice de busca existir.
+        
+        Cada lote é uma transação própria e avança a marca CHAVE_FTS_INDEXADO,
+        de forma que a migração pode ser interrompida e retomada. Ao terminar,
+        as marcas são removidas e os gatilhos passam a valer para todas as linhas.
+        """
+        resultado = {'indexadas': 0}
+        if not self.fts_disponivel:
+            return resultado
+        
+        try:
+            while not self._parar_indexacao.is_set():
+                with self.conexoes.escrita() as conn:
+                    marcas = self._marcas_indexacao(conn)
+                    if CHAVE_FTS_PENDENTE not in marcas:
+                        break
+                    
+                    # Ler e indexar na mesma transação: uma remoção concorrente
+                    # não pode deixar no índice uma linha que já não existe
+                    rows = conn.execute('''
+                        SELECT id, contato, mensagem FROM mensagens
+                        WHERE id > ? AND id <= ?
+                        ORDER BY id
+                        LIMIT ?
+                    ''', (marcas.get(CHAVE_FTS_INDEXADO, 0), marcas[CHAVE_FTS_PENDENTE], tamanho_lote)).fetchall()
+                    
+                    if not rows:
+                        conn.execute(
+                            'DELETE FROM configuracao WHERE chave IN (?, ?)',
+                            (CHAVE_FTS_PENDENTE, CHAVE_FTS_INDEXADO)
+                        )
+                        break
+                    
+                    conn.executemany(
+                        'INSERT INTO mensagens_fts (rowid, contato, mensagem) VALUES (?, ?, ?)', rows
+                    )
+                    conn.execute(
+                        'INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, ?)',
+                        (CHAVE_FTS_INDEXADO, str(rows[-1][0]))
+                    )
+                
+                resultado['indexadas'] += len(rows)
+                if progresso:
+                    progresso(resultado['indexadas'])
             
+            if resultado['indexadas']:
+                _LOGGER.info(f"Índice de busca: {resultado['indexadas']} mensagens indexadas")
+            return resultado
+        
         except Exception as e:
-            _LOGGER.error(f"Erro ao inicializar banco de dados: {e}")
+            _LOGGER.error(f"Erro ao indexar mensagens para a busca: {e}")
+            resultado['erro'] = str(e)
+            return resultado
+    
+    def interromper_indexacao(self):
+        """Interrompe a indexação após o lote atual; ela continua no próximo início."""
+        self._parar_indexacao.set()
+    
+    def fechar(self):
+        """Fecha as conexões com o banco de dados."""
+        try:
+            # Gravar mensagens pendentes antes de fechar as conexões
+            if self.fila_escrita:
+                self.fila_escrita.fechar()
+            self.conexoes.fechar()
+            _LOGGER.info("Armazenamento de dados fechado")
+            return True
+        except Exception as e:
+            _LOGGER.error(f"Erro ao fechar armazenamento de dados: {e}")
+            return False
     
     def salvar_mensagem(self, mensagem):
         """Salva uma mensagem no banco de dados."""
+        # Com a fila ativa, a gravação é feita em lote pela thread de escrita
+        if self.fila_escrita:
+            return self.fila_escrita.enfileirar(mensagem)
+        
+        return self.salvar_mensagens([mensagem]) == 1
+    
+    def salvar_mensagens(self, mensagens):
+        """Salva várias mensagens em uma única transação."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            agora = datetime.datetime.now()
             
             # Preparar dados
-            timestamp = int(datetime.datetime.now().timestamp())
-            data_atual = datetime.datetime.now().strftime("%Y-%m-%d")
+            linhas = []
+            for mensagem in mensagens:
+                momento = agora
+                if mensagem.get('timestamp'):
+                    momento = datetime.datetime.fromtimestamp(mensagem['timestamp'])
+                linhas.append((
+                    mensagem.get('contato', 'Desconhecido'),
+                    mensagem.get('mensagem', ''),
+                    mensagem.get('hora', ''),
+                    momento.strftime("%Y-%m-%d"),
+                    mensagem.get('nivel_prioridade', 'baixa'),
+                    mensagem.get('categoria', 'geral'),
+                    1 if mensagem.get('importante', True) else 0,
+                    int(momento.timestamp())
+                ))
             
-            # Inserir mensagem
-            cursor.execute('''
-                INSERT INTO mensagens (
-                    contato, mensagem, hora, data, nivel_prioridade, 
-                    categoria, importante, timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                mensagem.get('contato', 'Desconhecido'),
-                mensagem.get('mensagem', ''),
-                mensagem.get('hora', ''),
-                data_atual,
-                mensagem.get('nivel_prioridade', 'baixa'),
-                mensagem.get('categoria', 'geral'),
-                1 if mensagem.get('importante', True) else 0,
-                timestamp
-            ))
-            
-            conn.commit()
-            conn.close()
+            if not linhas:
+                return 0
             
+            with self.conexoes.escrita() as conn:
+                # Inserir mensagens
+                conn.executemany('''
+                    INSERT INTO mensagens (
+                        contato, mensagem, hora, data, nivel_prioridade,
+                        categoria, importante, timestamp
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', linhas)
+            
+            return len(linhas)
+            
+        except Exception as e:
+            _LOGGER.error(f"Erro ao salvar mensagens: {e}")
+            return 0
+    
+    def obter_mensagens_vistas(self, impressoes):
+        """Retorna o subconjunto das impressões digitais já registradas."""
+        try:
+            impressoes = list(impressoes)
+            vistas = set()
+            conn = self.conexoes.leitura()
+            for inicio in range(0, len(impressoes), LOTE_CONSULTA_VISTAS):
+                lote = impressoes[inicio:inicio + LOTE_CONSULTA_VISTAS]
+                marcadores = ",".join("?" * len(lote))
+                cursor = conn.execute(
+                    f'SELECT impressao FROM mensagens_vistas WHERE impressao IN ({marcadores})',
+                    lote
+                )
+                vistas.update(linha[0] for linha in cursor)
+            return vistas
+            
+        except Exception as e:
+            _LOGGER.error(f"Erro ao consultar mensagens vistas: {e}")
+            return set()
+    
+    def registrar_mensagens_vistas(self, impressoes):
+        """Registra impressões digitais de mensagens processadas."""
+        try:
+            agora = int(time.time())
+            with self.conexoes.escrita() as conn:
+                conn.executemany('''
+                    INSERT OR IGNORE INTO mensagens_vistas (impressao, timestamp)
+                    VALUES (?, ?)
+                ''', [(impressao, agora) for impressao in impressoes])
             return True
             
         except Exception as e:
-            _LOGGER.error(f"Erro ao salvar mensagem: {e}")
+            _LOGGER.error(f"Erro ao registrar mensagens vistas: {e}")
             return False
     
+    def limpar_mensagens_vistas(self, dias=30):
+        """Remove impressões digitais registradas há mais que o número de dias especificado."""
+        try:
+            limite = int((datetime.datetime.now() - datetime.timedelta(days=dias)).timestamp())
+            
+            with self.conexoes.escrita() as conn:
+                cursor = conn.execute('''
+                    DELETE FROM mensagens_vistas
+                    WHERE timestamp < ?
+                ''', (limite,))
+                num_removidas = cursor.rowcount
+            
+            _LOGGER.debug(f"Removidas {num_removidas} impressões de mensagens vistas")
+            return num_removidas
+            
+        except Exception as e:
+            _LOGGER.error(f"Erro ao limpar mensagens vistas: {e}")
+            return 0
+    
     def salvar_resumo(self, resumo):
         """Salva informações sobre um resumo gerado."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Preparar dados
             timestamp = int(datetime.datetime.now().timestamp())
             
-            # Inserir resumo
-            cursor.execute('''
-                INSERT INTO resumos (arquivo, timestamp, num_mensagens)
-                VALUES (?, ?, ?)
-            ''', (
-                resumo.get('resumo_file', ''),
-                timestamp,
-                resumo.get('num_mensagens', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
-            
+            with self.conexoes.escrita() as conn:
+                # Inserir resumo
+                conn.execute('''
+                    INSERT INTO resumos (arquivo, timestamp, num_mensagens)
+                    VALUES (?, ?, ?)
+                ''', (
+                    resumo.get('resumo_file', ''),
+                    timestamp,
+                    resumo.get('num_mensagens', 0)
+                ))
+                
             return True
             
         except Exception as e:
@@ -154,9 +612,8 @@ class WhatsAppMonitorStorage:
     def obter_mensagens_importantes(self, limite=100):
         """Obtém as mensagens importantes mais recentes."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self.conexoes.leitura().cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute('''
                 SELECT * FROM mensagens
@@ -165,26 +622,104 @@ class WhatsAppMonitorStorage:
                 LIMIT ?
             ''', (limite,))
             
-            rows = cursor.fetchall()
-            conn.close()
-            
             # Converter para lista de dicionários
-            mensagens = []
-            for row in rows:
-                mensagens.append(dict(row))
-            
-            return mensagens
+            return [dict(row) for row in cursor.fetchall()]
             
         except Exception as e:
             _LOGGER.error(f"Erro ao obter mensagens importantes: {e}")
             return []
     
+    def buscar_mensagens(self, consulta, contato=None, categoria=None, dias=None,
+                         limite=20, pagina=1):
+        """Busca mensagens pelo texto ou pelo contato, ordenadas por relevância.
+        
+        Cada palavra da consulta precisa aparecer na mensagem ou no nome do
+        contato; uma palavra terminada em * busca pelo prefixo. Retorna uma
+        página de resultados com o total de mensagens encontradas.
+        """
+        limite = max(1, min(int(limite), LIMITE_BUSCA))
+        pagina = max(1, int(pagina))
+        resultado = {
+            'consulta': consulta,
+            'resultados': [],
+            'total': 0,
+            'pagina': pagina,
+            'limite': limite,
+            'indexacao_pendente': self.indexacao_pendente() if self.fts_disponivel else 0,
+        }
+        
+        termos = _termos_busca(consulta)
+        if not termos:
+            return resultado
+        
+        # Filtros sobre a tabela de mensagens
+        filtros = []
+        parametros = []
+        if contato:
+            filtros.append('m.contato = ?')
+            parametros.append(contato)
+        if categoria:
+            filtros.append('m.categoria = ?')
+            parametros.append(categoria)
+        if dias:
+            filtros.append('m.timestamp >= ?')
+            parametros.append(int((datetime.datetime.now() - datetime.timedelta(days=dias)).timestamp()))
+        
+        try:
+            cursor = self.conexoes.leitura().cursor()
+            cursor.row_factory = sqlite3.Row
+            
+            if self.fts_disponivel:
+                # Termos entre aspas: a pontuação do usuário não vira sintaxe do FTS5
+                expressao = ' '.join(
+                    '"{}"{}'.format(termo.replace('"', '""'), '*' if prefixo else '')
+                    for termo, prefixo in termos
+                )
+                origem = 'mensagens_fts JOIN mensagens m ON m.id = mensagens_fts.rowid'
+                condicao = ' AND '.join(['mensagens_fts MATCH ?'] + filtros)
+                argumentos = [expressao] + parametros
+                colunas = ("snippet(mensagens_fts, 1, '[', ']', '…', 12) AS trecho, "
+                           "bm25(mensagens_fts) AS relevancia")
+                ordem = 'relevancia, m.timestamp DESC'
+            else:
+                # Sem FTS5: LIKE por palavra, sem ranking e sem ignorar acentos
+                origem = 'mensagens m'
+                condicoes = []
+                argumentos = []
+                for termo, prefixo in termos:
+                    condicoes.append("(m.mensagem LIKE ? ESCAPE '\\' OR m.contato LIKE ? ESCAPE '\\')")
+                    padrao = '%' + termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                    argumentos += [padrao, padrao]
+                condicao = ' AND '.join(condicoes + filtros)
+                argumentos += parametros
+                colunas = 'm.mensagem AS trecho, NULL AS relevancia'
+                ordem = 'm.timestamp DESC'
+            
+            cursor.execute(f'SELECT COUNT(*) FROM {origem} WHERE {condicao}', argumentos)
+            resultado['total'] = cursor.fetchone()[0]
+            
+            if resultado['total'] > (pagina - 1) * limite:
+                cursor.execute(f'''
+                    SELECT m.*, {colunas}
+                    FROM {origem}
+                    WHERE {condicao}
+                    ORDER BY {ordem}
+                    LIMIT ? OFFSET ?
+                ''', argumentos + [limite, (pagina - 1) * limite])
+                resultado['resultados'] = [dict(row) for row in cursor.fetchall()]
+            
+            return resultado
+        
+        except Exception as e:
+            _LOGGER.error(f"Erro ao buscar mensagens: {e}")
+            resultado['erro'] = str(e)
+            return resultado
+    
     def obter_ultimo_resumo(self):
         """Obtém informações sobre o último resumo gerado."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self.conexoes.leitura().cursor()
+            cursor.row_factory = sqlite3.Row
             
             cursor.execute('''
                 SELECT * FROM resumos
@@ -193,13 +728,12 @@ class WhatsAppMonitorStorage:
             ''')
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
                 return dict(row)
             else:
                 return None
-            
+                
         except Exception as e:
             _LOGGER.error(f"Erro ao obter último resumo: {e}")
             return None
@@ -207,22 +741,17 @@ class WhatsAppMonitorStorage:
     def salvar_configuracao(self, chave, valor):
         """Salva um item de configuração."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Converter valor para JSON se for um objeto
             if not isinstance(valor, str):
                 valor = json.dumps(valor)
-            
-            # Inserir ou atualizar configuração
-            cursor.execute('''
-                INSERT OR REPLACE INTO configuracao (chave, valor)
-                VALUES (?, ?)
-            ''', (chave, valor))
-            
-            conn.commit()
-            conn.close()
-            
+                
+            with self.conexoes.escrita() as conn:
+                # Inserir ou atualizar configuração
+                conn.execute('''
+                    INSERT OR REPLACE INTO configuracao (chave, valor)
+                    VALUES (?, ?)
+                ''', (chave, valor))
+                
             return True
             
         except Exception as e:
@@ -232,16 +761,12 @@ class WhatsAppMonitorStorage:
     def obter_configuracao(self, chave, padrao=None):
         """Obtém um item de configuração."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            cursor = self.conexoes.leitura().execute('''
                 SELECT valor FROM configuracao
                 WHERE chave = ?
             ''', (chave,))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
                 valor = row[0]
@@ -252,7 +777,7 @@ class WhatsAppMonitorStorage:
                     return valor
             else:
                 return padrao
-            
+                
         except Exception as e:
             _LOGGER.error(f"Erro ao obter configuração: {e}")
             return padrao
@@ -260,22 +785,24 @@ class WhatsAppMonitorStorage:
     def limpar_mensagens_antigas(self, dias=30):
         """Remove mensagens mais antigas que o número de dias especificado."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Calcular timestamp limite
             limite = int((datetime.datetime.now() - datetime.timedelta(days=dias)).timestamp())
             
-            # Remover mensagens antigas
-            cursor.execute('''
-                DELETE FROM mensagens
-                WHERE timestamp < ?
-            ''', (limite,))
-            
-            num_removidas = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
+            with self.conexoes.escrita() as conn:
+                # Remover mensagens antigas
+                cursor = conn.execute('''
+                    DELETE FROM mensagens
+                    WHERE timestamp < ?
+                ''', (limite,))
+                
+                num_removidas = cursor.rowcount
+                
+                # Impressões antigas não voltam a aparecer entre as últimas mensagens
+                conn.execute('''
+                    DELETE FROM mensagens_vistas
+                    WHERE timestamp < ?
+                ''', (limite,))
+                
             _LOGGER.info(f"Removidas {num_removidas} mensagens antigas")
             return num_removidas
             
@@ -283,6 +810,63 @@ class WhatsAppMonitorStorage:
             _LOGGER.error(f"Erro ao limpar mensagens antigas: {e}")
             return 0
     
+    def reclassificar_mensagens(self, matcher, dias=7, tamanho_lote=200, progresso=None):
+        """Reclassifica as mensagens recentes com um novo identificador, em lotes."""
+        resultado = {'processadas': 0, 'alteradas': 0, 'total': 0}
+        try:
+            leitura = self.conexoes.leitura()
+            
+            # Calcular timestamp limite
+            limite = int((datetime.datetime.now() - datetime.timedelta(days=dias)).timestamp())
+            
+            cursor = leitura.execute('SELECT COUNT(*) FROM mensagens WHERE timestamp >= ?', (limite,))
+            resultado['total'] = cursor.fetchone()[0]
+            
+            ultimo_id = 0
+            while True:
+                rows = leitura.execute('''
+                    SELECT id, contato, mensagem, importante, categoria FROM mensagens
+                    WHERE timestamp >= ? AND id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (limite, ultimo_id, tamanho_lote)).fetchall()
+                
+                if not rows:
+                    break
+                    
+                # Classificar o lote e atualizar apenas as linhas alteradas
+                alteracoes = []
+                for id_mensagem, contato, texto, importante, categoria in rows:
+                    correspondencia = matcher.match(contato, texto)
+                    nova_importante = 1 if correspondencia else 0
+                    nova_categoria = correspondencia[0] if correspondencia else 'geral'
+                    if nova_importante != importante or nova_categoria != categoria:
+                        alteracoes.append((nova_importante, nova_categoria, id_mensagem))
+                        
+                # Um lote por transação para não bloquear outras escritas
+                if alteracoes:
+                    with self.conexoes.escrita() as conn:
+                        conn.executemany('''
+                            UPDATE mensagens SET importante = ?, categoria = ?
+                            WHERE id = ?
+                        ''', alteracoes)
+                        
+                ultimo_id = rows[-1][0]
+                resultado['processadas'] += len(rows)
+                resultado['alteradas'] += len(alteracoes)
+                
+                if progresso:
+                    progresso(resultado['processadas'], resultado['total'], resultado['alteradas'])
+                    
+            _LOGGER.info(f"Reclassificadas {resultado['processadas']} mensagens "
+                         f"({resultado['alteradas']} alteradas)")
+            return resultado
+            
+        except Exception as e:
+            _LOGGER.error(f"Erro ao reclassificar mensagens: {e}")
+            resultado['erro'] = str(e)
+            return resultado
+    
     def criar_backup(self):
         """Cria um backup do banco de dados."""
         try:
@@ -290,16 +874,10 @@ class WhatsAppMonitorStorage:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_file = os.path.join(self.backup_dir, f"whatsapp_monitor_backup_{timestamp}.db")
             
-            # Conectar ao banco de dados original
-            conn = sqlite3.connect(self.db_path)
-            
-            # Criar backup
+            # Criar backup a partir da conexão de leitura
             backup_conn = sqlite3.connect(backup_file)
-            conn.backup(backup_conn)
-            
-            # Fechar conexões
+            self.conexoes.leitura().backup(backup_conn)
             backup_conn.close()
-            conn.close()
             
             _LOGGER.info(f"Backup criado em {backup_file}")
             return backup_file
@@ -314,23 +892,26 @@ class WhatsAppMonitorStorage:
             if not os.path.exists(backup_file):
                 _LOGGER.error(f"Arquivo de backup não encontrado: {backup_file}")
                 return False
-            
+                
             # Criar backup do banco atual antes de restaurar
             self.criar_backup()
             
             # Conectar ao banco de dados de backup
             backup_conn = sqlite3.connect(backup_file)
             
-            # Conectar ao banco de dados principal
-            conn = sqlite3.connect(self.db_path)
-            
-            # Restaurar backup
-            backup_conn.backup(conn)
-            
-            # Fechar conexões
-            conn.close()
+            # Restaurar backup pela conexão de escrita (a cópia exige a conexão
+            # fora de transação)
+            with self.conexoes.escrita(imediata=False) as conn:
+                backup_conn.backup(conn)
+                
             backup_conn.close()
             
+            # Backups anteriores à busca textual não têm o índice; um backup
+            # com o índice traz as suas próprias marcas de migração
+            with self.conexoes.escrita() as conn:
+                self.fts_disponivel = self._init_busca(conn.cursor())
+            self.indexar_mensagens()
+            
             _LOGGER.info(f"Backup restaurado de {backup_file}")
             return True
             
@@ -341,8 +922,7 @@ class WhatsAppMonitorStorage:
     def estatisticas_armazenamento(self):
         """Retorna estatísticas sobre o armazenamento de dados."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self.conexoes.leitura().cursor()
             
             # Total de mensagens
             cursor.execute('SELECT COUNT(*) FROM mensagens')
@@ -365,16 +945,16 @@ class WhatsAppMonitorStorage:
             ''')
             mensagens_por_contato = {row[0]: row[1] for row in cursor.fetchall()}
             
-            # Tamanho do banco de dados
-            tamanho_db = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
-            
+            # Tamanho do banco de dados (incluindo o WAL)
+            tamanho_db = sum(os.path.getsize(caminho)
+                             for caminho in (self.db_path, f"{self.db_path}-wal")
+                             if os.path.exists(caminho))
+                             
             # Tamanho dos backups
-            tamanho_backups = sum(os.path.getsize(os.path.join(self.backup_dir, f)) 
-                                for f in os.listdir(self.backup_dir) 
+            tamanho_backups = sum(os.path.getsize(os.path.join(self.backup_dir, f))
+                                for f in os.listdir(self.backup_dir)
                                 if os.path.isfile(os.path.join(self.backup_dir, f)))
-            
-            conn.close()
-            
+                                
             return {
                 'total_mensagens': total_mensagens,
                 'total_importantes': total_importantes,
@@ -392,16 +972,34 @@ class WhatsAppMonitorStorage:
                 'ultima_atualizacao': datetime.datetime.now().isoformat()
             }
 
+def _termos_busca(consulta):
+    """Separa a consulta em (termo, prefixo), descartando aspas e operadores."""
+    termos = []
+    for palavra in (consulta or '').split():
+        prefixo = palavra.endswith('*')
+        termo = palavra.strip('*"')
+        if termo:
+            termos.append((termo, prefixo))
+    return termos
+
 # Funções de serviço para Home Assistant
 
-def init_storage(hass):
-    """Inicializa o armazenamento de dados."""
+def init_storage(hass, dados):
+    """Inicializa o armazenamento de dados de uma conta."""
     try:
-        config_dir = hass.config.path("custom_components", DOMAIN)
+        # Cada conta tem o seu próprio banco de dados
+        config_dir = dados["diretorio"]
+        os.makedirs(config_dir, exist_ok=True)
         
         # Criar instância do armazenamento
-        storage = WhatsAppMonitorStorage(config_dir)
-        hass.data[DOMAIN]["storage"] = storage
+        config = dados.get("config", {})
+        storage = WhatsAppMonitorStorage(
+            config_dir,
+            escrita_assincrona=config.get("escrita_assincrona", False),
+            tamanho_lote=config.get("tamanho_lote_escrita", TAMANHO_LOTE_ESCRITA),
+            intervalo_escrita=config.get("intervalo_escrita", INTERVALO_ESCRITA)
+        )
+        dados["storage"] = storage
         
         _LOGGER.info("Armazenamento de dados inicializado com sucesso")
         return True
@@ -409,9 +1007,9 @@ def init_storage(hass):
         _LOGGER.error(f"Erro ao inicializar armazenamento de dados: {e}")
         return False
 
-def backup_service(hass):
-    """Serviço para criar backup do banco de dados."""
-    storage = hass.data[DOMAIN].get("storage")
+def backup_service(hass, dados):
+    """Serviço para criar backup do banco de dados de uma conta."""
+    storage = dados.get("storage")
     if not storage:
         _LOGGER.error("Armazenamento de dados não inicializado")
         return False
@@ -421,6 +1019,7 @@ def backup_service(hass):
     if backup_file:
         # Disparar evento para notificar sobre novo backup
         hass.bus.fire(f"{DOMAIN}_new_backup", {
+            "conta": dados.get("conta"),
             "backup_file": backup_file,
             "timestamp": datetime.datetime.now().isoformat()
         })
@@ -429,9 +1028,9 @@ def backup_service(hass):
     else:
         return False
 
-def cleanup_service(hass, dias=30):
-    """Serviço para limpar mensagens antigas."""
-    storage = hass.data[DOMAIN].get("storage")
+def cleanup_service(hass, dados, dias=30):
+    """Serviço para limpar mensagens antigas de uma conta."""
+    storage = dados.get("storage")
     if not storage:
         _LOGGER.error("Armazenamento de dados não inicializado")
         return False
@@ -440,9 +1039,82 @@ def cleanup_service(hass, dias=30):
     
     # Disparar evento para notificar sobre limpeza
     hass.bus.fire(f"{DOMAIN}_storage_cleanup", {
+        "conta": dados.get("conta"),
         "mensagens_removidas": num_removidas,
         "dias": dias,
         "timestamp": datetime.datetime.now().isoformat()
     })
     
     return True
+
+def prune_seen_service(hass, dados, dias=30):
+    """Remove as impressões antigas do índice de mensagens vistas de uma conta."""
+    storage = dados.get("storage")
+    if not storage:
+        _LOGGER.error("Armazenamento de dados não inicializado")
+        return False
+    
+    storage.limpar_mensagens_vistas(dias)
+    return True
+
+def index_service(hass, dados, tamanho_lote=LOTE_INDEXACAO):
+    """Indexa para a busca as mensagens de uma conta gravadas antes do índice."""
+    storage = dados.get("storage")
+    if not storage:
+        _LOGGER.error("Armazenamento de dados não inicializado")
+        return False
+    
+    resultado = storage.indexar_mensagens(tamanho_lote)
+    
+    if resultado['indexadas']:
+        # Disparar evento para notificar sobre o fim da migração do índice
+        hass.bus.fire(f"{DOMAIN}_search_indexed", {
+            "conta": dados.get("conta"),
+            **resultado,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+    
+    return 'erro' not in resultado
+
+def search_service(hass, dados, consulta, contato=None, categoria=None, dias=None,
+                   limite=20, pagina=1):
+    """Serviço para buscar mensagens armazenadas de uma conta."""
+    storage = dados.get("storage")
+    if not storage:
+        _LOGGER.error("Armazenamento de dados não inicializado")
+        return None
+    
+    return {
+        "conta": dados.get("conta"),
+        "nome": dados.get("nome"),
+        **storage.buscar_mensagens(consulta, contato, categoria, dias, limite, pagina)
+    }
+
+def reclassify_service(hass, dados, matcher, dias=7, tamanho_lote=200):
+    """Serviço para reclassificar mensagens recentes de uma conta com as regras atuais."""
+    storage = dados.get("storage")
+    if not storage:
+        _LOGGER.error("Armazenamento de dados não inicializado")
+        return False
+    
+    def progresso(processadas, total, alteradas):
+        # Disparar evento de progresso a cada lote
+        hass.bus.fire(f"{DOMAIN}_reclassify_progress", {
+            "conta": dados.get("conta"),
+            "processadas": processadas,
+            "total": total,
+            "alteradas": alteradas,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+    
+    resultado = storage.reclassificar_mensagens(matcher, dias, tamanho_lote, progresso)
+    
+    # Disparar evento para notificar sobre o fim da reclassificação
+    hass.bus.fire(f"{DOMAIN}_reclassify_completed", {
+        "conta": dados.get("conta"),
+        **resultado,
+        "dias": dias,
+        "timestamp": datetime.datetime.now().isoformat()
+    })
+    
+    return 'erro' not in resultado
@@ -0,0 +1,150 @@
+"""
+WhatsApp Monitor - Vigia do navegador para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+Entre os ciclos, o vigia confere o RSS do Chrome e responde se o driver
+ainda atende. Quando a memória passa do limite ou a sonda falha seguidas
+vezes, o monitor reinicia o driver com o mesmo perfil, sem novo QR Code.
+Um disjuntor com espera exponencial impede que um driver quebrado fique
+reiniciando sem parar.
+"""
+
+import time
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# Limite padrão de RSS do Chrome antes de reciclar o driver (MB; 0 desativa)
+LIMITE_MEMORIA_NAVEGADOR = 700
+
+# Falhas seguidas da sonda antes de reiniciar o driver
+FALHAS_SONDA = 2
+
+# Espera do disjuntor após um reinício (segundos), dobrada a cada reinício
+# sem um ciclo saudável no meio
+ESPERA_INICIAL_REINICIO = 30
+ESPERA_MAXIMA_REINICIO = 1800
+
+# Motivos de reinício
+MOTIVO_MEMORIA = "memoria"
+MOTIVO_SONDA = "sonda"
+MOTIVO_FALHA_INICIO = "falha_inicio"
+
+# Estados do disjuntor
+DISJUNTOR_FECHADO = "fechado"
+DISJUNTOR_ABERTO = "aberto"
+
+
+def sonda_saude(driver):
+    """Retorna None se o driver responde com a página do WhatsApp Web aberta,
+    ou a descrição do problema."""
+    try:
+        host = driver.execute_script("return location.host;")
+    except Exception as e:
+        # Sessão inválida, aba travada ou Chrome inacessível
+        return str(e).splitlines()[0] if str(e) else type(e).__name__
+    if not host or "whatsapp" not in host:
+        return f"página inesperada: {host or 'em branco'}"
+    return None
+
+
+class DisjuntorReinicio:
+    """Disjuntor dos reinícios do driver.
+
+    Cada reinício abre o disjuntor por uma espera que dobra a cada reinício
+    sem um ciclo saudável no meio, até ESPERA_MAXIMA_REINICIO. Um ciclo
+    saudável fecha o disjuntor e zera a espera.
+    """
+
+    def __init__(self, espera_inicial=ESPERA_INICIAL_REINICIO, espera_maxima=ESPERA_MAXIMA_REINICIO,
+                 relogio=time.monotonic):
+        """Inicializa o disjuntor fechado."""
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self._relogio = relogio
+        self.falhas = 0
+        self._liberado_em = 0
+
+    @property
+    def estado(self):
+        """Estado atual do disjuntor."""
+        return DISJUNTOR_ABERTO if self.espera_restante() > 0 else DISJUNTOR_FECHADO
+
+    def espera_restante(self):
+        """Segundos até a próxima tentativa ser permitida."""
+        return max(0, self._liberado_em - self._relogio())
+
+    def pode_tentar(self):
+        """Indica se um novo reinício é permitido agora."""
+        return self.espera_restante() <= 0
+
+    def registrar_falha(self):
+        """Registra um reinício e abre o disjuntor; retorna a espera em segundos."""
+        self.falhas += 1
+        espera = min(self.espera_maxima, self.espera_inicial * 2 ** (self.falhas - 1))
+        self._liberado_em = self._relogio() + espera
+        return espera
+
+    def registrar_sucesso(self):
+        """Fecha o disjuntor após um ciclo saudável."""
+        self.falhas = 0
+        self._liberado_em = 0
+
+
+class VigiaNavegador:
+    """Decide quando o driver deve ser reiniciado e guarda o histórico."""
+
+    def __init__(self, limite_memoria_mb=LIMITE_MEMORIA_NAVEGADOR, falhas_sonda=FALHAS_SONDA,
+                 disjuntor=None):
+        """Inicializa o vigia sem falhas registradas."""
+        self.limite_memoria = limite_memoria_mb * 1024 * 1024 if limite_memoria_mb else None
+        self.falhas_sonda = max(1, falhas_sonda)
+        self.disjuntor = disjuntor or DisjuntorReinicio()
+        self.falhas_seguidas = 0
+        self.reinicios = 0
+        self.ultimo_motivo = None
+        self.ultimo_reinicio = None
+
+    def avaliar(self, driver, rss_bytes):
+        """Retorna o motivo para reiniciar o driver, ou None se está saudável."""
+        if self.limite_memoria and rss_bytes and rss_bytes > self.limite_memoria:
+            _LOGGER.warning(
+                f"Chrome usando {rss_bytes / 1048576:.0f} MB, acima do limite de "
+                f"{self.limite_memoria / 1048576:.0f} MB"
+            )
+            return MOTIVO_MEMORIA
+
+        problema = sonda_saude(driver)
+        if problema is None:
+            self.falhas_seguidas = 0
+            return None
+
+        self.falhas_seguidas += 1
+        _LOGGER.warning(
+            f"Driver não respondeu à sonda ({self.falhas_seguidas}/{self.falhas_sonda}): {problema}"
+        )
+        if self.falhas_seguidas >= self.falhas_sonda:
+            return MOTIVO_SONDA
+        return None
+
+    def registrar_reinicio(self, motivo):
+        """Registra um reinício e abre o disjuntor; retorna a espera em segundos."""
+        self.reinicios += 1
+        self.ultimo_motivo = motivo
+        self.ultimo_reinicio = time.time()
+        self.falhas_seguidas = 0
+        return self.disjuntor.registrar_falha()
+
+    def registrar_ciclo_saudavel(self):
+        """Fecha o disjuntor após um ciclo com o driver saudável e conectado."""
+        self.disjuntor.registrar_sucesso()
+
+    def estado(self):
+        """Resumo do vigia exibido nos sensores."""
+        return {
+            'reinicios': self.reinicios,
+            'ultimo_motivo': self.ultimo_motivo,
+            'ultimo_reinicio': self.ultimo_reinicio,
+            'disjuntor': self.disjuntor.estado,
+            'espera_reinicio': round(self.disjuntor.espera_restante()),
+        }
@@ -5,27 +5,98 @@ Desenvolvido para Raspberry Pi 4 com Home Assistant
 
 import os
 import time
+import hashlib
 import logging
 import datetime
 import base64
-from io import BytesIO
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from PIL import Image
+
+from .keywords import KeywordMatcher
+from .dedup import IndiceMensagensVistas, impressoes_mensagens, CAPACIDADE_INDICE
+from .buffer_mensagens import BufferMensagens, CAPACIDADE_BUFFER
+from .navegador import (
+    MODO_NAVEGADOR_PADRAO,
+    By,
+    iniciar_driver,
+    aplicar_bloqueios,
+    rss_driver,
+    pid_driver,
+    processos_descendentes,
+    identificar_processos,
+    encerrar_processos,
+)
+from .vigia import VigiaNavegador, LIMITE_MEMORIA_NAVEGADOR, MOTIVO_FALHA_INICIO
+from .reserva import ReservaNavegador, MEMORIA_MINIMA_RESERVA, outro_perfil
+from .esperas import (
+    MotorEspera,
+    PAGINA_LISTA,
+    PAGINA_QR,
+    pagina_pronta,
+    lista_renderizada,
+    qr_alterado,
+    conversa_carregada,
+)
+from .dom_scripts import (
+    SCRIPT_LISTA_CHATS,
+    SCRIPT_ABRIR_CHAT,
+    SCRIPT_VOLTAR,
+    SCRIPT_INSTALAR_OBSERVADOR,
+    SCRIPT_DRENAR_EVENTOS,
+    SCRIPT_AGUARDAR_EVENTOS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
 # Constantes
 DOMAIN = "whatsapp_monitor"
 PROFILE_DIR = "whatsapp_profile"
+PROFILE_RESERVA_DIR = "whatsapp_profile_reserva"
 RESUMOS_DIR = "resumos"
 GRAFICOS_DIR = "graficos"
 
+# Modos de extração do DOM
+MODO_EXTRACAO_SNAPSHOT = "snapshot"
+MODO_EXTRACAO_ELEMENTOS = "elementos"
+MENSAGENS_POR_CHAT = 5
+MAX_MENSAGENS_POR_CHAT = 50
+MAX_ROLAGENS_CHAT = 5
+# Mensagens não lidas cobertas pela prévia exibida na lista de conversas
+MENSAGENS_NA_PREVIA = 1
+CHAVE_MARCAS_CHATS = "marcas_chats"
+CHAVE_PERFIL_ATIVO = "perfil_ativo"
+ESPERA_ABRIR_CHAT_MS = 3000
+TEMPO_LIMITE_SCRIPT = 60
+
+# Tempo máximo gasto abrindo conversas em um ciclo (segundos)
+ORCAMENTO_CICLO = 60
+
+# Tempos limite das esperas por condições da página (segundos)
+ESPERA_PAGINA_INICIAL = 60
+ESPERA_AUTENTICACAO = 300
+ESPERA_LISTA_CHATS = 15
+ESPERA_PASSO_LOGIN = 2
+
+# Estados do login no WhatsApp Web
+ESTADO_DESCONECTADO = "desconectado"
+ESTADO_CARREGANDO = "carregando"
+ESTADO_QR_EXIBIDO = "qr_exibido"
+ESTADO_ESCANEANDO = "escaneando"
+ESTADO_CONECTADO = "conectado"
+ESTADO_SESSAO_ENCERRADA = "sessao_encerrada"
+ESTADOS_LOGIN_EM_ANDAMENTO = (ESTADO_CARREGANDO, ESTADO_QR_EXIBIDO, ESTADO_ESCANEANDO)
+
+# Modos de detecção de novas mensagens
+MODO_DETECCAO_POLLING = "polling"
+MODO_DETECCAO_OBSERVADOR = "observador"
+LIMITE_EVENTOS_PAGINA = 500
+
+def contar_nao_lidas(texto_badge):
+    """Número de mensagens não lidas a partir do texto do badge (como lerLinha).
+    
+    Badges sem número (ex.: conversa marcada como não lida) contam como 1.
+    """
+    texto = (texto_badge or '').strip()
+    return int(texto) if texto.isdigit() else 1
+
 class WhatsAppMonitor:
     """Classe principal para monitoramento do WhatsApp."""
     
@@ -33,14 +104,41 @@ class WhatsAppMonitor:
         """Inicializa o monitor do WhatsApp."""
         self.config_dir = config_dir
         self.config = config
+        self.conta = config.get('conta')
         self.driver = None
         self.connected = False
+        self.estado_login = ESTADO_DESCONECTADO
+        self.estado_login_desde = time.time()
+        self._inicio_login = 0
+        self._qr_atual = None
+        self.qr_png = None
+        self.qr_hash = None
         self.last_check_time = None
-        self.important_messages = []
+        self.important_messages = BufferMensagens(config.get('capacidade_buffer', CAPACIDADE_BUFFER))
         self.hass = None
+        self._matcher = None
+        self.matcher_version = 0
+        self._eventos_pendentes = []
+        self._encerrando = False
+        self.estatisticas_ciclo = {}
+        self.modo_navegador = config.get('modo_navegador', MODO_NAVEGADOR_PADRAO)
+        self.memoria_navegador = {'modo': self.modo_navegador, 'rss_bytes': None}
+        self.vigia = VigiaNavegador(config.get('limite_memoria_navegador', LIMITE_MEMORIA_NAVEGADOR))
+        self.esperas = MotorEspera(lambda: self.driver, lambda: self._encerrando)
+        self.storage = None
+        self.marcas_chats = {}
+        self.digesto_lista = None
+        self.digestos_chats = {}
+        self.chats_pendentes = set()
+        self.indice_vistas = IndiceMensagensVistas(
+            capacidade=config.get('capacidade_indice_vistas', CAPACIDADE_INDICE)
+        )
         
         # Criar diretórios necessários
         self.profile_dir = os.path.join(config_dir, PROFILE_DIR)
+        self.profile_reserva_dir = os.path.join(config_dir, PROFILE_RESERVA_DIR)
+        self.perfil_ativo = self.profile_dir
+        self._perfil_anterior = None
         self.resumos_dir = os.path.join(config_dir, RESUMOS_DIR)
         self.graficos_dir = os.path.join(config_dir, GRAFICOS_DIR)
         
@@ -48,186 +146,356 @@ class WhatsAppMonitor:
         os.makedirs(self.resumos_dir, exist_ok=True)
         os.makedirs(self.graficos_dir, exist_ok=True)
         
-        # Inicializar driver
-        self._init_driver()
+        # O driver é iniciado no primeiro passo do login, não na carga do componente
+        self.reserva = None
+        if config.get('driver_reserva', False):
+            self.reserva = ReservaNavegador(
+                self._criar_driver, config.get('memoria_minima_reserva', MEMORIA_MINIMA_RESERVA)
+            )
+    
+    def _criar_driver(self, profile_dir):
+        """Cria um driver configurado com o perfil informado."""
+        # Caminho do chromedriver resolvido uma única vez
+        driver = iniciar_driver(
+            self.config_dir,
+            profile_dir,
+            self.modo_navegador,
+            self.config.get('caminho_chromedriver'),
+            self.config.get('caminho_navegador')
+        )
+        driver.set_script_timeout(TEMPO_LIMITE_SCRIPT)
+        
+        # No modo leve, bloquear imagens, mídias e fontes antes de abrir a página
+        aplicar_bloqueios(driver, self.modo_navegador)
+        return driver
     
     def _init_driver(self):
         """Inicializa o driver do Selenium."""
         try:
-            # Configurar opções do Chrome
-            chrome_options = Options()
-            chrome_options.add_argument("--headless")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1280,720")
-            chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
-            chrome_options.add_argument("--disable-features=TranslateUI")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-plugins-discovery")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+            self.driver = self._criar_driver(self.perfil_ativo)
             
-            # Inicializar driver
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            _LOGGER.info("Driver do Selenium inicializado com sucesso")
+            _LOGGER.info(f"Driver do Selenium inicializado com sucesso (modo {self.modo_navegador})")
             return True
         except Exception as e:
             _LOGGER.error(f"Erro ao inicializar driver do Selenium: {e}")
             return False
     
-    def capture_qr_code(self):
-        """Captura o QR Code e salva como imagem."""
+    def _disparar_evento(self, evento, dados):
+        """Dispara um evento no Home Assistant, se disponível, identificando a conta."""
+        if self.hass:
+            if self.conta:
+                dados = {**dados, "conta": self.conta}
+            self.hass.bus.fire(evento, dados)
+    
+    def _notificar(self, titulo, mensagem, notification_id):
+        """Cria uma notificação persistente sem bloquear a thread atual."""
+        if self.hass:
+            self.hass.add_job(
+                self.hass.services.async_call,
+                "persistent_notification",
+                "create",
+                {
+                    "title": titulo,
+                    "message": mensagem,
+                    "notification_id": notification_id
+                }
+            )
+    
+    def definir_storage(self, storage):
+        """Associa o armazenamento usado pelo índice de mensagens vistas e pelas marcas."""
+        self.storage = storage
+        self.indice_vistas.storage = storage
+        if storage is not None:
+            self.marcas_chats = storage.obter_configuracao(CHAVE_MARCAS_CHATS, {}) or {}
+            # Após uma promoção da reserva, a sessão vive no perfil reserva
+            if (storage.obter_configuracao(CHAVE_PERFIL_ATIVO) == PROFILE_RESERVA_DIR
+                    and os.path.isdir(self.profile_reserva_dir)):
+                self.perfil_ativo = self.profile_reserva_dir
+    
+    def _definir_perfil_ativo(self, perfil):
+        """Registra o diretório de perfil usado pelo driver ativo."""
+        self.perfil_ativo = perfil
+        if self.storage is not None:
+            self.storage.salvar_configuracao(CHAVE_PERFIL_ATIVO, os.path.basename(perfil))
+    
+    def _aquecer_reserva(self):
+        """Prepara em segundo plano um driver reserva com uma cópia do perfil ativo."""
+        if self.reserva is None:
+            return False
+        destino = outro_perfil(self.perfil_ativo, (self.profile_dir, self.profile_reserva_dir))
+        return self.reserva.aquecer(self.perfil_ativo, destino)
+    
+    def _renovar_reserva(self):
+        """Refaz a reserva cuja cópia do perfil ficou defasada em relação à sessão ativa."""
+        if self.reserva is None or not self.reserva.vencida():
+            return False
+        _LOGGER.info("Renovando o driver reserva com uma cópia atual do perfil")
+        self.reserva.descartar()
+        return self._aquecer_reserva()
+    
+    def _recuar_reserva(self):
+        """Volta ao perfil anterior quando a reserva promovida não tem sessão válida.
+        
+        A cópia do perfil é feita com o Chrome ativo em uso e pode estar
+        incompleta ou defasada; o perfil original continua intacto em disco.
+        """
+        _LOGGER.warning(
+            f"Reserva promovida abriu o QR Code; voltando ao perfil "
+            f"{os.path.basename(self._perfil_anterior)}"
+        )
+        self._encerrar_driver()
+        self.perfil_ativo, self._perfil_anterior = self._perfil_anterior, None
+        if not self._init_driver():
+            self.vigia.registrar_reinicio(MOTIVO_FALHA_INICIO)
+        self._mudar_estado_login(ESTADO_DESCONECTADO)
+    
+    def _salvar_marcas(self):
+        """Persiste a última mensagem processada de cada conversa."""
+        if self.storage is not None:
+            self.storage.salvar_configuracao(CHAVE_MARCAS_CHATS, self.marcas_chats)
+    
+    @property
+    def tempos_espera(self):
+        """Duração das esperas por condições da página, por tipo de espera."""
+        return self.esperas.metricas
+    
+    @property
+    def uso_buffer(self):
+        """Memória ocupada pelo buffer de mensagens importantes."""
+        return self.important_messages.uso_memoria()
+    
+    def medir_memoria_navegador(self):
+        """Mede o RSS do chromedriver e dos processos do Chrome."""
+        rss = rss_driver(self.driver) if self.driver is not None else None
+        self.memoria_navegador = {'modo': self.modo_navegador, 'rss_bytes': rss}
+        if self.reserva is not None:
+            self.memoria_navegador['rss_reserva_bytes'] = self.reserva.rss()
+        return self.memoria_navegador
+    
+    @property
+    def estado_vigia(self):
+        """Reinícios do navegador e estado do disjuntor."""
+        return self.vigia.estado()
+    
+    @property
+    def estado_reserva(self):
+        """Situação do driver reserva, ou None se o modo está desativado."""
+        return self.reserva.estado() if self.reserva is not None else None
+    
+    def _encerrar_driver(self):
+        """Fecha o driver e encerra à força os processos do Chrome que sobrarem."""
+        driver, self.driver = self.driver, None
+        if driver is None:
+            return
+        
+        # Os processos do Chrome deixam de ser filhos do chromedriver após o
+        # quit; o instante de início identifica cada um caso o pid seja reutilizado
+        processos = identificar_processos(processos_descendentes(pid_driver(driver)))
         try:
-            # Esperar pelo QR Code aparecer
-            qr_code_element = self.driver.find_element(By.XPATH, '//canvas[contains(@aria-label, "Scan me!") or contains(@aria-label, "Escanear")]')
-            
-            # Capturar o QR Code como imagem
-            canvas_base64 = self.driver.execute_script("return arguments[0].toDataURL('image/png').substring(22);", qr_code_element)
+            driver.quit()
+        except Exception as e:
+            _LOGGER.warning(f"Erro ao fechar o driver do Selenium: {e}")
+        encerrados = encerrar_processos(processos)
+        if encerrados:
+            _LOGGER.debug(f"{encerrados} processos do Chrome encerrados à força")
+    
+    def verificar_navegador(self):
+        """Confere a memória e a saúde do navegador antes do ciclo.
+        
+        Reinicia o driver quando o vigia pede. Retorna False se o ciclo deve
+        ser pulado.
+        """
+        if self.driver is None:
+            return self.vigia.disjuntor.pode_tentar()
+        
+        rss = self.medir_memoria_navegador()['rss_bytes']
+        motivo = self.vigia.avaliar(self.driver, rss)
+        if motivo is None:
+            if self.connected:
+                self.vigia.registrar_ciclo_saudavel()
+                self._renovar_reserva()
+            return True
+        return self.reiniciar_navegador(motivo)
+    
+    def reiniciar_navegador(self, motivo):
+        """Reinicia o driver mantendo o perfil, de forma que a sessão volta
+        sem novo QR Code. Retorna False se o disjuntor está aberto."""
+        disjuntor = self.vigia.disjuntor
+        if not disjuntor.pode_tentar():
+            _LOGGER.warning(
+                f"Reinício do navegador ({motivo}) adiado: disjuntor aberto por mais "
+                f"{disjuntor.espera_restante():.0f}s"
+            )
+            return False
+        
+        espera = self.vigia.registrar_reinicio(motivo)
+        _LOGGER.warning(
+            f"Reiniciando o navegador (motivo: {motivo}); um novo reinício só será "
+            f"permitido após {espera}s sem um ciclo saudável"
+        )
+        self._encerrar_driver()
+        
+        # Com um driver reserva pronto, o login recomeça sem esperar o Chrome iniciar
+        promovido = self.reserva.promover() if self.reserva is not None else None
+        if promovido:
+            # O perfil promovido só é gravado quando a sessão voltar nele
+            self.driver, perfil = promovido
+            self._perfil_anterior = self.perfil_ativo
+            self.perfil_ativo = perfil
+            _LOGGER.info(f"Driver reserva promovido (perfil {os.path.basename(perfil)})")
+        
+        self.digesto_lista = None
+        self._eventos_pendentes = []
+        self._mudar_estado_login(ESTADO_DESCONECTADO)
+        self._disparar_evento(f"{DOMAIN}_browser_restarted", {
+            "motivo": motivo,
+            "reinicios": self.vigia.reinicios,
+            "reserva_promovida": bool(promovido),
+            "timestamp": time.time()
+        })
+        return True
+    
+    def encerrar(self):
+        """Sinaliza que esperas longas (conexão, QR Code) devem ser interrompidas."""
+        self._encerrando = True
+    
+    def capture_qr_code(self, canvas_base64=None):
+        """Captura o QR Code e o mantém em memória.
+        
+        `canvas_base64` é a imagem já lida pela espera do QR Code; se omitida,
+        o canvas é lido da página. O evento e a notificação só são enviados
+        quando o conteúdo do QR Code muda.
+        """
+        try:
+            if canvas_base64 is None:
+                qr_code_element = self.driver.find_element(By.XPATH, '//canvas[contains(@aria-label, "Scan me!") or contains(@aria-label, "Escanear")]')
+                
+                # Capturar o QR Code como imagem
+                canvas_base64 = self.driver.execute_script("return arguments[0].toDataURL('image/png').substring(22);", qr_code_element)
             canvas_png = base64.b64decode(canvas_base64)
             
-            # Criar diretório www se não existir
-            www_dir = "/config/www"
-            if not os.path.exists(www_dir):
-                os.makedirs(www_dir)
-            
-            # Salvar a imagem
-            qr_code_path = "/config/www/whatsapp_qrcode.png"
-            with open(qr_code_path, "wb") as f:
-                f.write(canvas_png)
-            
-            # Criar arquivo HTML para exibir o QR Code
-            html_path = "/config/www/whatsapp_qrcode.html"
-            with open(html_path, "w") as f:
-                f.write("""<!DOCTYPE html>
-<html>
-<head>
-    <title>WhatsApp QR Code</title>
-    <meta http-equiv="refresh" content="10">
-    <style>
-        body {
-            font-family: sans-serif;
-            text-align: center;
-            margin: 20px;
-            background-color: #f0f0f0;
-        }
-        .container {
-            max-width: 600px;
-            margin: 0 auto;
-            background-color: white;
-            padding: 20px;
-            border-radius: 10px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1) ;
-        }
-        img {
-            max-width: 100%;
-            height: auto;
-            border: 1px solid #ddd;
-        }
-        h1 {
-            color: #128C7E;
-        }
-        .instructions {
-            margin: 20px 0;
-            text-align: left;
-            padding: 15px;
-            background-color: #f8f8f8;
-            border-left: 4px solid #128C7E;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>WhatsApp QR Code</h1>
-        <div class="qrcode">
-            <img src="/local/whatsapp_qrcode.png" alt="WhatsApp QR Code">
-        </div>
-        <div class="instructions">
-            <h3>Instruções:</h3>
-            <ol>
-                <li>Abra o WhatsApp no seu smartphone</li>
-                <li>Toque em Menu (três pontos) > WhatsApp Web</li>
-                <li>Escaneie o QR Code acima</li>
-                <li>Esta página será atualizada automaticamente a cada 10 segundos</li>
-            </ol>
-        </div>
-        <p>Após escanear o QR Code com sucesso, você pode fechar esta página.</p>
-    </div>
-</body>
-</html>""")
+            # Ignorar o QR Code se não mudou desde a última captura
+            qr_hash = hashlib.blake2b(canvas_png, digest_size=16).hexdigest()
+            if qr_hash == self.qr_hash:
+                return True
             
-            # Registrar evento no Home Assistant
-            if hasattr(self, 'hass') and self.hass:
-                self.hass.bus.fire(f"{DOMAIN}_qrcode_generated", {
-                    "qrcode_url": "/local/whatsapp_qrcode.png",
-                    "html_page": "/local/whatsapp_qrcode.html",
-                    "timestamp": time.time()
-                })
-                
-                # Criar notificação persistente
-                self.hass.services.call(
-                    "persistent_notification",
-                    "create",
-                    {
-                        "title": "WhatsApp QR Code",
-                        "message": f"Escaneie o QR Code para conectar ao WhatsApp Web. [Abrir QR Code](/local/whatsapp_qrcode.html)",
-                        "notification_id": "whatsapp_qrcode"
-                    }
-                )
+            self.qr_png = canvas_png
+            self.qr_hash = qr_hash
+            self._publicar_qr(canvas_png, qr_hash)
             
-            _LOGGER.info(f"QR Code salvo em {qr_code_path}")
+            _LOGGER.info(f"Novo QR Code disponível ({qr_hash[:8]})")
             return True
         except Exception as e:
             _LOGGER.error(f"Erro ao capturar QR Code: {e}")
             return False
     
+    def _publicar_qr(self, png, qr_hash):
+        """Anuncia um novo QR Code no Home Assistant (evento e notificação)."""
+        if self.hass:
+            from .qrcode_view import async_publicar_qr
+            self.hass.add_job(async_publicar_qr, self.hass, qr_hash, self.conta)
+    
+    def _mudar_estado_login(self, estado):
+        """Registra a transição do login e notifica o Home Assistant."""
+        if estado == self.estado_login:
+            return
+        _LOGGER.info(f"Login no WhatsApp Web: {self.estado_login} -> {estado}")
+        self.estado_login = estado
+        self.estado_login_desde = time.time()
+        self.connected = estado == ESTADO_CONECTADO
+        if self.connected:
+            # O QR Code deixa de ser servido após a autenticação
+            self.qr_png = None
+            self.qr_hash = None
+            self._publicar_qr(None, None)
+        self._disparar_evento(f"{DOMAIN}_login_state", {
+            "estado": estado,
+            "timestamp": self.estado_login_desde
+        })
+    
+    def _concluir_login(self):
+        """Marca a sessão como conectada após a lista de conversas aparecer."""
+        # Aguardar as linhas da lista de conversas antes do primeiro ciclo
+        self.esperas.aguardar("lista_conversas", lista_renderizada, ESPERA_LISTA_CHATS)
+        self._mudar_estado_login(ESTADO_CONECTADO)
+        _LOGGER.info("Conectado ao WhatsApp Web com sucesso!")
+        
+        # A reserva promovida abriu a sessão: o perfil dela passa a ser o ativo
+        if self._perfil_anterior is not None:
+            self._perfil_anterior = None
+            self._definir_perfil_ativo(self.perfil_ativo)
+        
+        # Com a sessão estabelecida, preparar a reserva para a próxima falha
+        self._aquecer_reserva()
+    
+    def passo_login(self):
+        """Avança a máquina de estados do login em um passo curto.
+        
+        desconectado/sessao_encerrada -> carregando -> qr_exibido <-> escaneando
+        -> conectado. Cada passo espera no máximo ESPERA_PASSO_LOGIN segundos,
+        de forma que outros ciclos podem usar o navegador entre os passos.
+        Retorna o estado resultante.
+        """
+        estado = self.estado_login
+        if estado == ESTADO_CONECTADO:
+            return estado
+        
+        if estado in (ESTADO_DESCONECTADO, ESTADO_SESSAO_ENCERRADA):
+            if self.driver is None:
+                # Após falhas seguidas, respeitar a espera do disjuntor
+                if not self.vigia.disjuntor.pode_tentar():
+                    return estado
+                if not self._init_driver():
+                    self.vigia.registrar_reinicio(MOTIVO_FALHA_INICIO)
+                    return estado
+            _LOGGER.info("Conectando ao WhatsApp Web...")
+            self.driver.get("https://web.whatsapp.com/")
+            self._inicio_login = time.monotonic()
+            self._qr_atual = None
+            self._mudar_estado_login(ESTADO_CARREGANDO)
+            return self.estado_login
+        
+        decorrido = time.monotonic() - self._inicio_login
+        
+        if estado == ESTADO_CARREGANDO:
+            # Sessão salva abre direto na lista; caso contrário, aparece o QR Code
+            pagina = self.esperas.aguardar("pagina_inicial", pagina_pronta, ESPERA_PASSO_LOGIN)
+            if pagina == PAGINA_LISTA:
+                self._concluir_login()
+            elif pagina == PAGINA_QR and self._perfil_anterior is not None:
+                self._recuar_reserva()
+            elif pagina is not None:
+                self._mudar_estado_login(ESTADO_QR_EXIBIDO)
+            elif decorrido > ESPERA_PAGINA_INICIAL:
+                _LOGGER.error("Erro ao conectar ao WhatsApp Web: página não carregou")
+                self._mudar_estado_login(ESTADO_DESCONECTADO)
+            return self.estado_login
+        
+        # QR Code exibido ou lido pelo celular: aguardar um novo QR ou a lista
+        resultado = self.esperas.aguardar(
+            "passo_login", qr_alterado(self._qr_atual), ESPERA_PASSO_LOGIN, intervalo=0.5
+        )
+        if resultado and resultado[0] == PAGINA_LISTA:
+            self._concluir_login()
+        elif resultado:
+            self._qr_atual = resultado[1]
+            self.capture_qr_code(self._qr_atual)
+            self._mudar_estado_login(ESTADO_QR_EXIBIDO)
+        elif decorrido > ESPERA_AUTENTICACAO:
+            _LOGGER.error("Erro ao conectar ao WhatsApp Web: tempo de autenticação esgotado")
+            self._mudar_estado_login(ESTADO_DESCONECTADO)
+        elif self.driver is not None and pagina_pronta(self.driver) is False:
+            # QR Code sumiu e a lista ainda não apareceu: sincronizando após a leitura
+            self._mudar_estado_login(ESTADO_ESCANEANDO)
+        return self.estado_login
+    
     def connect(self):
-        """Conecta ao WhatsApp Web."""
+        """Avança um passo do login no WhatsApp Web; retorna True se conectado."""
         try:
             if self.connected:
                 return True
-            
-            _LOGGER.info("Conectando ao WhatsApp Web...")
-            self.driver.get("https://web.whatsapp.com/") 
-            
-            # Aguardar o QR Code carregar
-            _LOGGER.info("Aguardando QR Code...")
-            time.sleep(5)
-            
-            # Capturar e salvar o QR Code
-            self.capture_qr_code()
-            
-            # Adicionar um loop para atualizar o QR Code periodicamente
-            qr_update_count = 0
-            while not self.connected and qr_update_count < 12:  # Tentar por 2 minutos (12 x 10s)
-                time.sleep(10)
-                if self.capture_qr_code():
-                    qr_update_count += 1
-                else:
-                    break
-                
-                # Verificar se já está conectado
-                try:
-                    # Procurar por elemento que indica que está conectado
-                    self.driver.find_element(By.XPATH, '//div[@data-testid="chat-list"]')
-                    self.connected = True
-                    _LOGGER.info("Conectado ao WhatsApp Web com sucesso!")
-                    return True
-                except:
-                    pass
-            
-            # Aguardar a autenticação
-            try:
-                WebDriverWait(self.driver, 300).until(
-                    EC.presence_of_element_located((By.XPATH, '//div[@data-testid="chat-list"]'))
-                )
-                self.connected = True
-                _LOGGER.info("Conectado ao WhatsApp Web com sucesso!")
-                return True
-            except Exception as e:
-                _LOGGER.error(f"Erro ao conectar ao WhatsApp Web: {e}")
-                return False
+            self.passo_login()
+            return self.connected
         except Exception as e:
             _LOGGER.error(f"Erro ao conectar ao WhatsApp Web: {e}")
             return False
@@ -235,10 +503,10 @@ class WhatsAppMonitor:
     def disconnect(self):
         """Desconecta do WhatsApp Web."""
         try:
-            if self.driver:
-                self.driver.quit()
-            self.driver = None
-            self.connected = False
+            if self.reserva is not None:
+                self.reserva.descartar()
+            self._encerrar_driver()
+            self._mudar_estado_login(ESTADO_DESCONECTADO)
             _LOGGER.info("Desconectado do WhatsApp Web")
             return True
         except Exception as e:
@@ -247,7 +515,25 @@ class WhatsAppMonitor:
     
     def check_messages(self):
         """Verifica novas mensagens no WhatsApp."""
+        # Estatísticas do ciclo, usadas pelo agendamento adaptativo; zeradas
+        # antes de qualquer retorno para não repetir as do ciclo anterior
+        estatisticas = {
+            'chats_nao_lidos': 0,
+            'mensagens_importantes': 0,
+            'mensagens_repetidas': 0,
+            'cliques_evitados': 0,
+            'chats_inalterados': 0,
+            'lista_inalterada': False,
+            'chats_adiados': 0,
+            'verificado': False,
+        }
+        self.estatisticas_ciclo = estatisticas
+        
         try:
+            # Reciclar o navegador se a memória passou do limite ou o driver parou de responder
+            if not self.verificar_navegador():
+                return []
+            
             if not self.connected:
                 if not self.connect():
                     return []
@@ -256,93 +542,372 @@ class WhatsAppMonitor:
             
             # Atualizar timestamp da última verificação
             self.last_check_time = datetime.datetime.now()
+            estatisticas['verificado'] = True
             
-            # Obter conversas
-            chats = self.driver.find_elements(By.XPATH, '//div[@data-testid="chat-list"]//div[@role="row"]')
+            # Usar o mesmo identificador durante todo o ciclo
+            matcher = self._obter_matcher()
+            
+            # No modo observador, só varrer quando a página registrou mudanças
+            contatos_alterados = None
+            if self._modo_observador():
+                contatos_alterados = self._contatos_alterados()
+                if contatos_alterados is not None and not contatos_alterados and not self.chats_pendentes:
+                    _LOGGER.debug("Nenhuma mudança na lista de conversas; verificação ignorada")
+                    return []
+            
+            # Obter conversas; None indica que a lista não mudou desde a última
+            # varredura completa (com conversas adiadas, a varredura é parcial)
+            chats, digesto_lista = self._listar_chats()
+            if chats is None:
+                estatisticas['lista_inalterada'] = True
+                _LOGGER.debug("Lista de conversas inalterada; verificação ignorada")
+                return []
+            if not chats and pagina_pronta(self.driver) == PAGINA_QR:
+                # A sessão foi encerrada pelo celular: o login recomeça pelo QR Code
+                _LOGGER.warning("Sessão do WhatsApp Web encerrada; novo QR Code necessário")
+                self._mudar_estado_login(ESTADO_SESSAO_ENCERRADA)
+                self.digesto_lista = None
+                estatisticas['verificado'] = False
+                return []
+            if contatos_alterados:
+                chats = [
+                    chat for chat in chats
+                    if chat['contato'] in contatos_alterados or chat['contato'] in self.chats_pendentes
+                ]
+            
+            # Selecionar conversas não lidas cuja linha mudou desde o último ciclo
+            candidatos = []
+            for chat in chats:
+                if not chat['nao_lidas']:
+                    continue
+                digesto = chat.get('digesto')
+                if digesto and self.digestos_chats.get(chat['contato']) == digesto:
+                    estatisticas['chats_inalterados'] += 1
+                    continue
+                candidatos.append(chat)
+            estatisticas['chats_nao_lidos'] = len(candidatos)
+            
+            # Visitar primeiro os contatos importantes e as conversas mais movimentadas
+            candidatos.sort(key=lambda chat: self._prioridade_chat(chat, matcher))
+            orcamento = self.config.get('orcamento_ciclo', ORCAMENTO_CICLO)
+            inicio_ciclo = time.monotonic()
             
             # Verificar novas mensagens
             new_important_messages = []
-            for chat in chats:
+            vistas = []
+            marcas_alteradas = False
+            chat_aberto = False
+            digestos_processados = {}
+            pendentes = set()
+            houve_erro = False
+            for chat in candidatos:
+                contato = chat['contato']
+                digesto = chat.get('digesto')
+                
                 try:
-                    # Verificar se há mensagens não lidas
-                    unread_badge = chat.find_elements(By.XPATH, './/span[@data-testid="icon-unread"]')
-                    if not unread_badge:
+                    # Classificar pela prévia quando ela cobre as mensagens não lidas
+                    if self._previa_suficiente(chat, matcher):
+                        mensagens = [{'texto': chat['previa'], 'hora': chat['hora'], 'chave': None}]
+                        estatisticas['cliques_evitados'] += 1
+                    elif orcamento and time.monotonic() - inicio_ciclo >= orcamento:
+                        # Orçamento esgotado: abrir a conversa no próximo ciclo
+                        pendentes.add(contato)
+                        estatisticas['chats_adiados'] += 1
                         continue
+                    else:
+                        mensagens = self._ler_mensagens(chat)
+                        chat_aberto = True
+                        if mensagens:
+                            self.marcas_chats[contato] = mensagens[-1]['chave']
+                            marcas_alteradas = True
                     
-                    # Obter informações do contato
-                    contato = chat.find_element(By.XPATH, './/span[@data-testid="default-user"]').text
-                    
-                    # Clicar no chat para ver as mensagens
-                    chat.click()
-                    time.sleep(1)
-                    
-                    # Obter mensagens
-                    messages = self.driver.find_elements(By.XPATH, '//div[@data-testid="msg-container"]')
+                    # Ignorar mensagens já processadas em ciclos anteriores
+                    impressoes = impressoes_mensagens(contato, mensagens)
+                    novas = self.indice_vistas.filtrar_novas(impressoes)
+                    estatisticas['mensagens_repetidas'] += len(mensagens) - len(novas)
                     
                     # Processar mensagens
-                    for msg in messages[-5:]:  # Verificar apenas as 5 últimas mensagens
-                        try:
-                            # Obter texto da mensagem
-                            texto = msg.find_element(By.XPATH, './/span[@data-testid="msg-text"]').text
-                            
-                            # Obter hora da mensagem
-                            hora = msg.find_element(By.XPATH, './/div[@data-testid="msg-meta"]').text
-                            
-                            # Verificar se é uma mensagem importante
-                            if self._is_important_message(contato, texto):
-                                mensagem = {
-                                    'contato': contato,
-                                    'mensagem': texto,
-                                    'hora': hora,
-                                    'importante': True
-                                }
-                                new_important_messages.append(mensagem)
-                                self.important_messages.append(mensagem)
-                        except:
+                    for msg, impressao in zip(mensagens, impressoes):
+                        if impressao not in novas:
                             continue
+                        vistas.append(impressao)
+                        
+                        # Verificar se é uma mensagem importante
+                        correspondencia = matcher.match(contato, msg['texto'])
+                        if correspondencia:
+                            mensagem = {
+                                'contato': contato,
+                                'mensagem': msg['texto'],
+                                'hora': msg['hora'],
+                                'importante': True,
+                                'categoria': correspondencia[0],
+                                'padrao': correspondencia[1]
+                            }
+                            new_important_messages.append(mensagem)
+                            self.important_messages.adicionar(mensagem)
+                    
+                    digestos_processados[contato] = digesto
                 except Exception as e:
                     _LOGGER.error(f"Erro ao processar chat: {e}")
+                    houve_erro = True
                     continue
             
             # Voltar para a lista de chats
-            self.driver.find_element(By.XPATH, '//button[@data-testid="back"]').click()
+            if chat_aberto:
+                self._voltar_lista()
+            
+            # Registrar as mensagens processadas em uma única gravação
+            self.indice_vistas.marcar(vistas)
+            if marcas_alteradas:
+                self._salvar_marcas()
+            
+            # Guardar os digestos; após um erro ou uma varredura parcial, a
+            # próxima varredura é completa
+            self.digestos_chats.update(digestos_processados)
+            self.chats_pendentes = pendentes
+            parcial = houve_erro or contatos_alterados or pendentes
+            self.digesto_lista = None if parcial else digesto_lista
+            if pendentes:
+                _LOGGER.info(f"Orçamento do ciclo esgotado; {len(pendentes)} conversas adiadas para o próximo ciclo")
             
-            _LOGGER.info(f"Verificação concluída. {len(new_important_messages)} novas mensagens importantes encontradas.")
+            estatisticas['mensagens_importantes'] = len(new_important_messages)
+            _LOGGER.info(f"Verificação concluída. {len(new_important_messages)} novas mensagens importantes encontradas "
+                         f"({estatisticas['cliques_evitados']} conversas classificadas pela prévia).")
             return new_important_messages
         except Exception as e:
             _LOGGER.error(f"Erro ao verificar mensagens: {e}")
+            estatisticas['verificado'] = False
             return []
     
-    def _is_important_message(self, contato, mensagem):
-        """Verifica se uma mensagem é importante."""
-        # Verificar por contato
-        contatos_importantes = self.config.get('contatos_importantes', [])
-        if contato in contatos_importantes:
+    def _modo_observador(self):
+        """Indica se a detecção usa o observador de mudanças na página."""
+        return self.config.get('modo_deteccao', MODO_DETECCAO_POLLING) == MODO_DETECCAO_OBSERVADOR
+    
+    def _instalar_observador(self):
+        """Instala o observador de mudanças na lista de conversas."""
+        instalado = self.driver.execute_script(SCRIPT_INSTALAR_OBSERVADOR, LIMITE_EVENTOS_PAGINA)
+        if instalado:
+            _LOGGER.debug("Observador da lista de conversas instalado")
+        return bool(instalado)
+    
+    def _contatos_alterados(self):
+        """Retorna os contatos com eventos pendentes, ou None se o observador
+        acabou de ser instalado e uma varredura completa é necessária."""
+        eventos = self.driver.execute_script(SCRIPT_DRENAR_EVENTOS)
+        if eventos is None:
+            self._instalar_observador()
+            self._eventos_pendentes = []
+            return None
+        
+        eventos = self._eventos_pendentes + eventos
+        self._eventos_pendentes = []
+        return {evento['c'] for evento in eventos}
+    
+    def aguardar_eventos(self, timeout=30):
+        """Aguarda mudanças na lista de conversas por até timeout segundos.
+
+        Retorna True se há eventos pendentes para a próxima verificação.
+        """
+        if not self.connected or not self._modo_observador():
+            return False
+        
+        espera = int(min(timeout, TEMPO_LIMITE_SCRIPT - 5) * 1000)
+        eventos = self.driver.execute_async_script(SCRIPT_AGUARDAR_EVENTOS, espera)
+        if eventos is None:
+            # Observador ausente (página recarregada): reinstalar e forçar varredura
+            self._instalar_observador()
             return True
         
-        # Verificar por palavras-chave
-        palavras_chave = self.config.get('palavras_chave', [
-            'urgente', 'importante', 'atenção', 'prioridade', 'crítico',
-            'emergência', 'ajuda', 'socorro', 'imediato', 'prazo'
-        ])
+        self._eventos_pendentes.extend(eventos)
+        return bool(self._eventos_pendentes)
+    
+    def _modo_snapshot(self):
+        """Indica se a extração usa um único script por leitura."""
+        return self.config.get('modo_extracao', MODO_EXTRACAO_SNAPSHOT) == MODO_EXTRACAO_SNAPSHOT
+    
+    def _detectar_alteracoes(self):
+        """Indica se a varredura compara digestos das linhas da lista de conversas."""
+        return self.config.get('detectar_alteracoes', True)
+    
+    def _listar_chats(self):
+        """Retorna (conversas, digesto da lista).
+        
+        Cada conversa traz contato, número de mensagens não lidas, prévia e o
+        digesto da linha. Se a lista não mudou desde a última varredura
+        completa, retorna (None, digesto) sem transferir as linhas.
+        """
+        detectar = self._detectar_alteracoes()
+        anterior = self.digesto_lista if detectar else None
         
-        mensagem_lower = mensagem.lower()
-        for palavra in palavras_chave:
-            if palavra.lower() in mensagem_lower:
-                return True
+        if self._modo_snapshot():
+            resultado = self.driver.execute_script(SCRIPT_LISTA_CHATS, anterior) or {}
+            if resultado.get('s') is None and anterior:
+                return None, resultado.get('d')
+            chats = [
+                {
+                    'indice': chat['i'],
+                    'contato': chat['c'],
+                    'nao_lidas': chat['n'],
+                    'previa': chat.get('p'),
+                    'hora': chat.get('h', ''),
+                    'digesto': chat.get('d') if detectar else None,
+                }
+                for chat in resultado.get('s') or []
+                if chat.get('c') is not None
+            ]
+            return chats, resultado.get('d')
         
-        # Verificar por padrões de urgência
-        padroes_urgencia = [
-            'preciso agora', 'preciso hoje', 'preciso urgente',
-            'me ajuda', 'socorro', 'emergência', 'urgente',
-            'não pode esperar', 'imediatamente'
-        ]
+        chats = []
+        elementos = self.driver.find_elements(By.XPATH, '//div[@data-testid="chat-list"]//div[@role="row"]')
+        for indice, elemento in enumerate(elementos):
+            unread_badge = elemento.find_elements(By.XPATH, './/span[@data-testid="icon-unread"]')
+            chat = {
+                'indice': indice,
+                'contato': None,
+                'nao_lidas': contar_nao_lidas(unread_badge[0].text) if unread_badge else 0,
+                'previa': None,
+                'hora': '',
+                'elemento': elemento,
+            }
+            if unread_badge:
+                chat['contato'] = elemento.find_element(By.XPATH, './/span[@data-testid="default-user"]').text
+                previa = elemento.find_elements(By.XPATH, './/div[@data-testid="cell-frame-secondary"]//span[@title]')
+                if previa:
+                    chat['previa'] = previa[0].get_attribute('title') or previa[0].text
+                hora = elemento.find_elements(By.XPATH, './/div[@data-testid="cell-frame-primary-detail"]')
+                if hora:
+                    chat['hora'] = hora[0].text
+            chat['digesto'] = self._digesto_linha(chat)
+            chats.append(chat)
         
-        for padrao in padroes_urgencia:
-            if padrao in mensagem_lower:
-                return True
+        digesto_lista = hashlib.blake2b(
+            ",".join(chat['digesto'] for chat in chats).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        if anterior and anterior == digesto_lista:
+            return None, digesto_lista
+        if not detectar:
+            for chat in chats:
+                chat['digesto'] = None
+        return chats, digesto_lista
+    
+    @staticmethod
+    def _digesto_linha(chat):
+        """Calcula o digesto de uma linha da lista de conversas."""
+        partes = (chat['contato'], chat['nao_lidas'], chat['previa'], chat['hora'])
+        return hashlib.blake2b(
+            "\x1f".join(str(parte) for parte in partes).encode("utf-8"), digest_size=8
+        ).hexdigest()
+    
+    def _prioridade_chat(self, chat, matcher):
+        """Chave de ordenação: contatos importantes, conversas adiadas, mais
+        mensagens não lidas e, por fim, as mais recentes (topo da lista)."""
+        return (
+            chat['contato'] not in matcher.contatos_importantes,
+            chat['contato'] not in self.chats_pendentes,
+            -chat['nao_lidas'],
+            chat['indice'],
+        )
+    
+    def _previa_suficiente(self, chat, matcher):
+        """Indica se a prévia da lista basta para classificar a conversa.
         
-        return False
+        A conversa só é aberta quando há mais mensagens não lidas do que a
+        prévia mostra ou quando o contato é importante, caso em que todas as
+        mensagens novas são registradas.
+        """
+        if not self.config.get('usar_previa', True) or not chat.get('previa'):
+            return False
+        if chat['nao_lidas'] > MENSAGENS_NA_PREVIA:
+            return False
+        return chat['contato'] not in matcher.contatos_importantes
+    
+    def _ler_mensagens(self, chat):
+        """Abre a conversa e retorna as mensagens posteriores à última processada.
+        
+        Retorna [{'texto', 'hora', 'chave'}] em ordem cronológica. Sem marca
+        (primeira leitura da conversa), lê as últimas `mensagens_por_chat`;
+        com marca, volta até ela, limitado a `max_mensagens_por_chat`.
+        """
+        marca = self.marcas_chats.get(chat['contato'])
+        if marca:
+            limite = self.config.get('max_mensagens_por_chat', MAX_MENSAGENS_POR_CHAT)
+        else:
+            limite = self.config.get('mensagens_por_chat', MENSAGENS_POR_CHAT)
+        
+        if self._modo_snapshot():
+            # A espera pela renderização ocorre na própria página
+            inicio = time.monotonic()
+            mensagens = self.driver.execute_async_script(
+                SCRIPT_ABRIR_CHAT, chat['contato'], chat['indice'], limite,
+                ESPERA_ABRIR_CHAT_MS, marca, MAX_ROLAGENS_CHAT
+            )
+            self.esperas.registrar("painel_conversa", time.monotonic() - inicio)
+            if mensagens is None:
+                raise RuntimeError(f"Conversa não encontrada: {chat['contato']}")
+            return [{'texto': msg['t'], 'hora': msg['h'], 'chave': msg['k']} for msg in mensagens]
+        
+        # Clicar no chat e aguardar a troca do painel de mensagens
+        anteriores = self.driver.find_elements(By.XPATH, '//div[@data-testid="msg-container"]')
+        chat['elemento'].click()
+        self.esperas.aguardar(
+            "painel_conversa",
+            conversa_carregada(anteriores[-1] if anteriores else None),
+            ESPERA_ABRIR_CHAT_MS / 1000
+        )
+        
+        mensagens = []
+        for msg in reversed(self.driver.find_elements(By.XPATH, '//div[@data-testid="msg-container"]')):
+            if len(mensagens) >= limite:
+                break
+            try:
+                texto = msg.find_element(By.XPATH, './/span[@data-testid="msg-text"]').text
+                hora = msg.find_element(By.XPATH, './/div[@data-testid="msg-meta"]').text
+            except:
+                continue
+            com_id = msg.find_elements(By.XPATH, './ancestor-or-self::*[@data-id][1]')
+            chave = com_id[0].get_attribute('data-id') if com_id else f"{hora}\x1f{texto}"
+            if marca and chave == marca:
+                break
+            mensagens.append({'texto': texto, 'hora': hora, 'chave': chave})
+        mensagens.reverse()
+        return mensagens
+    
+    def _voltar_lista(self):
+        """Volta para a lista de conversas."""
+        if self._modo_snapshot():
+            self.driver.execute_script(SCRIPT_VOLTAR)
+        else:
+            self.driver.find_element(By.XPATH, '//button[@data-testid="back"]').click()
+    
+    def set_matcher(self, matcher, config=None, versao=None):
+        """Substitui atomicamente o identificador de mensagens importantes."""
+        if versao is not None and versao <= self.matcher_version:
+            _LOGGER.debug(f"Identificador versão {versao} ignorado (atual: {self.matcher_version})")
+            return False
+        
+        if config is not None:
+            self.config = config
+        self._matcher = matcher
+        self.matcher_version = versao if versao is not None else self.matcher_version + 1
+        _LOGGER.info(f"Identificador de mensagens atualizado para versão {self.matcher_version} "
+                     f"({matcher.num_padroes} padrões)")
+        return True
+    
+    def _obter_matcher(self):
+        """Retorna o identificador atual, compilando-o se necessário."""
+        matcher = self._matcher
+        if matcher is None:
+            matcher = KeywordMatcher.from_config(self.config)
+            self._matcher = matcher
+        return matcher
+    
+    def _is_important_message(self, contato, mensagem):
+        """Verifica se uma mensagem é importante."""
+        return self._classificar(contato, mensagem) is not None
+    
+    def _classificar(self, contato, mensagem):
+        """Retorna (tipo, padrão) que tornou a mensagem importante ou None."""
+        return self._obter_matcher().match(contato, mensagem)
     
     def generate_summary(self):
         """Gera um resumo das mensagens importantes."""
@@ -359,26 +924,25 @@ class WhatsAppMonitor:
             
             # Limitar número de mensagens no resumo
             max_mensagens = self.config.get('max_mensagens_resumo', 10)
-            mensagens_resumo = self.important_messages[-max_mensagens:] if len(self.important_messages) > max_mensagens else self.important_messages
+            mensagens_resumo = self.important_messages.recentes(max_mensagens)
             
             # Gerar conteúdo do resumo
             conteudo = "=== RESUMO DE MENSAGENS IMPORTANTES DO WHATSAPP ===\n\n"
             conteudo += f"Data e hora: {datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n"
-            conteudo += f"Total de mensagens importantes: {len(self.important_messages)}\n\n"
+            conteudo += f"Total de mensagens importantes: {self.important_messages.total}\n\n"
             
             # Agrupar mensagens por contato
             mensagens_por_contato = {}
             for msg in mensagens_resumo:
-                contato = msg.get('contato', 'Desconhecido')
-                if contato not in mensagens_por_contato:
-                    mensagens_por_contato[contato] = []
-                mensagens_por_contato[contato].append(msg)
+                if msg.contato not in mensagens_por_contato:
+                    mensagens_por_contato[msg.contato] = []
+                mensagens_por_contato[msg.contato].append(msg)
             
             # Adicionar mensagens ao resumo
             for contato, mensagens in mensagens_por_contato.items():
                 conteudo += f"=== Mensagens de {contato} ===\n"
                 for msg in mensagens:
-                    conteudo += f"[{msg.get('hora', '')}] {msg.get('mensagem', '')}\n"
+                    conteudo += f"[{msg.hora}] {msg.mensagem}\n"
                 conteudo += "\n"
             
             # Salvar resumo
@@ -398,37 +962,49 @@ class WhatsAppMonitor:
 
 # Funções de serviço para Home Assistant
 
-def init_monitor(hass):
-    """Inicializa o monitor do WhatsApp."""
+def init_monitor(hass, dados):
+    """Inicializa o monitor do WhatsApp de uma conta."""
     try:
-        config_dir = hass.config.path("custom_components", DOMAIN)
+        # Cada conta tem o seu diretório (perfil do Chrome, resumos e banco)
+        config_dir = dados["diretorio"]
         
         # Obter configuração
-        config = hass.data[DOMAIN].get("config", {})
+        config = dados.get("config", {})
         
         # Criar instância do monitor
         monitor = WhatsAppMonitor(config_dir, config)
         monitor.hass = hass
-        hass.data[DOMAIN]["monitor"] = monitor
+        monitor.definir_storage(dados.get("storage"))
+        dados["monitor"] = monitor
         
-        _LOGGER.info("Monitor do WhatsApp inicializado com sucesso")
+        _LOGGER.info(f"Monitor do WhatsApp inicializado com sucesso ({dados.get('nome')})")
         return True
     except Exception as e:
         _LOGGER.error(f"Erro ao inicializar monitor do WhatsApp: {e}")
         return False
 
-def check_messages_service(hass):
-    """Serviço para verificar mensagens do WhatsApp."""
-    monitor = hass.data[DOMAIN].get("monitor")
+def check_messages_service(hass, dados):
+    """Serviço para verificar mensagens do WhatsApp de uma conta."""
+    monitor = dados.get("monitor")
     if not monitor:
         _LOGGER.error("Monitor do WhatsApp não inicializado")
         return False
     
     new_messages = monitor.check_messages()
     
+    # Persistir as mensagens do ciclo em uma única transação
+    storage = dados.get("storage")
+    if storage and new_messages:
+        if storage.fila_escrita:
+            for mensagem in new_messages:
+                storage.fila_escrita.enfileirar(mensagem)
+        else:
+            storage.salvar_mensagens(new_messages)
+    
     if new_messages:
         # Disparar evento para notificar sobre novas mensagens importantes
         hass.bus.fire(f"{DOMAIN}_new_important_messages", {
+            "conta": dados.get("conta"),
             "messages": new_messages,
             "count": len(new_messages),
             "timestamp": datetime.datetime.now().isoformat()
@@ -436,9 +1012,22 @@ def check_messages_service(hass):
     
     return True
 
-def generate_summary_service(hass):
-    """Serviço para gerar resumo de mensagens do WhatsApp."""
-    monitor = hass.data[DOMAIN].get("monitor")
+def wait_events_service(hass, dados, timeout=30):
+    """Aguarda mudanças na página; retorna True se há conversas a verificar."""
+    monitor = dados.get("monitor")
+    if not monitor:
+        _LOGGER.error("Monitor do WhatsApp não inicializado")
+        return False
+    
+    try:
+        return monitor.aguardar_eventos(timeout)
+    except Exception as e:
+        _LOGGER.error(f"Erro ao aguardar eventos do WhatsApp: {e}")
+        return False
+
+def generate_summary_service(hass, dados):
+    """Serviço para gerar resumo de mensagens do WhatsApp de uma conta."""
+    monitor = dados.get("monitor")
     if not monitor:
         _LOGGER.error("Monitor do WhatsApp não inicializado")
         return False
@@ -448,6 +1037,7 @@ def generate_summary_service(hass):
     if summary:
         # Disparar evento para notificar sobre novo resumo
         hass.bus.fire(f"{DOMAIN}_new_summary", {
+            "conta": dados.get("conta"),
             "summary_file": summary['resumo_file'],
             "num_messages": summary['num_mensagens'],
             "timestamp": datetime.datetime.now().isoformat()
@@ -455,18 +1045,18 @@ def generate_summary_service(hass):
     
     return True
 
-def connect_service(hass):
-    """Serviço para conectar ao WhatsApp Web."""
-    monitor = hass.data[DOMAIN].get("monitor")
+def connect_service(hass, dados):
+    """Serviço para conectar a conta ao WhatsApp Web."""
+    monitor = dados.get("monitor")
     if not monitor:
         _LOGGER.error("Monitor do WhatsApp não inicializado")
         return False
     
     return monitor.connect()
 
-def disconnect_service(hass):
-    """Serviço para desconectar do WhatsApp Web."""
-    monitor = hass.data[DOMAIN].get("monitor")
+def disconnect_service(hass, dados):
+    """Serviço para desconectar a conta do WhatsApp Web."""
+    monitor = dados.get("monitor")
     if not monitor:
         _LOGGER.error("Monitor do WhatsApp não inicializado")
         return False
@@ -0,0 +1,433 @@
+"""
+WhatsApp Monitor - Processo separado para o navegador para Home Assistant
+Desenvolvido para Raspberry Pi 4 com Home Assistant
+
+O monitor (Selenium e Chrome) roda em um processo filho supervisionado.
+O Home Assistant conversa com ele por um Pipe local, com mensagens em tuplas
+compactas:
+
+    pai -> filho:  (id, comando, args)
+    filho -> pai:  ("resposta", id, sucesso, resultado, estado)
+                   ("evento", nome, dados)
+                   ("notificacao", titulo, mensagem, notification_id)
+                   ("qrcode", png, hash)
+                   ("log", nivel, mensagem)
+
+Um travamento do Chrome ou do driver derruba apenas o processo filho, que é
+reiniciado automaticamente na próxima chamada, com espera exponencial.
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+import itertools
+import multiprocessing
+
+_LOGGER = logging.getLogger(__name__)
+
+# Constantes
+DOMAIN = "whatsapp_monitor"
+TEMPO_LIMITE_COMANDO = 600
+TEMPO_LIMITE_PARADA = 10
+ESPERA_MAXIMA_REINICIO = 60
+
+# Comandos aceitos pelo processo filho
+COMANDOS = (
+    "check_messages",
+    "generate_summary",
+    "connect",
+    "disconnect",
+    "aguardar_eventos",
+)
+
+
+class _LogParaPipe(logging.Handler):
+    """Encaminha registros de log do processo filho para o Home Assistant."""
+
+    def __init__(self, enviar):
+        super().__init__(logging.WARNING)
+        self._enviar = enviar
+
+    def emit(self, record):
+        try:
+            self._enviar(("log", record.levelno, f"[worker] {record.getMessage()}"))
+        except Exception:
+            pass
+
+
+def criar_monitor(config_dir, config):
+    """Fábrica padrão: cria o monitor real dentro do processo filho."""
+    from .whatsapp_monitor_core import WhatsAppMonitor
+    from .storage import WhatsAppMonitorStorage
+    monitor = WhatsAppMonitor(config_dir, config)
+    # Conexão própria com o banco para o índice de mensagens vistas e as marcas;
+    # o pai grava no mesmo arquivo, e as duas pilhas de escrita se alternam pelo
+    # lock do SQLite (BEGIN IMMEDIATE com busy_timeout e novas tentativas)
+    monitor.definir_storage(WhatsAppMonitorStorage(config_dir))
+    return monitor
+
+
+def _estado_monitor(monitor):
+    """Resumo do estado do monitor enviado junto com cada resposta."""
+    ultima = getattr(monitor, "last_check_time", None)
+    return {
+        "connected": getattr(monitor, "connected", False),
+        "estado_login": getattr(monitor, "estado_login", None),
+        "estado_login_desde": getattr(monitor, "estado_login_desde", None),
+        "last_check_time": ultima.isoformat() if ultima else None,
+        "matcher_version": getattr(monitor, "matcher_version", 0),
+        "estatisticas_ciclo": getattr(monitor, "estatisticas_ciclo", {}),
+        "uso_buffer": getattr(monitor, "uso_buffer", None),
+        "tempos_espera": getattr(monitor, "tempos_espera", {}),
+        "memoria_navegador": getattr(monitor, "memoria_navegador", None),
+        "estado_vigia": getattr(monitor, "estado_vigia", None),
+        "estado_reserva": getattr(monitor, "estado_reserva", None),
+    }
+
+
+def _executar_worker(conn, fabrica, config_dir, config):
+    """Laço principal do processo filho."""
+    # Grupo de processos próprio: o supervisor pode encerrar também o Chrome
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    # Logs de qualquer thread (ex.: aquecimento da reserva), eventos e respostas
+    # compartilham a conexão; envios simultâneos misturariam os quadros do pickle
+    lock_envio = threading.Lock()
+
+    def enviar(mensagem):
+        with lock_envio:
+            conn.send(mensagem)
+
+    logging.getLogger().addHandler(_LogParaPipe(enviar))
+
+    monitor = fabrica(config_dir, config)
+
+    # Eventos e notificações do monitor são repassados ao Home Assistant
+    monitor.hass = None
+    monitor._disparar_evento = lambda evento, dados: enviar(("evento", evento, dados))
+    monitor._notificar = lambda titulo, mensagem, notification_id: enviar(
+        ("notificacao", titulo, mensagem, notification_id)
+    )
+    monitor._publicar_qr = lambda png, qr_hash: enviar(("qrcode", png, qr_hash))
+
+    while True:
+        try:
+            id_comando, comando, args = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if comando == "parar":
+            monitor.disconnect()
+            storage = getattr(monitor, "storage", None)
+            if storage is not None:
+                storage.fechar()
+            enviar(("resposta", id_comando, True, None, _estado_monitor(monitor)))
+            break
+
+        try:
+            if comando == "set_config":
+                from .keywords import KeywordMatcher
+                config, versao = args
+                resultado = monitor.set_matcher(KeywordMatcher.from_config(config), config, versao)
+            elif comando in COMANDOS:
+                resultado = getattr(monitor, comando)(*args)
+            else:
+                raise ValueError(f"Comando desconhecido: {comando}")
+            enviar(("resposta", id_comando, True, resultado, _estado_monitor(monitor)))
+        except Exception as e:
+            enviar(("resposta", id_comando, False, str(e), _estado_monitor(monitor)))
+
+    conn.close()
+
+
+class WhatsAppMonitorWorker:
+    """Supervisiona o processo filho que executa o monitor.
+
+    Os métodos são bloqueantes e devem ser chamados a partir de um executor.
+    `fabrica` é uma função de nível de módulo (config_dir, config) -> monitor,
+    o que permite usar um monitor simulado sem Chrome.
+    """
+
+    def __init__(self, config_dir, config, fabrica=criar_monitor, ao_evento=None, ao_notificar=None,
+                 ao_qrcode=None):
+        """Inicializa o supervisor sem iniciar o processo."""
+        self.config_dir = config_dir
+        self.config = config
+        self.fabrica = fabrica
+        self.ao_evento = ao_evento
+        self.ao_notificar = ao_notificar
+        self.ao_qrcode = ao_qrcode
+        self.estado = {}
+        self.reinicios = 0
+        self._contexto = multiprocessing.get_context("spawn")
+        self._processo = None
+        self._conn = None
+        self._ids = itertools.count(1)
+        self._lock_envio = threading.Lock()
+        self._lock_chamada = threading.Lock()
+        self._proximo_inicio = 0
+        self._parado = False
+
+    @property
+    def ativo(self):
+        """Indica se o processo filho está em execução."""
+        return self._processo is not None and self._processo.is_alive()
+
+    def iniciar(self):
+        """Inicia o processo filho, respeitando a espera após falhas."""
+        if self._parado:
+            raise RuntimeError("Worker do WhatsApp Monitor encerrado")
+        if self.ativo:
+            return
+
+        espera = self._proximo_inicio - time.monotonic()
+        if espera > 0:
+            raise RuntimeError(f"Worker aguardando {espera:.0f}s antes de reiniciar")
+
+        conn_pai, conn_filho = self._contexto.Pipe()
+        self._processo = self._contexto.Process(
+            target=_executar_worker,
+            args=(conn_filho, self.fabrica, self.config_dir, self.config),
+            name=f"{DOMAIN}_worker",
+            daemon=True,
+        )
+        self._processo.start()
+        conn_filho.close()
+        self._conn = conn_pai
+        _LOGGER.info(f"Worker do WhatsApp Monitor iniciado (pid {self._processo.pid})")
+
+    def _falha(self, motivo):
+        """Encerra o processo com problema e agenda o reinício."""
+        _LOGGER.error(f"Worker do WhatsApp Monitor falhou: {motivo}")
+        self._matar()
+        self.reinicios += 1
+        espera = min(ESPERA_MAXIMA_REINICIO, 2 ** min(self.reinicios, 6))
+        self._proximo_inicio = time.monotonic() + espera
+
+    def _matar(self):
+        """Encerra o processo filho e todo o seu grupo (driver e Chrome)."""
+        processo, self._processo = self._processo, None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if processo is None:
+            return
+
+        if processo.is_alive() and hasattr(os, "killpg"):
+            try:
+                os.killpg(processo.pid, signal.SIGKILL)
+            except OSError:
+                processo.kill()
+        elif processo.is_alive():
+            processo.kill()
+        processo.join(TEMPO_LIMITE_PARADA)
+
+    def enviar(self, comando, *args):
+        """Envia um comando sem aguardar a resposta."""
+        if not self.ativo:
+            return None
+        id_comando = next(self._ids)
+        with self._lock_envio:
+            self._conn.send((id_comando, comando, args))
+        return id_comando
+
+    def _despachar(self, mensagem):
+        """Trata mensagens assíncronas do processo filho."""
+        tipo = mensagem[0]
+        if tipo == "evento" and self.ao_evento:
+            self.ao_evento(mensagem[1], mensagem[2])
+        elif tipo == "notificacao" and self.ao_notificar:
+            self.ao_notificar(*mensagem[1:])
+        elif tipo == "qrcode" and self.ao_qrcode:
+            self.ao_qrcode(mensagem[1], mensagem[2])
+        elif tipo == "log":
+            _LOGGER.log(mensagem[1], mensagem[2])
+
+    def chamar(self, comando, *args, timeout=TEMPO_LIMITE_COMANDO):
+        """Executa um comando no processo filho e retorna o resultado."""
+        with self._lock_chamada:
+            try:
+                self.iniciar()
+            except RuntimeError as e:
+                _LOGGER.warning(f"Comando '{comando}' ignorado: {e}")
+                return None
+            id_comando = self.enviar(comando, *args)
+            limite = time.monotonic() + timeout
+
+            while True:
+                restante = limite - time.monotonic()
+                try:
+                    if restante <= 0 or not self._conn.poll(restante):
+                        self._falha(f"sem resposta para '{comando}' em {timeout}s")
+                        return None
+                    mensagem = self._conn.recv()
+                except (EOFError, OSError, AttributeError):
+                    if self._parado:
+                        return None
+                    self._falha(f"processo encerrado durante '{comando}'")
+                    return None
+
+                if mensagem[0] != "resposta":
+                    self._despachar(mensagem)
+                    continue
+                if mensagem[1] != id_comando:
+                    # Resposta de um comando enviado sem espera
+                    self.estado = mensagem[4]
+                    continue
+
+                _, _, sucesso, resultado, self.estado = mensagem
+                self.reinicios = 0
+                if not sucesso:
+                    _LOGGER.error(f"Erro no worker ao executar '{comando}': {resultado}")
+                    return None
+                return resultado
+
+    def parar(self):
+        """Encerra o processo filho, fechando o Chrome de forma ordenada se possível."""
+        self._parado = True
+        processo = self._processo
+        if processo is None:
+            return True
+
+        try:
+            if processo.is_alive():
+                self.enviar("parar")
+                processo.join(TEMPO_LIMITE_PARADA)
+        except (OSError, ValueError):
+            pass
+
+        self._matar()
+        _LOGGER.info("Worker do WhatsApp Monitor encerrado")
+        return True
+
+
+class MonitorRemoto:
+    """Representa, no processo do Home Assistant, o monitor executado no worker.
+
+    Expõe os mesmos métodos usados pelas funções de serviço de
+    whatsapp_monitor_core, de forma que o restante do componente não precisa
+    saber em que processo o navegador está.
+    """
+
+    def __init__(self, hass, worker):
+        """Inicializa o representante."""
+        self.hass = hass
+        self.worker = worker
+        self._encerrando = False
+        self.qr_png = None
+        self.qr_hash = None
+
+    @property
+    def connected(self):
+        return self.worker.estado.get("connected", False)
+
+    @property
+    def estado_login(self):
+        return self.worker.estado.get("estado_login")
+
+    @property
+    def estado_login_desde(self):
+        return self.worker.estado.get("estado_login_desde")
+
+    @property
+    def last_check_time(self):
+        return self.worker.estado.get("last_check_time")
+
+    @property
+    def matcher_version(self):
+        return self.worker.estado.get("matcher_version", 0)
+
+    @property
+    def estatisticas_ciclo(self):
+        return self.worker.estado.get("estatisticas_ciclo", {})
+
+    @property
+    def uso_buffer(self):
+        return self.worker.estado.get("uso_buffer")
+
+    @property
+    def tempos_espera(self):
+        return self.worker.estado.get("tempos_espera", {})
+
+    @property
+    def memoria_navegador(self):
+        return self.worker.estado.get("memoria_navegador")
+
+    @property
+    def estado_vigia(self):
+        return self.worker.estado.get("estado_vigia")
+
+    @property
+    def estado_reserva(self):
+        return self.worker.estado.get("estado_reserva")
+
+    def check_messages(self):
+        return self.worker.chamar("check_messages") or []
+
+    def generate_summary(self):
+        return self.worker.chamar("generate_summary")
+
+    def connect(self):
+        return bool(self.worker.chamar("connect"))
+
+    def aguardar_eventos(self, timeout=30):
+        return bool(self.worker.chamar("aguardar_eventos", timeout, timeout=timeout + 30))
+
+    def disconnect(self):
+        # Durante o encerramento, parar o processo em vez de só fechar o Chrome
+        if self._encerrando:
+            return self.worker.parar()
+        return bool(self.worker.chamar("disconnect"))
+
+    def encerrar(self):
+        self._encerrando = True
+
+    def set_matcher(self, matcher, config=None, versao=None):
+        """Envia a nova configuração ao worker, que recompila o identificador."""
+        self.worker.config = config if config is not None else self.worker.config
+        self.worker.enviar("set_config", self.worker.config, versao)
+        return True
+
+
+def init_worker_monitor(hass, dados):
+    """Inicializa o monitor do WhatsApp de uma conta em um processo separado."""
+    try:
+        config_dir = dados["diretorio"]
+        config = dict(dados.get("config", {}))
+        conta = config.get("conta")
+
+        def disparar_evento(evento, dados_evento):
+            if conta:
+                dados_evento = {**dados_evento, "conta": conta}
+            hass.bus.fire(evento, dados_evento)
+
+        def notificar(titulo, mensagem, notification_id):
+            hass.add_job(
+                hass.services.async_call,
+                "persistent_notification",
+                "create",
+                {"title": titulo, "message": mensagem, "notification_id": notification_id}
+            )
+
+        def publicar_qr(png, qr_hash):
+            # O QR Code é servido a partir do processo do Home Assistant
+            from .qrcode_view import async_publicar_qr
+            remoto.qr_png = png
+            remoto.qr_hash = qr_hash
+            hass.add_job(async_publicar_qr, hass, qr_hash, conta)
+
+        worker = WhatsAppMonitorWorker(
+            config_dir, config, ao_evento=disparar_evento, ao_notificar=notificar, ao_qrcode=publicar_qr
+        )
+        remoto = MonitorRemoto(hass, worker)
+        worker.iniciar()
+        dados["monitor"] = remoto
+
+        _LOGGER.info(f"Monitor do WhatsApp inicializado em processo separado ({dados.get('nome')})")
+        return True
+    except Exception as e:
+        _LOGGER.error(f"Erro ao inicializar worker do WhatsApp Monitor: {e}")
+        return False
@@ -0,0 +1 @@
+"""Testes do WhatsApp Monitor."""
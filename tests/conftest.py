@@ -0,0 +1,18 @@
+"""
+WhatsApp Monitor - Configuração dos testes
+
+Os testes usam o pytest-homeassistant-custom-component (requirements_test.txt)
+e não dependem do Chrome nem do Selenium.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """Armazenamento em um diretório temporário, fechado ao final do teste."""
+    from custom_components.whatsapp_monitor.storage import WhatsAppMonitorStorage
+
+    armazenamento = WhatsAppMonitorStorage(str(tmp_path))
+    yield armazenamento
+    armazenamento.fechar()
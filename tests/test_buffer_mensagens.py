@@ -0,0 +1,57 @@
+"""Testes do buffer de mensagens importantes."""
+
+from custom_components.whatsapp_monitor.buffer_mensagens import BufferMensagens, RegistroMensagem
+
+
+def mensagem(i):
+    return {"contato": f"Contato {i % 3}", "mensagem": f"mensagem {i}", "hora": "10:00", "timestamp": 1000 + i}
+
+
+def test_descarta_as_mais_antigas_ao_encher():
+    """Acima da capacidade, cada mensagem nova substitui a mais antiga."""
+    buffer = BufferMensagens(capacidade=3)
+    for i in range(5):
+        buffer.adicionar(mensagem(i))
+
+    assert len(buffer) == 3
+    assert buffer.total == 5
+    assert [r.mensagem for r in buffer.recentes()] == ["mensagem 2", "mensagem 3", "mensagem 4"]
+    assert [r.mensagem for r in buffer.recentes(2)] == ["mensagem 3", "mensagem 4"]
+    assert buffer.recentes(0) == []
+
+
+def test_recentes_antes_de_encher():
+    """Enquanto há espaço, as mensagens são mantidas na ordem de chegada."""
+    buffer = BufferMensagens(capacidade=10)
+    assert not buffer
+    for i in range(4):
+        buffer.adicionar(mensagem(i))
+
+    assert [r.mensagem for r in buffer.recentes()] == [f"mensagem {i}" for i in range(4)]
+    assert [r.mensagem for r in buffer.recentes(100)] == [f"mensagem {i}" for i in range(4)]
+
+
+def test_limpar_preserva_o_total_recebido():
+    """Limpar esvazia o buffer, que volta a aceitar mensagens normalmente."""
+    buffer = BufferMensagens(capacidade=2)
+    for i in range(3):
+        buffer.adicionar(mensagem(i))
+    buffer.limpar()
+
+    assert len(buffer) == 0
+    assert buffer.total == 3
+    buffer.adicionar(mensagem(9))
+    assert [r.mensagem for r in buffer.recentes()] == ["mensagem 9"]
+
+
+def test_registro_compartilha_textos_repetidos():
+    """Contatos e horas iguais são internados e o dicionário de saída é preservado."""
+    a = RegistroMensagem.de_dict(mensagem(0))
+    b = RegistroMensagem.de_dict({**mensagem(3), "contato": "".join(["Contato ", "0"])})
+
+    assert a.contato is b.contato
+    assert a.como_dict() == {
+        "contato": "Contato 0", "mensagem": "mensagem 0", "hora": "10:00", "importante": True,
+        "categoria": None, "padrao": None, "timestamp": 1000,
+    }
+    assert BufferMensagens(capacidade=2).uso_memoria()["registros"] == 0
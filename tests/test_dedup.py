@@ -0,0 +1,84 @@
+"""Testes do índice de mensagens já vistas."""
+
+import datetime
+
+from custom_components.whatsapp_monitor.dedup import (
+    IndiceMensagensVistas,
+    SEPARADOR_CHAVE,
+    data_mensagem,
+    id_mensagem,
+    impressoes_mensagens,
+)
+
+AGORA = datetime.datetime(2024, 5, 10, 0, 20)
+
+
+def test_data_mensagem_apos_a_meia_noite():
+    """Uma hora mais adiantada que o relógio é de ontem, salvo a tolerância."""
+    assert data_mensagem("23:58", AGORA) == "2024-05-09"
+    assert data_mensagem("00:15", AGORA) == "2024-05-10"
+    assert data_mensagem("00:24", AGORA) == "2024-05-10"
+    assert data_mensagem("ontem", AGORA) == "2024-05-10"
+
+
+def test_id_mensagem_ignora_chaves_montadas():
+    """Só o data-id da página é usado como identificador."""
+    assert id_mensagem("true_5511@c.us_3EB0") == "true_5511@c.us_3EB0"
+    assert id_mensagem(f"10:00{SEPARADOR_CHAVE}oi") is None
+    assert id_mensagem(None) is None
+
+
+def test_mensagens_identicas_no_mesmo_minuto_sao_distintas():
+    """A ocorrência diferencia mensagens repetidas lidas na mesma janela."""
+    mensagens = [{"hora": "00:10", "texto": "ok"}] * 2 + [{"hora": "00:11", "texto": "ok"}]
+    impressoes = impressoes_mensagens("Ana", mensagens, AGORA)
+
+    assert len(set(impressoes)) == 3
+    # A mesma janela lida de novo produz as mesmas impressões
+    assert impressoes_mensagens("Ana", mensagens, AGORA) == impressoes
+    assert impressoes_mensagens("Bia", mensagens, AGORA) != impressoes
+
+
+def test_data_id_independe_de_hora_e_texto():
+    """Com o data-id, a impressão não muda se a hora ou a ocorrência mudarem."""
+    primeira = impressoes_mensagens("Ana", [{"chave": "id-1", "hora": "23:59", "texto": "a"}], AGORA)
+    segunda = impressoes_mensagens("Ana", [
+        {"chave": "id-0", "hora": "00:01", "texto": "b"},
+        {"chave": "id-1", "hora": "00:01", "texto": "b"},
+    ], AGORA)
+
+    assert segunda[1] == primeira[0]
+    assert segunda[0] != primeira[0]
+
+
+def test_mesma_hora_em_dias_diferentes():
+    """A mesma hora e texto lidos em dias diferentes não se confundem."""
+    mensagens = [{"hora": "09:00", "texto": "bom dia"}]
+    hoje = impressoes_mensagens("Ana", mensagens, datetime.datetime(2024, 5, 10, 9, 30))
+    amanha = impressoes_mensagens("Ana", mensagens, datetime.datetime(2024, 5, 11, 9, 30))
+
+    assert hoje != amanha
+
+
+def test_indice_descarta_as_menos_usadas():
+    """Acima da capacidade, a impressão menos usada deixa a memória."""
+    indice = IndiceMensagensVistas(capacidade=2)
+    indice.marcar(["a", "b"])
+    assert indice.filtrar_novas(["a"]) == set()
+    indice.marcar(["c"])
+
+    assert len(indice) == 2
+    assert indice.filtrar_novas(["a", "b", "c", "d"]) == {"b", "d"}
+
+
+def test_indice_consulta_o_armazenamento(storage):
+    """Impressões fora da memória são encontradas no armazenamento."""
+    IndiceMensagensVistas(storage).marcar(["a", "b"])
+    indice = IndiceMensagensVistas(storage, capacidade=1)
+
+    assert indice.filtrar_novas(["a", "c"]) == {"c"}
+    assert len(indice) == 1
+
+    # Após a limpeza, só a impressão ainda em memória continua conhecida
+    assert storage.limpar_mensagens_vistas(dias=-1) == 2
+    assert indice.filtrar_novas(["a", "b"]) == {"b"}
@@ -0,0 +1,77 @@
+"""Testes do identificador de mensagens importantes."""
+
+import random
+
+from custom_components.whatsapp_monitor.keywords import (
+    KeywordMatcher,
+    TIPO_CONTATO,
+    TIPO_PALAVRA_CHAVE,
+    TIPO_URGENCIA,
+)
+
+# Padrões com prefixos comuns, acentos e um contido no outro
+PALAVRAS = ["urg", "urgente", "urgência", "boleto", "bolo", "prazo", "prazo final", "atenção"]
+URGENCIA = ["preciso agora", "preciso", "me ajuda", "socorro"]
+FRAGMENTOS = PALAVRAS + URGENCIA + ["ur", "bol", "praz", "preci", "ajud", "olá", " ", " ", "x", "ção"]
+
+
+def correspondencia_ingenua(palavras, urgencia, mensagem):
+    """Referência: o padrão mais longo na posição mais à esquerda."""
+    padroes = {p.lower(): (TIPO_URGENCIA, p) for p in urgencia}
+    padroes.update({p.lower(): (TIPO_PALAVRA_CHAVE, p) for p in palavras})
+    texto = mensagem.lower()
+    for inicio in range(len(texto)):
+        encontrados = [p for p in padroes if texto.startswith(p, inicio)]
+        if encontrados:
+            return padroes[max(encontrados, key=len)]
+    return None
+
+
+def test_equivale_a_varredura_ingenua():
+    """A expressão única encontra o mesmo padrão que a busca um a um."""
+    matcher = KeywordMatcher(PALAVRAS, padroes_urgencia=URGENCIA)
+    aleatorio = random.Random(1234)
+
+    for _ in range(2000):
+        mensagem = "".join(aleatorio.choice(FRAGMENTOS) for _ in range(aleatorio.randint(0, 8)))
+        if aleatorio.random() < 0.3:
+            mensagem = mensagem.upper()
+        esperado = correspondencia_ingenua(PALAVRAS, URGENCIA, mensagem)
+        assert matcher.match("Contato", mensagem) == esperado, mensagem
+        assert matcher.is_important("Contato", mensagem) == (esperado is not None)
+
+
+def test_prefere_o_padrao_mais_longo():
+    """Na mesma posição, o padrão mais longo vence o seu prefixo."""
+    matcher = KeywordMatcher(PALAVRAS, padroes_urgencia=URGENCIA)
+
+    assert matcher.match("A", "É URGENTE!") == (TIPO_PALAVRA_CHAVE, "urgente")
+    assert matcher.match("A", "urgência") == (TIPO_PALAVRA_CHAVE, "urgência")
+    assert matcher.match("A", "urgent") == (TIPO_PALAVRA_CHAVE, "urg")
+    assert matcher.match("A", "preciso agora mesmo") == (TIPO_URGENCIA, "preciso agora")
+
+
+def test_palavra_chave_tem_precedencia_sobre_urgencia():
+    """Um texto presente nas duas listas é classificado como palavra-chave."""
+    matcher = KeywordMatcher(["Socorro"], padroes_urgencia=["socorro"])
+
+    assert matcher.match("A", "socorro") == (TIPO_PALAVRA_CHAVE, "Socorro")
+    assert matcher.num_padroes == 1
+
+
+def test_contato_importante():
+    """Mensagens de contatos importantes são importantes mesmo sem texto."""
+    matcher = KeywordMatcher([], contatos_importantes=["Mãe"], padroes_urgencia=[])
+
+    assert matcher.match("Mãe", "") == (TIPO_CONTATO, "Mãe")
+    assert matcher.match("Outro", "urgente") is None
+    assert not matcher.is_important("Outro", None)
+
+
+def test_from_config_usa_padroes_de_urgencia():
+    """A configuração define as palavras-chave; a urgência é sempre verificada."""
+    matcher = KeywordMatcher.from_config({"palavras_chave": ["boleto"], "contatos_importantes": ["Ana"]})
+
+    assert matcher.match("B", "segue o boleto") == (TIPO_PALAVRA_CHAVE, "boleto")
+    assert matcher.match("B", "não pode esperar") == (TIPO_URGENCIA, "não pode esperar")
+    assert matcher.is_important("Ana", "oi")
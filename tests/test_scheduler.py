@@ -0,0 +1,142 @@
+"""Testes do agendamento de ciclos."""
+
+import asyncio
+import datetime
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.whatsapp_monitor.scheduler import (
+    AgendadorCiclos,
+    IntervaloAdaptativo,
+    PoolVerificacoes,
+)
+
+
+def test_intervalo_reduz_com_atividade_e_recua_sem_ela():
+    """Atividade divide o intervalo pela metade; ciclos vazios o aumentam pelo fator."""
+    intervalo = IntervaloAdaptativo(base=60, minimo=20, maximo=200, fator_recuo=2)
+
+    assert [intervalo.registrar(True) for _ in range(3)] == [30, 20, 20]
+    assert [intervalo.registrar(False) for _ in range(5)] == [40, 80, 160, 200, 200]
+
+
+def test_intervalo_limites_invertidos():
+    """Mínimo e máximo trocados são corrigidos e a base respeita os limites."""
+    intervalo = IntervaloAdaptativo(base=1000, minimo=300, maximo=30)
+
+    assert (intervalo.minimo, intervalo.maximo, intervalo.atual) == (30, 300, 300)
+
+
+def test_intervalo_de_silencio_atravessa_a_meia_noite():
+    """No período de silêncio vale o intervalo de silêncio, inclusive após a meia-noite."""
+    intervalo = IntervaloAdaptativo(
+        base=60, minimo=30, maximo=600,
+        silencio_inicio=datetime.time(23, 0), silencio_fim=datetime.time(7, 0), intervalo_silencio=1800,
+    )
+    dia = datetime.datetime(2024, 5, 10)
+
+    assert intervalo.efetivo(dia.replace(hour=23, minute=30)) == 1800
+    assert intervalo.efetivo(dia.replace(hour=6, minute=59)) == 1800
+    assert intervalo.efetivo(dia.replace(hour=7)) == 60
+    assert intervalo.efetivo(dia.replace(hour=12)) == 60
+
+
+def test_defasagem_distribui_as_contas():
+    """Os primeiros disparos das contas são espalhados ao longo do intervalo."""
+    pool = PoolVerificacoes(maximo=2)
+    for conta in ("a", "b", "c", "a"):
+        pool.registrar(conta)
+
+    assert [pool.defasagem(conta, 90) for conta in ("a", "b", "c", "x")] == [0, 30, 60, 0]
+    pool.remover("b")
+    assert pool.defasagem("c", 90) == 45
+
+
+async def test_pool_limita_as_varreduras_simultaneas():
+    """No máximo `maximo` contas ocupam uma vaga ao mesmo tempo."""
+    pool = PoolVerificacoes(maximo=1)
+    simultaneas = []
+
+    async def varrer():
+        async with pool.vaga():
+            simultaneas.append(pool.em_andamento)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(varrer(), varrer(), varrer())
+
+    assert simultaneas == [1, 1, 1]
+    assert (pool.em_andamento, pool.aguardando) == (0, 0)
+
+
+async def test_agendador_executa_e_ignora_sobreposicao(hass):
+    """O agendador dispara a cada intervalo e ignora disparos com o recurso ocupado."""
+    ocupado = False
+    liberar = asyncio.Event()
+    execucoes = []
+
+    async def executar():
+        execucoes.append(dt_util.utcnow())
+        await liberar.wait()
+        return True
+
+    agendador = AgendadorCiclos(hass, "teste", executar, 10, jitter=0, ocupado=lambda: ocupado)
+    agendador.async_iniciar()
+
+    # Primeiro disparo: o ciclo fica em andamento até ser liberado
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=10))
+    await asyncio.sleep(0)
+    assert len(execucoes) == 1
+    assert agendador.em_execucao
+
+    # Segundo disparo com o ciclo anterior em andamento
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=20))
+    await asyncio.sleep(0)
+    assert len(execucoes) == 1
+    assert agendador.metricas["ignorados"] == 1
+
+    liberar.set()
+    await agendador._tarefa
+    assert agendador.metricas["execucoes"] == 1
+    assert agendador.metricas["falhas"] == 0
+
+    # Recurso compartilhado ocupado por outro ciclo
+    ocupado = True
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+    await hass.async_block_till_done()
+    assert agendador.metricas["ignorados"] == 2
+
+    ocupado = False
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=40))
+    await agendador._tarefa
+    assert len(execucoes) == 2
+
+    agendador.async_parar()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=100))
+    await hass.async_block_till_done()
+    assert len(execucoes) == 2
+    assert agendador.metricas["proximo_em"] is None
+
+
+async def test_agendador_registra_falhas_e_avisa_conclusao(hass):
+    """Exceções contam como falha, e o evento e o retorno de conclusão são emitidos."""
+    concluidos = []
+    eventos = []
+    hass.bus.async_listen("whatsapp_monitor_cycle_completed", eventos.append)
+
+    async def executar():
+        raise RuntimeError("falhou")
+
+    agendador = AgendadorCiclos(hass, "teste", executar, 10, jitter=0,
+                                ao_concluir=lambda: concluidos.append(True), conta="a")
+    agendador.async_iniciar(atraso=1)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    await agendador._tarefa
+    await hass.async_block_till_done()
+
+    assert agendador.metricas["falhas"] == 1
+    assert concluidos == [True]
+    assert eventos[0].data["sucesso"] is False
+    assert eventos[0].data["conta"] == "a"
+    agendador.async_parar()
@@ -0,0 +1,144 @@
+"""Testes do armazenamento: índice de busca, migração e acesso concorrente."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from custom_components.whatsapp_monitor import storage as storage_mod
+from custom_components.whatsapp_monitor.storage import (
+    CHAVE_FTS_PENDENTE,
+    WhatsAppMonitorStorage,
+)
+
+
+def mensagem(i, texto=None):
+    return {"contato": f"Contato {i % 2}", "mensagem": texto or f"aviso numero{i}", "hora": "10:00"}
+
+
+def remover_indice(armazenamento):
+    """Deixa o banco como antes da busca textual existir."""
+    with armazenamento.conexoes.escrita() as conn:
+        conn.execute("DROP TABLE mensagens_fts")
+        for gatilho in ("insercao", "remocao", "alteracao"):
+            conn.execute(f"DROP TRIGGER mensagens_fts_{gatilho}")
+
+
+def integridade(armazenamento):
+    """Falha se o índice FTS5 divergir da tabela de mensagens."""
+    with armazenamento.conexoes.escrita() as conn:
+        conn.execute("INSERT INTO mensagens_fts (mensagens_fts, rank) VALUES ('integrity-check', 1)")
+
+
+@pytest.fixture
+def banco_antigo(tmp_path):
+    """Banco com 10 mensagens gravadas antes do índice, reaberto pela versão atual."""
+    antigo = WhatsAppMonitorStorage(str(tmp_path))
+    remover_indice(antigo)
+    antigo.salvar_mensagens([mensagem(i) for i in range(10)])
+    antigo.fechar()
+
+    armazenamento = WhatsAppMonitorStorage(str(tmp_path))
+    yield armazenamento
+    armazenamento.fechar()
+
+
+def test_busca_com_acentos_e_prefixo(storage):
+    """A busca ignora acentos e aceita prefixos, e a sintaxe do usuário não quebra a consulta."""
+    storage.salvar_mensagens([
+        mensagem(1, "Reunião do condomínio amanhã"),
+        mensagem(2, "Boleto do condominio vence hoje"),
+        mensagem(3, "sem relação"),
+    ])
+
+    assert storage.fts_disponivel
+    assert storage.buscar_mensagens("condominio")["total"] == 2
+    assert storage.buscar_mensagens("reuniao cond*")["total"] == 1
+    assert storage.buscar_mensagens('boleto" OR "x')["total"] == 0
+    assert storage.buscar_mensagens("   ")["total"] == 0
+
+
+def test_migracao_indexa_mensagens_antigas_em_lotes(banco_antigo):
+    """Mensagens anteriores ao índice ficam pendentes até a migração em lotes."""
+    assert banco_antigo.indexacao_pendente() == 10
+    assert banco_antigo.buscar_mensagens("aviso")["total"] == 0
+
+    # Mensagens novas são indexadas pelos gatilhos durante a migração
+    banco_antigo.salvar_mensagens([mensagem(10)])
+    assert banco_antigo.buscar_mensagens("aviso")["total"] == 1
+
+    lotes = []
+    assert banco_antigo.indexar_mensagens(tamanho_lote=4, progresso=lotes.append) == {"indexadas": 10}
+    assert lotes == [4, 8, 10]
+    assert banco_antigo.indexacao_pendente() == 0
+    assert banco_antigo.obter_configuracao(CHAVE_FTS_PENDENTE) is None
+    assert banco_antigo.buscar_mensagens("aviso")["total"] == 11
+    integridade(banco_antigo)
+
+
+def test_migracao_interrompida_e_retomada(banco_antigo):
+    """A migração pode ser interrompida entre lotes e retomada depois."""
+    def interromper(indexadas):
+        banco_antigo.interromper_indexacao()
+
+    assert banco_antigo.indexar_mensagens(tamanho_lote=3, progresso=interromper) == {"indexadas": 3}
+    assert banco_antigo.indexacao_pendente() == 7
+
+    banco_antigo._parar_indexacao.clear()
+    assert banco_antigo.indexar_mensagens(tamanho_lote=3) == {"indexadas": 7}
+    integridade(banco_antigo)
+
+
+def test_gatilhos_ignoram_linhas_ainda_nao_indexadas(banco_antigo):
+    """Alterar ou remover uma mensagem pendente não corrompe o índice."""
+    banco_antigo.indexar_mensagens(tamanho_lote=5, progresso=lambda n: banco_antigo.interromper_indexacao())
+
+    with banco_antigo.conexoes.escrita() as conn:
+        # Linha já indexada e linha pendente
+        conn.execute("UPDATE mensagens SET mensagem = 'texto corrigido' WHERE id IN (2, 8)")
+        conn.execute("DELETE FROM mensagens WHERE id IN (3, 9)")
+
+    # A verificação de integridade compara com a tabela inteira: só vale após a migração
+    banco_antigo._parar_indexacao.clear()
+    banco_antigo.indexar_mensagens()
+    integridade(banco_antigo)
+    assert banco_antigo.buscar_mensagens("corrigido")["total"] == 2
+    # Os ids começam em 1: as linhas 3 e 9 tinham numero2 e numero8
+    assert banco_antigo.buscar_mensagens("numero2")["total"] == 0
+    assert banco_antigo.buscar_mensagens("numero8")["total"] == 0
+    assert banco_antigo.buscar_mensagens("aviso")["total"] == 6
+
+
+def test_restaurar_backup_sem_indice(storage, tmp_path):
+    """Um backup anterior à busca textual é restaurado e indexado."""
+    origem = tmp_path / "origem"
+    origem.mkdir()
+    antigo = WhatsAppMonitorStorage(str(origem))
+    remover_indice(antigo)
+    antigo.salvar_mensagens([mensagem(i) for i in range(3)])
+    antigo.fechar()
+
+    assert storage.restaurar_backup(antigo.db_path)
+    assert storage.buscar_mensagens("aviso")["total"] == 3
+    integridade(storage)
+
+
+def test_escrita_aguarda_o_lock_de_outro_processo(storage, monkeypatch):
+    """Outra conexão com o lock de escrita atrasa a gravação, em vez de perdê-la."""
+    monkeypatch.setattr(storage_mod, "ESPERA_BLOQUEIO", 0.05)
+    with storage.conexoes.escrita() as conn:
+        conn.execute("PRAGMA busy_timeout=10")
+
+    outro = sqlite3.connect(storage.db_path, check_same_thread=False)
+    outro.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.1, outro.commit).start()
+
+    assert storage.salvar_mensagens([mensagem(1)]) == 1
+    assert storage.buscar_mensagens("aviso")["total"] == 1
+
+    # Lock mantido além das novas tentativas: a gravação falha por inteiro
+    outro.execute("BEGIN IMMEDIATE")
+    assert storage.salvar_mensagens([mensagem(2)]) == 0
+    outro.rollback()
+    outro.close()
+    assert storage.buscar_mensagens("aviso")["total"] == 1
@@ -0,0 +1,91 @@
+"""Testes do vigia do navegador e do disjuntor de reinícios."""
+
+from custom_components.whatsapp_monitor.vigia import (
+    DISJUNTOR_ABERTO,
+    DISJUNTOR_FECHADO,
+    MOTIVO_MEMORIA,
+    MOTIVO_SONDA,
+    DisjuntorReinicio,
+    VigiaNavegador,
+)
+
+
+class Relogio:
+    """Relógio controlado pelo teste."""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class DriverSimulado:
+    """Driver que responde à sonda com o host informado ou falha."""
+
+    def __init__(self, host="web.whatsapp.com"):
+        self.host = host
+
+    def execute_script(self, script):
+        if isinstance(self.host, Exception):
+            raise self.host
+        return self.host
+
+
+def test_espera_dobra_ate_o_maximo():
+    """Cada reinício sem ciclo saudável dobra a espera, até o máximo."""
+    disjuntor = DisjuntorReinicio(espera_inicial=30, espera_maxima=200, relogio=Relogio())
+
+    assert [disjuntor.registrar_falha() for _ in range(5)] == [30, 60, 120, 200, 200]
+    assert disjuntor.falhas == 5
+
+
+def test_disjuntor_abre_e_fecha_com_o_tempo():
+    """O disjuntor fica aberto durante a espera e volta a permitir tentativas."""
+    relogio = Relogio()
+    disjuntor = DisjuntorReinicio(espera_inicial=30, relogio=relogio)
+    assert disjuntor.estado == DISJUNTOR_FECHADO
+
+    disjuntor.registrar_falha()
+    relogio.agora = 29
+    assert disjuntor.estado == DISJUNTOR_ABERTO
+    assert not disjuntor.pode_tentar()
+    assert disjuntor.espera_restante() == 1
+
+    relogio.agora = 30
+    assert disjuntor.pode_tentar()
+    assert disjuntor.registrar_falha() == 60
+
+
+def test_ciclo_saudavel_zera_a_espera():
+    """Um ciclo saudável fecha o disjuntor e recomeça a espera do início."""
+    relogio = Relogio()
+    disjuntor = DisjuntorReinicio(espera_inicial=30, relogio=relogio)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == DISJUNTOR_FECHADO
+    assert disjuntor.registrar_falha() == 30
+
+
+def test_vigia_reinicia_por_memoria_ou_sonda():
+    """O vigia pede reinício acima do limite de memória ou após falhas seguidas da sonda."""
+    vigia = VigiaNavegador(limite_memoria_mb=100, falhas_sonda=2,
+                           disjuntor=DisjuntorReinicio(relogio=Relogio()))
+    saudavel = DriverSimulado()
+    travado = DriverSimulado(RuntimeError("invalid session id"))
+
+    assert vigia.avaliar(saudavel, 50 * 1048576) is None
+    assert vigia.avaliar(saudavel, 150 * 1048576) == MOTIVO_MEMORIA
+    assert vigia.avaliar(travado, None) is None
+    assert vigia.avaliar(travado, None) == MOTIVO_SONDA
+
+    assert vigia.registrar_reinicio(MOTIVO_SONDA) == 30
+    assert vigia.reinicios == 1
+    assert vigia.falhas_seguidas == 0
+    assert vigia.avaliar(DriverSimulado("about:blank"), None) is None
+    assert vigia.falhas_seguidas == 1
+    assert not vigia.disjuntor.pode_tentar()
+    vigia.registrar_ciclo_saudavel()
+    assert vigia.disjuntor.pode_tentar()
@@ -0,0 +1,110 @@
+"""Testes do processo separado do navegador, com um monitor simulado."""
+
+import os
+
+import pytest
+
+from custom_components.whatsapp_monitor.worker import MonitorRemoto, WhatsAppMonitorWorker
+
+
+class MonitorSimulado:
+    """Monitor sem Chrome: responde aos comandos do worker."""
+
+    def __init__(self, config):
+        self.config = config
+        self.connected = False
+        self.matcher_version = 0
+
+    def connect(self):
+        self.connected = True
+        return True
+
+    def disconnect(self):
+        self.connected = False
+        return True
+
+    def check_messages(self):
+        mensagens = [{"contato": "Ana", "mensagem": "urgente", "importante": True}]
+        self._disparar_evento("whatsapp_monitor_important_message", mensagens[0])
+        return mensagens
+
+    def generate_summary(self):
+        raise RuntimeError("sem mensagens")
+
+    def aguardar_eventos(self, timeout):
+        # Simula um travamento do Chrome que derruba o processo
+        os._exit(1)
+
+    def set_matcher(self, matcher, config, versao):
+        self.matcher_version = versao
+        return True
+
+
+def criar_monitor_simulado(config_dir, config):
+    """Fábrica de nível de módulo, importável no processo filho."""
+    return MonitorSimulado(config)
+
+
+@pytest.fixture
+def worker(tmp_path):
+    eventos = []
+    worker = WhatsAppMonitorWorker(
+        str(tmp_path), {"conta": "a"}, fabrica=criar_monitor_simulado,
+        ao_evento=lambda evento, dados: eventos.append((evento, dados)),
+    )
+    worker.eventos = eventos
+    yield worker
+    worker.parar()
+
+
+def test_comandos_e_eventos(worker):
+    """Resultados, estado e eventos do filho chegam ao Home Assistant."""
+    remoto = MonitorRemoto(None, worker)
+
+    assert remoto.connect()
+    assert remoto.connected
+    assert remoto.check_messages() == [{"contato": "Ana", "mensagem": "urgente", "importante": True}]
+    assert worker.eventos == [("whatsapp_monitor_important_message",
+                               {"contato": "Ana", "mensagem": "urgente", "importante": True})]
+
+    # Configuração enviada sem espera é aplicada antes do próximo comando
+    remoto.set_matcher(None, {"palavras_chave": ["boleto"]}, 3)
+    assert remoto.disconnect()
+    assert remoto.matcher_version == 3
+    assert not remoto.connected
+
+
+def test_erro_no_comando_mantem_o_processo(worker):
+    """Uma exceção no monitor volta como falha do comando, sem reiniciar o filho."""
+    assert worker.chamar("generate_summary") is None
+    assert worker.ativo
+    assert worker.chamar("comando_inexistente") is None
+    assert worker.chamar("connect") is True
+    assert worker.reinicios == 0
+
+
+def test_processo_encerrado_agenda_reinicio(worker):
+    """Se o filho morre, o comando falha e o reinício aguarda a espera."""
+    worker.iniciar()
+    pid = worker._processo.pid
+
+    assert worker.chamar("aguardar_eventos", 1, timeout=30) is None
+    assert worker.reinicios == 1
+    assert not worker.ativo
+    # Durante a espera, os comandos são ignorados sem iniciar outro processo
+    assert worker.chamar("connect") is None
+    assert worker._processo is None
+
+    worker._proximo_inicio = 0
+    assert worker.chamar("connect") is True
+    assert worker._processo.pid != pid
+
+
+def test_parar_encerra_o_processo(worker):
+    """Parar encerra o filho e impede novos inícios."""
+    assert worker.chamar("connect") is True
+    processo = worker._processo
+
+    assert worker.parar()
+    assert not processo.is_alive()
+    assert worker.chamar("connect") is None